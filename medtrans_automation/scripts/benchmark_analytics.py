@@ -0,0 +1,175 @@
+# MedTrans Analytics Benchmark Runner
+# Times every aggregation path over a generated (or given) delivery log:
+#   rows/s, peak traced memory, and cold vs warm wall time.
+#
+#   cold = a fresh interpreter runs the path once (imports + first read)
+#   warm = best of --repeat runs inside this process
+#
+# Each path imports its own modules when it runs, so a cold run pays only
+# for what that path needs (not, say, NumPy for summarize_csv).
+#
+# Usage:
+#     python3 benchmark_analytics.py --rows 1000000
+#     python3 benchmark_analytics.py --csv ../data/big.csv --output bench_medtrans.json
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def _summarize_quietly(path):
+    from first_project_template import summarize_csv
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return summarize_csv(str(path))
+
+
+def _aggregate_csv(path):
+    from first_project_template import aggregate_csv
+
+    return aggregate_csv(path)
+
+
+def _route_analytics(backend):
+    def run(path):
+        from route_analytics import route_analytics
+
+        return route_analytics(path, backend)
+    return run
+
+
+def _rollup_file(path):
+    from kpi_rollup import aggregate_file_by_date
+
+    return aggregate_file_by_date(path)
+
+
+def _incremental_full(path):
+    from incremental_kpis import update_kpis
+
+    # no state yet: the first incremental run parses the whole log
+    with tempfile.TemporaryDirectory() as tmp:
+        return update_kpis(path, Path(tmp) / "state.json")
+
+
+def has_numpy() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+# name -> callable(path); add new aggregation paths here, importing inside
+# the callable
+BENCHMARKS = {
+    "summarize_csv": _summarize_quietly,
+    "aggregate_csv": _aggregate_csv,
+    "route_analytics.python": _route_analytics("python"),
+    "kpi_rollup.aggregate_file_by_date": _rollup_file,
+    "incremental_kpis.first_run": _incremental_full,
+}
+if has_numpy():
+    BENCHMARKS["route_analytics.numpy"] = _route_analytics("numpy")
+
+
+def time_once(name: str, path: Path) -> float:
+    start = time.perf_counter()
+    BENCHMARKS[name](path)
+    return time.perf_counter() - start
+
+
+def cold_time(name: str, path: Path) -> float:
+    """Wall time of one run in a brand-new interpreter, including imports."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        "import benchmark_analytics as b; "
+        f"b.BENCHMARKS[{name!r}]({str(path)!r}); "
+        "print(time.perf_counter() - t)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS_DIR,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def peak_memory(name: str, path: Path) -> int:
+    tracemalloc.start()
+    BENCHMARKS[name](path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def count_rows(path: Path) -> int:
+    with path.open("rb") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def run_benchmarks(path: Path, repeat: int, names=None) -> list:
+    rows = count_rows(path)
+    results = []
+
+    for name in names or BENCHMARKS:
+        cold = cold_time(name, path)
+        warm = min(time_once(name, path) for _ in range(repeat))
+        results.append({
+            "path": name,
+            "rows": rows,
+            "cold_s": round(cold, 4),
+            "warm_s": round(warm, 4),
+            "rows_per_s": round(rows / warm, 1) if warm > 0 else None,
+            "peak_traced_bytes": peak_memory(name, path),
+        })
+        r = results[-1]
+        print(f"  {name:<36} cold {r['cold_s']:>8.3f}s  warm {r['warm_s']:>8.3f}s  "
+              f"{r['rows_per_s'] or 0:>12,.0f} rows/s  {r['peak_traced_bytes'] / 1e6:>8.1f} MB")
+
+    return results
+
+
+def main() -> None:
+    from generate_delivery_logs import generate_rows, write_log
+
+    parser = argparse.ArgumentParser(description="Benchmark the MedTrans CSV analytics paths")
+    parser.add_argument("--csv", help="Existing delivery log to benchmark (otherwise one is generated)")
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows to generate (default: 200,000)")
+    parser.add_argument("--routes", type=int, default=40, help="Route cardinality (default: 40)")
+    parser.add_argument("--dirty", type=float, default=0.02, help="Share of dirty miles values")
+    parser.add_argument("--repeat", type=int, default=3, help="Warm runs per path (best is kept)")
+    parser.add_argument("--output", default="bench_medtrans.json", help="JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="medtrans_bench_") as tmp:
+        if args.csv:
+            path = Path(args.csv).resolve()
+        else:
+            path = Path(tmp) / "deliveries.csv"
+            write_log(path, generate_rows(args.rows, args.routes, days=7, dirty=args.dirty))
+
+        print(f"Benchmarking {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        results = run_benchmarks(path, args.repeat)
+
+    report = {
+        "generated": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": has_numpy(),
+        "results": results,
+    }
+    with Path(args.output).open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+
+    print("✔ Benchmark results:", args.output)
+
+
+if __name__ == "__main__":
+    main()
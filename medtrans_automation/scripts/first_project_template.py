@@ -1,102 +1,218 @@
 # Week 1 Python Project Template
 # MedTrans CSV Summary & Basic Route Analytics
+# Single-pass streaming aggregation: rows are folded into counters as they
+# are read, so memory stays flat no matter how large the delivery log is.
 
 import csv
+from dataclasses import asdict, dataclass, field
+from itertools import islice
 from pathlib import Path
 from collections import defaultdict
 
+# Rows read per chunk while streaming a CSV
+DEFAULT_CHUNK_SIZE = 10_000
 
-def summarize_csv(file_path: str) -> None:
-    """
-    Print basic information about a CSV file:
-    - Total rows
-    - Column names
-    - On-time vs late delivery counts
-    - Per-route delivery count and average miles
-    - Route with the most deliveries
-    """
+
+def parse_miles(raw) -> float:
+    """Miles from a CSV cell: blank or unparseable -> 0.0 ("nan" stays NaN)."""
+    raw = (raw or "").strip()
+    try:
+        return float(raw) if raw else 0.0
+    except ValueError:
+        return 0.0
+
+
+@dataclass
+class RouteStats:
+    count: int = 0
+    total_miles: float = 0.0
+    on_time: int = 0
+    late: int = 0
+
+    @property
+    def avg_miles(self) -> float:
+        return self.total_miles / self.count if self.count > 0 else 0.0
+
+    @property
+    def on_time_rate(self) -> float:
+        total_with_status = self.on_time + self.late
+        return (self.on_time / total_with_status) * 100 if total_with_status > 0 else 0
+
+    def merge(self, other: "RouteStats") -> None:
+        self.count += other.count
+        self.total_miles += other.total_miles
+        self.on_time += other.on_time
+        self.late += other.late
+
+
+@dataclass
+class DeliverySummary:
+    """Running totals for one or more delivery logs."""
+
+    path: str = ""
+    columns: list = field(default_factory=list)
+    total_rows: int = 0
+    on_time: int = 0
+    late: int = 0
+    route_stats: dict = field(default_factory=lambda: defaultdict(RouteStats))
+
+    def add_row(self, row: dict) -> None:
+        self.total_rows += 1
+
+        route = (row.get("route", "UNKNOWN") or "").strip()
+        stats = self.route_stats[route]
+
+        status = (row.get("delivered_on_time") or "").strip().lower()
+        if status == "yes":
+            self.on_time += 1
+            stats.on_time += 1
+        elif status == "no":
+            self.late += 1
+            stats.late += 1
+
+        stats.count += 1
+        stats.total_miles += parse_miles(row.get("miles"))
+
+    def add_rows(self, rows) -> None:
+        for row in rows:
+            self.add_row(row)
+
+    def merge(self, other: "DeliverySummary") -> None:
+        """Fold another partial summary into this one (order does not matter)."""
+        if not self.columns:
+            self.columns = list(other.columns)
+        self.total_rows += other.total_rows
+        self.on_time += other.on_time
+        self.late += other.late
+        for route, stats in other.route_stats.items():
+            self.route_stats[route].merge(stats)
+
+    @property
+    def on_time_rate(self) -> float:
+        total_with_status = self.on_time + self.late
+        return (self.on_time / total_with_status) * 100 if total_with_status > 0 else 0
+
+    def to_dict(self) -> dict:
+        """JSON-friendly form (used to persist running totals between runs)."""
+        return {
+            "path": self.path,
+            "columns": list(self.columns),
+            "total_rows": self.total_rows,
+            "on_time": self.on_time,
+            "late": self.late,
+            "route_stats": {route: asdict(stats) for route, stats in self.route_stats.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeliverySummary":
+        summary = cls(
+            path=data.get("path", ""),
+            columns=list(data.get("columns", [])),
+            total_rows=data.get("total_rows", 0),
+            on_time=data.get("on_time", 0),
+            late=data.get("late", 0),
+        )
+        for route, stats in data.get("route_stats", {}).items():
+            summary.route_stats[route] = RouteStats(**stats)
+        return summary
+
+    @property
+    def busiest_route(self):
+        """(route, count) for the route with the most deliveries, or None."""
+        most_route = None
+        most_count = 0
+
+        for route, stats in self.route_stats.items():
+            if stats.count > most_count:
+                most_count = stats.count
+                most_route = route
+
+        return (most_route, most_count) if most_route is not None else None
+
+
+def iter_row_chunks(reader, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield lists of at most chunk_size rows from any row iterator."""
+    while True:
+        chunk = list(islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def aggregate_csv(file_path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> DeliverySummary:
+    """Stream a delivery CSV chunk by chunk into a DeliverySummary."""
     path = Path(file_path)
 
     if not path.exists():
-        print(f"[ERROR] File not found: {path}")
-        return
+        raise FileNotFoundError(f"File not found: {path}")
 
-    try:
-        with path.open("r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
+    summary = DeliverySummary(path=str(path))
 
-        print(f"\nFile: {path}")
-        print(f"Total rows (excluding header): {len(rows)}")
+    with path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        summary.columns = list(reader.fieldnames or [])
 
-        if not rows:
-            print("No data rows found in this file.")
-            return
+        for chunk in iter_row_chunks(reader, chunk_size):
+            summary.add_rows(chunk)
 
-        columns = list(rows[0].keys())
-        print("Columns:", ", ".join(columns))
+    return summary
 
-        # --- On-time vs late analytics ---
-        on_time_count = 0
-        late_count = 0
 
-        for row in rows:
-            status = row.get("delivered_on_time", "").strip().lower()
-            if status == "yes":
-                on_time_count += 1
-            elif status == "no":
-                late_count += 1
-
-        total_with_status = on_time_count + late_count
-        on_time_rate = (
-            (on_time_count / total_with_status) * 100 if total_with_status > 0 else 0
-        )
+def print_summary(summary: DeliverySummary) -> None:
+    print(f"\nFile: {summary.path}")
+    print(f"Total rows (excluding header): {summary.total_rows}")
 
-        print("\nDelivery Timeliness:")
-        print(f"  On-time deliveries: {on_time_count}")
-        print(f"  Late deliveries:    {late_count}")
-        print(f"  On-time rate:       {on_time_rate:.1f}%")
+    if not summary.total_rows:
+        print("No data rows found in this file.")
+        return
 
-        # --- Route-level analytics ---
-        route_stats = defaultdict(lambda: {"count": 0, "total_miles": 0.0})
+    print("Columns:", ", ".join(summary.columns))
 
-        for row in rows:
-            route = row.get("route", "UNKNOWN").strip()
-            miles_raw = row.get("miles", "").strip()
-
-            try:
-                miles = float(miles_raw) if miles_raw else 0.0
-            except ValueError:
-                miles = 0.0
-
-            route_stats[route]["count"] += 1
-            route_stats[route]["total_miles"] += miles
-
-        print("\nRoute Analytics:")
-        print("  Route       Count   Avg Miles")
-        print("  ---------   -----   ---------")
-        for route, stats in route_stats.items():
-            count = stats["count"]
-            avg_miles = stats["total_miles"] / count if count > 0 else 0.0
-            print(f"  {route:<10} {count:<7} {avg_miles:>9.2f}")
-
-        # --- Route with most deliveries ---
-        most_route = None
-        most_count = 0
+    # --- On-time vs late analytics ---
+    print("\nDelivery Timeliness:")
+    print(f"  On-time deliveries: {summary.on_time}")
+    print(f"  Late deliveries:    {summary.late}")
+    print(f"  On-time rate:       {summary.on_time_rate:.1f}%")
+
+    # --- Route-level analytics ---
+    print("\nRoute Analytics:")
+    print("  Route       Count   Avg Miles")
+    print("  ---------   -----   ---------")
+    for route, stats in summary.route_stats.items():
+        print(f"  {route:<10} {stats.count:<7} {stats.avg_miles:>9.2f}")
+
+    # --- Route with most deliveries ---
+    busiest = summary.busiest_route
+    if busiest is not None:
+        print(f"\nRoute with most deliveries: {busiest[0]} ({busiest[1]} stops)")
+
+    print()
 
-        for route, stats in route_stats.items():
-            if stats["count"] > most_count:
-                most_count = stats["count"]
-                most_route = route
 
-        if most_route is not None:
-            print(f"\nRoute with most deliveries: {most_route} ({most_count} stops)")
+def summarize_csv(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Print basic information about a CSV file and return the DeliverySummary:
+    - Total rows
+    - Column names
+    - On-time vs late delivery counts
+    - Per-route delivery count and average miles
+    - Route with the most deliveries
+    """
+    path = Path(file_path)
+
+    if not path.exists():
+        print(f"[ERROR] File not found: {path}")
+        return None
 
-        print()
+    try:
+        summary = aggregate_csv(path, chunk_size)
+        print_summary(summary)
+        return summary
 
     except Exception as e:
         print("[ERROR] Something went wrong while reading the CSV:")
         print(e)
+        return None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+# MedTrans Synthetic Delivery Log Generator
+# Produces realistic delivery CSVs in the sample.csv schema:
+#     delivery_id,date,route,miles,delivered_on_time
+# for load-testing the analytics scripts.
+#
+# Usage:
+#     python3 generate_delivery_logs.py out.csv --rows 1000000 --routes 40
+#     python3 generate_delivery_logs.py ../data/ --days 90 --rows 20000 --dirty 0.02
+#         (one file per day when the target is a directory)
+
+import argparse
+import csv
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+COLUMNS = ["delivery_id", "date", "route", "miles", "delivered_on_time"]
+
+# Values a hand-keyed log really contains instead of a number
+DIRTY_MILES = ["", " ", "n/a", "TBD", "12..5", "-", "?"]
+
+
+def generate_rows(rows: int, routes: int = 12, start: date = date(2025, 11, 1), days: int = 1,
+                  dirty: float = 0.01, on_time_rate: float = 0.85, seed: int = 42, first_id: int = 1):
+    """
+    Yield delivery rows. Each route has its own typical mileage and
+    on-time tendency; `dirty` is the share of rows with a blank or
+    non-numeric miles value (and occasionally a blank status).
+    """
+    rng = random.Random(seed)
+    route_names = [f"Route {i + 1:03d}" for i in range(routes)]
+    route_miles = [rng.uniform(8, 60) for _ in range(routes)]
+    route_on_time = [min(0.99, max(0.4, rng.gauss(on_time_rate, 0.08))) for _ in range(routes)]
+
+    for i in range(rows):
+        day = start + timedelta(days=(i * days) // rows)
+        r = min(int(rng.paretovariate(1.2)) - 1, routes - 1)  # a few busy routes, a long tail
+        r = (r + i) % routes if rng.random() < 0.3 else r
+
+        if rng.random() < dirty:
+            miles = rng.choice(DIRTY_MILES)
+            status = rng.choice(["yes", "no", ""])
+        else:
+            miles = f"{max(0.5, rng.gauss(route_miles[r], route_miles[r] * 0.25)):.1f}"
+            status = "yes" if rng.random() < route_on_time[r] else "no"
+
+        yield [first_id + i, day.isoformat(), route_names[r], miles, status]
+
+
+def write_log(path: Path, rows) -> int:
+    count = 0
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic MedTrans delivery logs")
+    parser.add_argument("target", help="Output CSV, or a directory for one file per day")
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="Rows in total (single file) or per day (directory)")
+    parser.add_argument("--routes", type=int, default=12, help="Route cardinality (default: 12)")
+    parser.add_argument("--days", type=int, default=1, help="Days covered (default: 1)")
+    parser.add_argument("--start", default="2025-11-01", help="First delivery date (YYYY-MM-DD)")
+    parser.add_argument("--dirty", type=float, default=0.01,
+                        help="Share of rows with blank/non-numeric miles (default: 0.01)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    target = Path(args.target)
+    start = date.fromisoformat(args.start)
+
+    if target.is_dir() or args.target.endswith(("/", "\\")):
+        target.mkdir(parents=True, exist_ok=True)
+        for d in range(args.days):
+            day = start + timedelta(days=d)
+            rows = generate_rows(args.rows, args.routes, day, 1, args.dirty,
+                                 seed=args.seed + d, first_id=d * args.rows + 1)
+            write_log(target / f"deliveries_{day.isoformat()}.csv", rows)
+        print(f"✔ Wrote {args.days} daily file(s) of {args.rows:,} rows to {target}")
+    else:
+        rows = generate_rows(args.rows, args.routes, start, args.days, args.dirty, seed=args.seed)
+        count = write_log(target, rows)
+        print(f"✔ Wrote {count:,} rows to {target}")
+
+
+if __name__ == "__main__":
+    main()
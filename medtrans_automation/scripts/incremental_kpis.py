@@ -0,0 +1,174 @@
+# MedTrans Incremental KPIs
+# Refreshes the summarize_csv numbers for an append-only delivery log by
+# parsing only the rows added since the last run.
+#
+# A small JSON state file keeps a byte-offset watermark plus the running
+# DeliverySummary. If the log was truncated, rotated or rewritten (new
+# inode, smaller than the watermark, or different bytes at the start of the
+# file or just before the watermark) the totals are rebuilt from the start
+# of the file.
+#
+# Usage:
+#     python3 incremental_kpis.py ../data/today.csv
+#     python3 incremental_kpis.py ../data/today.csv --state /tmp/today.kpi_state.json
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+from first_project_template import DeliverySummary, print_summary
+from kpi_rollup import REPORTS_DIR
+
+STATE_VERSION = 2
+
+# Bytes read per block; only complete lines are consumed from each block
+READ_BLOCK = 8 << 20
+
+# Bytes hashed at the start of the file and just before the watermark, to
+# recognise the same file after a rotation or a same-size rewrite
+HEAD_BYTES = 4096
+
+
+def default_state_path(log_path: Path) -> Path:
+    return REPORTS_DIR / f"{log_path.stem}.kpi_state.json"
+
+
+def _head_hash(f, length: int) -> str:
+    f.seek(0)
+    return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+
+def _tail_hash(f, offset: int) -> str:
+    """Hash of the bytes just before the watermark (appends never change them)."""
+    start = max(0, offset - HEAD_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def load_state(state_path: Path) -> dict | None:
+    if not state_path.exists():
+        return None
+    try:
+        with state_path.open("r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def save_state(state_path: Path, state: dict) -> None:
+    """Write atomically so a crash never leaves a half-written watermark."""
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, state_path)
+
+
+def _is_same_file(state: dict | None, log_path: Path, st, f) -> bool:
+    if state is None or state.get("path") != str(log_path):
+        return False
+    if (state.get("device"), state.get("inode")) != (st.st_dev, st.st_ino):
+        return False
+    if st.st_size < state.get("offset", 0):
+        return False  # truncated
+    return (_head_hash(f, state["offset"]) == state.get("head_hash")
+            and _tail_hash(f, state["offset"]) == state.get("tail_hash"))
+
+
+def update_kpis(log_path, state_path=None):
+    """
+    Fold rows appended since the last watermark into the stored summary.
+    Returns (summary, new_rows, rebuilt).
+    """
+    log_path = Path(log_path).resolve()
+    state_path = Path(state_path) if state_path else default_state_path(log_path)
+
+    if not log_path.exists():
+        raise FileNotFoundError(f"File not found: {log_path}")
+
+    state = load_state(state_path)
+    st = log_path.stat()
+
+    with log_path.open("rb") as f:
+        rebuilt = not _is_same_file(state, log_path, st, f)
+
+        if rebuilt:
+            summary = DeliverySummary(path=str(log_path))
+            offset = 0
+        else:
+            summary = DeliverySummary.from_dict(state["summary"])
+            offset = state["offset"]
+
+        rows_before = summary.total_rows
+        f.seek(offset)
+
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                break
+
+            # only complete lines; a partially written row waits for the next run
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:
+                if len(block) < READ_BLOCK:
+                    break
+                # a single line longer than the block: keep reading
+                more = f.readline()
+                if not more.endswith(b"\n"):
+                    break
+                block += more
+                cut = len(block)
+
+            f.seek(offset + cut)
+            text = block[:cut].decode("utf-8")
+
+            if offset == 0:
+                reader = csv.DictReader(io.StringIO(text, newline=""))
+                summary.columns = list(reader.fieldnames or [])
+            else:
+                reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=summary.columns)
+
+            summary.add_rows(reader)
+            offset += cut
+
+        state = {
+            "version": STATE_VERSION,
+            "path": str(log_path),
+            "device": st.st_dev,
+            "inode": st.st_ino,
+            "offset": offset,
+            "head_hash": _head_hash(f, offset),
+            "tail_hash": _tail_hash(f, offset),
+            "summary": summary.to_dict(),
+        }
+
+    save_state(state_path, state)
+    return summary, summary.total_rows - rows_before, rebuilt
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incremental MedTrans KPI refresh for a growing delivery log")
+    parser.add_argument("csv_path")
+    parser.add_argument("--state", default=None,
+                        help="State file (default: medtrans_automation/reports/<log>.kpi_state.json)")
+    args = parser.parse_args()
+
+    summary, new_rows, rebuilt = update_kpis(args.csv_path, args.state)
+
+    if rebuilt:
+        print(f"[info] Rebuilt totals from the start of the log ({new_rows} rows).")
+    else:
+        print(f"[info] Parsed {new_rows} new row(s) since the last run.")
+
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
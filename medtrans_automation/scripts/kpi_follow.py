@@ -0,0 +1,220 @@
+# MedTrans Live KPI Follower
+# Tails one or more delivery CSVs as rows are appended and keeps
+# near-real-time KPIs in memory:
+#   - running totals since start (the summarize_csv DeliverySummary)
+#   - a rolling window (default: last hour) of on-time rate and
+#     per-route deliveries / mileage
+# A JSON snapshot is written to medtrans_automation/reports/ every
+# --interval seconds, and once more on shutdown (Ctrl+C).
+#
+# Usage:
+#     python3 kpi_follow.py ../data/depot_east.csv ../data/depot_west.csv \
+#         --interval 30 --window 3600
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+
+from first_project_template import DeliverySummary, RouteStats, parse_miles
+from kpi_rollup import REPORTS_DIR
+
+# Bytes read per block, so --from-start never loads a whole file at once
+READ_BLOCK = 8 << 20
+
+
+class RollingWindow:
+    """Per-route KPIs over the rows that arrived in the last `seconds`."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.rows = deque()  # (arrival time, route, miles, status)
+        self.route_stats = defaultdict(RouteStats)
+
+    def _apply(self, route: str, miles: float, status: str, sign: int) -> None:
+        stats = self.route_stats[route]
+        stats.count += sign
+        stats.total_miles += sign * miles
+        if status == "yes":
+            stats.on_time += sign
+        elif status == "no":
+            stats.late += sign
+        if stats.count == 0:
+            del self.route_stats[route]
+
+    def add(self, row: dict, now: float) -> None:
+        route = (row.get("route", "UNKNOWN") or "").strip()
+        status = (row.get("delivered_on_time") or "").strip().lower()
+        miles = parse_miles(row.get("miles"))
+
+        self.rows.append((now, route, miles, status))
+        self._apply(route, miles, status, +1)
+
+    def evict(self, now: float) -> None:
+        cutoff = now - self.seconds
+        while self.rows and self.rows[0][0] < cutoff:
+            _, route, miles, status = self.rows.popleft()
+            self._apply(route, miles, status, -1)
+
+    def snapshot(self) -> dict:
+        on_time = sum(s.on_time for s in self.route_stats.values())
+        late = sum(s.late for s in self.route_stats.values())
+        return {
+            "window_seconds": self.seconds,
+            "deliveries": len(self.rows),
+            "on_time": on_time,
+            "late": late,
+            "on_time_rate": (on_time / (on_time + late)) * 100 if on_time + late else 0.0,
+            "routes": {
+                route: {
+                    "count": s.count,
+                    "total_miles": round(s.total_miles, 2),
+                    "avg_miles": round(s.avg_miles, 2),
+                    "on_time_rate": round(s.on_time_rate, 1),
+                }
+                for route, s in sorted(self.route_stats.items())
+            },
+        }
+
+
+class LiveKpis:
+    def __init__(self, window_seconds: float):
+        self.totals = DeliverySummary(path="live")
+        self.window = RollingWindow(window_seconds)
+        self.files = {}
+
+    def add_rows(self, rows, source: str) -> None:
+        now = time.time()
+        count = 0
+        for row in rows:
+            self.totals.add_row(row)
+            self.window.add(row, now)
+            count += 1
+        self.files[source] = self.files.get(source, 0) + count
+
+    def snapshot(self) -> dict:
+        self.window.evict(time.time())
+        return {
+            "generated": datetime.now().isoformat(),
+            "files": self.files,
+            "rolling": self.window.snapshot(),
+            "since_start": self.totals.to_dict(),
+        }
+
+
+def write_snapshot(kpis: LiveKpis, output_file: Path) -> None:
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_name(output_file.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(kpis.snapshot(), f, indent=2)
+    os.replace(tmp, output_file)
+
+
+async def follow_csv(path: Path, kpis: LiveKpis, poll: float, from_start: bool) -> None:
+    """Tail one CSV, feeding each complete appended row into kpis; survives rotation."""
+    while True:
+        while not path.exists():
+            await asyncio.sleep(poll)
+
+        with path.open("rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            header = f.readline()
+            while not header.endswith(b"\n"):
+                await asyncio.sleep(poll)
+                header += f.readline()
+            columns = next(csv.reader([header.decode("utf-8")]))
+
+            # when joining mid-row, drop bytes up to the next newline
+            skip_partial = False
+            if not from_start:
+                end = f.seek(0, os.SEEK_END)
+                if end > len(header):
+                    f.seek(end - 1)
+                    skip_partial = f.read(1) != b"\n"
+            pending = b""
+
+            while True:
+                chunk = f.read(READ_BLOCK)
+                if chunk:
+                    pending += chunk
+                    if skip_partial:
+                        newline = pending.find(b"\n")
+                        if newline < 0:
+                            pending = b""
+                            continue
+                        pending, skip_partial = pending[newline + 1:], False
+                    cut = pending.rfind(b"\n") + 1
+                    if cut:
+                        text, pending = pending[:cut].decode("utf-8"), pending[cut:]
+                        reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=columns)
+                        kpis.add_rows(reader, str(path))
+                    # let the other files' followers run between blocks
+                    await asyncio.sleep(0)
+                    continue
+
+                await asyncio.sleep(poll)
+
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    break  # rotated away: wait for the new file
+                if st.st_ino != inode or st.st_size < f.tell():
+                    break  # replaced or truncated: reopen
+
+        # a rotated-in file is new data, read it from the top
+        from_start = True
+
+
+async def snapshot_loop(kpis: LiveKpis, output_file: Path, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        write_snapshot(kpis, output_file)
+
+
+async def run(paths, output_file: Path, interval: float, window: float,
+              poll: float, from_start: bool) -> None:
+    kpis = LiveKpis(window)
+    tasks = [asyncio.create_task(follow_csv(p, kpis, poll, from_start)) for p in paths]
+    tasks.append(asyncio.create_task(snapshot_loop(kpis, output_file, interval)))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        write_snapshot(kpis, output_file)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Follow MedTrans delivery CSVs and keep live KPIs")
+    parser.add_argument("csv_paths", nargs="+")
+    parser.add_argument("--interval", type=float, default=60.0,
+                        help="Seconds between snapshots (default: 60)")
+    parser.add_argument("--window", type=float, default=3600.0,
+                        help="Rolling window in seconds (default: 3600)")
+    parser.add_argument("--poll", type=float, default=1.0,
+                        help="Seconds between checks for new rows (default: 1)")
+    parser.add_argument("--from-start", action="store_true",
+                        help="Count rows already in the files instead of only new ones")
+    parser.add_argument("--output", default=str(REPORTS_DIR / "kpi_live_snapshot.json"),
+                        help="Snapshot file (default: medtrans_automation/reports/kpi_live_snapshot.json)")
+    args = parser.parse_args()
+
+    paths = [Path(p).resolve() for p in args.csv_paths]
+    print(f"Following {len(paths)} file(s); snapshots every {args.interval:g}s -> {args.output}")
+
+    try:
+        asyncio.run(run(paths, Path(args.output), args.interval, args.window,
+                        args.poll, args.from_start))
+    except KeyboardInterrupt:
+        print("\nStopped; final snapshot written.")
+
+
+if __name__ == "__main__":
+    main()
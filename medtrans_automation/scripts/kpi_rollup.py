@@ -0,0 +1,182 @@
+# MedTrans KPI Rollup
+# Aggregates many daily / per-depot delivery CSVs in a process pool and
+# writes daily and weekly KPI reports.
+#
+# Each file is folded into one DeliverySummary per delivery date; partial
+# summaries merge associatively, so files can be processed in any order
+# on any number of cores.
+#
+# Usage:
+#     python3 kpi_rollup.py                      # every *.csv under data/
+#     python3 kpi_rollup.py "2025-11-*.csv" --workers 8
+#     python3 kpi_rollup.py ../data/depot_east   # a directory
+
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from first_project_template import DeliverySummary, iter_row_chunks
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+REPORTS_DIR = BASE_DIR / "reports"
+
+
+def resolve_inputs(pattern: str) -> list:
+    """
+    Expand a directory or glob into a sorted list of CSV paths.
+    Relative patterns are looked up under medtrans_automation/data/.
+    """
+    path = Path(pattern)
+    if not path.is_absolute():
+        path = DATA_DIR / path
+
+    if path.is_dir():
+        return sorted(path.glob("*.csv"))
+    if path.is_file():
+        return [path]
+
+    return sorted(p for p in path.parent.glob(path.name) if p.is_file())
+
+
+def aggregate_file_by_date(file_path) -> dict:
+    """Worker: stream one CSV into {delivery date: DeliverySummary}."""
+    by_date = {}
+
+    with open(file_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns = list(reader.fieldnames or [])
+
+        for chunk in iter_row_chunks(reader):
+            for row in chunk:
+                day = (row.get("date") or "").strip() or "UNKNOWN"
+                summary = by_date.get(day)
+                if summary is None:
+                    summary = by_date[day] = DeliverySummary(path=str(file_path), columns=columns)
+                summary.add_row(row)
+
+    return by_date
+
+
+def merge_partials(partials) -> dict:
+    """Merge {period: DeliverySummary} mappings into one (associative)."""
+    merged = {}
+    for partial in partials:
+        for period, summary in partial.items():
+            if period in merged:
+                merged[period].merge(summary)
+            else:
+                merged[period] = summary
+    return merged
+
+
+def rollup_daily(paths, workers=None) -> dict:
+    """Aggregate every file in a process pool into per-date summaries."""
+    if workers == 1 or len(paths) <= 1:
+        return merge_partials(aggregate_file_by_date(p) for p in paths)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_partials(pool.map(aggregate_file_by_date, paths))
+
+
+def week_label(day: str) -> str:
+    """ISO week label (e.g. 2025-W47) for a YYYY-MM-DD date."""
+    try:
+        year, week, _ = date.fromisoformat(day).isocalendar()
+    except ValueError:
+        return "UNKNOWN"
+    return f"{year}-W{week:02d}"
+
+
+def rollup_weekly(daily: dict) -> dict:
+    weekly = {}
+    for day, summary in daily.items():
+        label = week_label(day)
+        if label not in weekly:
+            weekly[label] = DeliverySummary(columns=list(summary.columns))
+        weekly[label].merge(summary)
+    return weekly
+
+
+def write_kpi_report(periods: dict, output_base: Path, period_name: str, title: str) -> tuple:
+    """
+    Write <output_base>.csv (one row per period and route) and
+    <output_base>.md, headed "MedTrans <title> KPI Report".
+    """
+    output_base.parent.mkdir(parents=True, exist_ok=True)
+    csv_path = output_base.with_suffix(".csv")
+    md_path = output_base.with_suffix(".md")
+
+    with csv_path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([period_name, "route", "deliveries", "total_miles", "avg_miles",
+                         "on_time", "late", "on_time_rate"])
+
+        for period in sorted(periods):
+            summary = periods[period]
+            writer.writerow([period, "ALL", summary.total_rows,
+                             f"{sum(s.total_miles for s in summary.route_stats.values()):.2f}",
+                             "", summary.on_time, summary.late, f"{summary.on_time_rate:.1f}"])
+            for route in sorted(summary.route_stats):
+                s = summary.route_stats[route]
+                writer.writerow([period, route, s.count, f"{s.total_miles:.2f}", f"{s.avg_miles:.2f}",
+                                 s.on_time, s.late, f"{s.on_time_rate:.1f}"])
+
+    with md_path.open("w", encoding="utf-8") as f:
+        f.write(f"# MedTrans {title} KPI Report\n\n")
+        f.write(f"| {period_name.title()} | Deliveries | On-time | Late | On-time rate | Busiest route |\n")
+        f.write("|---|---|---|---|---|---|\n")
+
+        for period in sorted(periods):
+            summary = periods[period]
+            busiest = summary.busiest_route
+            busiest_text = f"{busiest[0]} ({busiest[1]})" if busiest else "-"
+            f.write(f"| {period} | {summary.total_rows} | {summary.on_time} | {summary.late} "
+                    f"| {summary.on_time_rate:.1f}% | {busiest_text} |\n")
+
+    return csv_path, md_path
+
+
+def positive_int(value: str) -> int:
+    """argparse type for --workers."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, not {value!r}")
+    return number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MedTrans daily/weekly KPI rollup")
+    parser.add_argument("pattern", nargs="?", default="*.csv",
+                        help="Directory or glob of delivery CSVs (relative to medtrans_automation/data/)")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count(),
+                        help="Processes used to aggregate files (default: all cores)")
+    parser.add_argument("--reports-dir", default=str(REPORTS_DIR),
+                        help="Where the KPI reports are written (default: medtrans_automation/reports/)")
+    args = parser.parse_args()
+
+    paths = resolve_inputs(args.pattern)
+    if not paths:
+        print(f"[ERROR] No CSV files matched: {args.pattern}")
+        return
+
+    daily = rollup_daily(paths, args.workers)
+    weekly = rollup_weekly(daily)
+
+    reports_dir = Path(args.reports_dir)
+    outputs = write_kpi_report(daily, reports_dir / "daily_kpis", "date", "Daily")
+    outputs += write_kpi_report(weekly, reports_dir / "weekly_kpis", "week", "Weekly")
+
+    print(f"✔ Rolled up {len(paths)} file(s): {len(daily)} day(s), {len(weekly)} week(s).")
+    for path in outputs:
+        print("Report:", path)
+
+
+if __name__ == "__main__":
+    main()
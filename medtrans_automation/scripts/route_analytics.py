@@ -0,0 +1,224 @@
+# MedTrans Route Analytics – columnar backend
+# Reads route, miles and delivered_on_time into typed arrays and computes
+# per-route count, total/mean miles, mileage percentiles and on-time rate
+# with grouped vectorized reductions.
+#
+# NumPy (and pandas, for faster CSV parsing) are optional: without them
+# the same numbers come from a pure-Python pass. The default "auto" backend
+# only takes the columnar path when pandas is there to parse the CSV; the
+# csv module feeding NumPy is no faster than the pure-Python pass.
+#
+# Usage:
+#     python3 route_analytics.py sample.csv
+
+import argparse
+import csv
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+from first_project_template import parse_miles
+
+PERCENTILES = (50, 90, 95)
+
+# Columns read, with the value a file without that column gives every row
+# (the csv.DictReader row.get() defaults used by the pure-Python pass)
+COLUMN_DEFAULTS = {"route": "UNKNOWN", "miles": "", "delivered_on_time": ""}
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    """Linear-interpolation percentile (NumPy's default method)."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _route_result(count, total_miles, on_time, late, percentiles) -> dict:
+    with_status = on_time + late
+    return {
+        "count": int(count),
+        "total_miles": float(total_miles),
+        "mean_miles": float(total_miles) / count if count else 0.0,
+        **{f"p{q}_miles": float(v) for q, v in zip(PERCENTILES, percentiles)},
+        "on_time": int(on_time),
+        "late": int(late),
+        "on_time_rate": (on_time / with_status) * 100 if with_status else 0.0,
+    }
+
+
+# ---------------------------
+# COLUMN LOADING
+# ---------------------------
+
+def _read_text_columns(file_path) -> dict:
+    """
+    The stripped text of each COLUMN_DEFAULTS column, as lists. Rows are
+    read as csv.DictReader reads them (blank lines skipped, short rows
+    padded with "", missing columns filled with their default), but as
+    plain lists, without building a dict per row.
+    """
+    if pd is not None:
+        df = pd.read_csv(file_path, usecols=lambda c: c in COLUMN_DEFAULTS, dtype=str, keep_default_na=False)
+        return {
+            name: (df[name].fillna("").str.strip() if name in df.columns
+                   else pd.Series(default, index=df.index, dtype=object)).tolist()
+            for name, default in COLUMN_DEFAULTS.items()
+        }
+
+    with open(file_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        position = {name: i for i, name in enumerate(header)}  # a repeated name: the last one wins
+        rows = [row for row in reader if row]
+
+    width = len(header)
+    for row in rows:
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+
+    text = {}
+    for name, default in COLUMN_DEFAULTS.items():
+        if name in position:
+            i = position[name]
+            text[name] = [row[i].strip() for row in rows]
+        else:
+            text[name] = [default] * len(rows)
+    return text
+
+
+def load_columns(file_path):
+    """
+    Return (routes, miles, status) for a delivery CSV:
+    routes as strings, miles as float64 (parse_miles: blank / bad values
+    -> 0.0, "nan" stays NaN) and status as int8 (1 = on time, 0 = late,
+    -1 = unknown). pandas, when installed, only speeds up reading the CSV;
+    the values are converted the same way either way.
+    """
+    text = _read_text_columns(file_path)
+    routes, miles_raw = text["route"], text["miles"]
+    status_raw = [s.lower() for s in text["delivered_on_time"]]
+
+    miles_text = np.array(miles_raw, dtype=str)
+    try:
+        miles = np.where(miles_text == "", "0", miles_text).astype("float64")
+    except ValueError:
+        # dirty values somewhere in the column: convert element-wise once
+        miles = np.fromiter((parse_miles(m) for m in miles_raw), dtype="float64", count=len(miles_raw))
+
+    status_text = np.array(status_raw, dtype=str)
+    status = np.where(status_text == "yes", 1, np.where(status_text == "no", 0, -1)).astype("int8")
+    return np.array(routes, dtype=str), miles, status
+
+
+# ---------------------------
+# ANALYTICS
+# ---------------------------
+
+def route_analytics_numpy(routes, miles, status) -> dict:
+    """Grouped reductions over typed columns; one entry per route."""
+    if len(routes) == 0:
+        return {}
+
+    names, codes = np.unique(routes, return_inverse=True)
+    n_routes = len(names)
+
+    counts = np.bincount(codes, minlength=n_routes)
+    totals = np.bincount(codes, weights=miles, minlength=n_routes)
+    on_time = np.bincount(codes, weights=(status == 1), minlength=n_routes)
+    late = np.bincount(codes, weights=(status == 0), minlength=n_routes)
+
+    # percentiles: sort by (route, miles) once, then interpolate inside each group
+    order = np.lexsort((miles, codes))
+    sorted_miles = miles[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    pct = []
+    for q in PERCENTILES:
+        pos = (counts - 1) * (q / 100)
+        lo = np.floor(pos).astype("int64")
+        hi = np.minimum(lo + 1, counts - 1)
+        frac = pos - lo
+        lo_vals = sorted_miles[starts + lo]
+        hi_vals = sorted_miles[starts + hi]
+        pct.append(lo_vals + (hi_vals - lo_vals) * frac)
+
+    return {
+        str(names[i]): _route_result(counts[i], totals[i], on_time[i], late[i],
+                                     [p[i] for p in pct])
+        for i in range(n_routes)
+    }
+
+
+def route_analytics_python(file_path) -> dict:
+    """Pure-Python equivalent of route_analytics_numpy."""
+    miles_by_route = defaultdict(list)
+    status_by_route = defaultdict(lambda: [0, 0])
+
+    with open(file_path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            route = (row.get("route", "UNKNOWN") or "").strip()
+            miles_by_route[route].append(parse_miles(row.get("miles")))
+            status = (row.get("delivered_on_time") or "").strip().lower()
+            if status == "yes":
+                status_by_route[route][0] += 1
+            elif status == "no":
+                status_by_route[route][1] += 1
+
+    results = {}
+    for route in sorted(miles_by_route):
+        values = sorted(miles_by_route[route])
+        on_time, late = status_by_route[route]
+        results[route] = _route_result(len(values), sum(values), on_time, late,
+                                       [_percentile(values, q) for q in PERCENTILES])
+    return results
+
+
+def route_analytics(file_path, backend: str = "auto") -> dict:
+    """
+    Per-route analytics for a delivery CSV, sorted by route name.
+    backend: "auto" (NumPy when NumPy and pandas are installed), "numpy"
+    or "python".
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"File not found: {path}")
+
+    if backend == "numpy" and np is None:
+        raise ImportError("The numpy backend needs NumPy installed (pip install numpy).")
+
+    if backend == "python" or np is None or (backend == "auto" and pd is None):
+        return route_analytics_python(path)
+
+    return route_analytics_numpy(*load_columns(path))
+
+
+def print_route_analytics(results: dict) -> None:
+    print("\nRoute Analytics:")
+    print("  Route       Count   Avg Miles   P50     P90     P95     On-time")
+    print("  ---------   -----   ---------   -----   -----   -----   -------")
+    for route, r in results.items():
+        print(f"  {route:<10} {r['count']:<7} {r['mean_miles']:>9.2f}   "
+              f"{r['p50_miles']:<7.1f} {r['p90_miles']:<7.1f} {r['p95_miles']:<7.1f} "
+              f"{r['on_time_rate']:>6.1f}%")
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MedTrans per-route analytics")
+    parser.add_argument("csv_path", nargs="?", default="sample.csv")
+    parser.add_argument("--backend", choices=["auto", "numpy", "python"], default="auto")
+    args = parser.parse_args()
+
+    print_route_analytics(route_analytics(args.csv_path, args.backend))
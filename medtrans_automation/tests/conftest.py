@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the MedTrans scripts are plain scripts that import each other by module name
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS))
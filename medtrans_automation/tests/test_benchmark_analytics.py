@@ -0,0 +1,62 @@
+import contextlib
+import csv
+import io
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+import benchmark_analytics
+from generate_delivery_logs import COLUMNS, DIRTY_MILES, generate_rows, write_log
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "deliveries.csv"
+    write_log(path, generate_rows(400, routes=10, days=4))
+    return path
+
+
+def test_generated_rows_follow_the_sample_schema(tmp_path):
+    path = tmp_path / "deliveries.csv"
+    assert write_log(path, generate_rows(5000, routes=7, start=date(2025, 11, 3), days=5, dirty=0.1)) == 5000
+
+    with path.open(newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == COLUMNS
+        rows = list(reader)
+
+    assert [int(r["delivery_id"]) for r in rows] == list(range(1, 5001))
+    assert {r["date"] for r in rows} == {f"2025-11-0{d}" for d in range(3, 8)}
+    assert {r["route"] for r in rows} <= {f"Route {i:03d}" for i in range(1, 8)}
+    assert {r["delivered_on_time"] for r in rows} <= {"yes", "no", ""}
+
+    dirty = sum(1 for r in rows if r["miles"] in DIRTY_MILES)
+    assert 0.07 < dirty / len(rows) < 0.13
+    assert list(generate_rows(50, seed=3)) == list(generate_rows(50, seed=3))
+
+
+def test_paths_import_only_what_they_use(log):
+    code = (
+        "import sys, benchmark_analytics as b; "
+        "before = set(sys.modules); "
+        f"b.BENCHMARKS['summarize_csv']({str(log)!r}); "
+        "print(sorted(m for m in ('first_project_template', 'route_analytics', 'kpi_rollup', "
+        "'incremental_kpis', 'generate_delivery_logs', 'numpy', 'pandas') if m in sys.modules)); "
+        "print('first_project_template' in before)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=benchmark_analytics.SCRIPTS_DIR,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.split("\n")[:2] == ["['first_project_template']", "False"]
+
+
+def test_every_path_runs_cold_and_warm(log):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = benchmark_analytics.run_benchmarks(log, repeat=1)
+
+    assert [r["path"] for r in results] == list(benchmark_analytics.BENCHMARKS)
+    for r in results:
+        assert r["rows"] == 400
+        assert r["cold_s"] > 0 and r["warm_s"] > 0 and r["rows_per_s"] > 0
+        assert r["peak_traced_bytes"] > 0
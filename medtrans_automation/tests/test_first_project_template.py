@@ -0,0 +1,61 @@
+import contextlib
+import csv
+import io
+from collections import defaultdict
+
+import pytest
+
+from first_project_template import aggregate_csv, parse_miles, summarize_csv
+from generate_delivery_logs import generate_rows, write_log
+
+
+def full_load(path):
+    """The original summarize_csv numbers: every row read into a list first."""
+    with path.open("r", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    on_time = sum(1 for r in rows if (r["delivered_on_time"] or "").strip().lower() == "yes")
+    late = sum(1 for r in rows if (r["delivered_on_time"] or "").strip().lower() == "no")
+    routes = defaultdict(lambda: [0, 0.0])
+    for r in rows:
+        stats = routes[r["route"].strip()]
+        stats[0] += 1
+        stats[1] += parse_miles(r["miles"])
+    return len(rows), on_time, late, dict(routes)
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "deliveries.csv"
+    write_log(path, generate_rows(2500, routes=15, days=3, dirty=0.05))
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000, 10_000])
+def test_streaming_matches_full_load(log, chunk_size):
+    total, on_time, late, routes = full_load(log)
+    summary = aggregate_csv(log, chunk_size)
+
+    assert (summary.total_rows, summary.on_time, summary.late) == (total, on_time, late)
+    assert summary.columns == ["delivery_id", "date", "route", "miles", "delivered_on_time"]
+    assert list(summary.route_stats) == list(routes)
+    for route, (count, miles) in routes.items():
+        assert summary.route_stats[route].count == count
+        assert summary.route_stats[route].total_miles == pytest.approx(miles)
+
+
+def test_printed_report_does_not_depend_on_chunking(log):
+    outputs = []
+    for chunk_size in (3, 10_000):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            assert summarize_csv(str(log), chunk_size) is not None
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    assert "Route with most deliveries" in outputs[0]
+
+
+def test_header_only_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("delivery_id,date,route,miles,delivered_on_time\n", encoding="utf-8")
+    summary = aggregate_csv(path)
+    assert summary.total_rows == 0 and summary.busiest_route is None
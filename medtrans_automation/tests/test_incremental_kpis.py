@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import incremental_kpis
+from first_project_template import aggregate_csv
+from generate_delivery_logs import COLUMNS, generate_rows
+
+
+def csv_lines(rows):
+    return "".join(",".join(str(v) for v in row) + "\n" for row in rows)
+
+
+HEADER = ",".join(COLUMNS) + "\n"
+ROWS = list(generate_rows(600, routes=6, dirty=0.05))
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "today.csv"
+    path.write_text(HEADER + csv_lines(ROWS[:200]), encoding="utf-8")
+    return path
+
+
+def update(log):
+    return incremental_kpis.update_kpis(log, log.with_suffix(".state.json"))
+
+
+def assert_matches_full_parse(summary, log):
+    full = aggregate_csv(log)
+    assert (summary.total_rows, summary.on_time, summary.late) == (full.total_rows, full.on_time, full.late)
+    assert summary.columns == full.columns
+    for route, stats in full.route_stats.items():
+        mine = summary.route_stats[route]
+        assert (mine.count, mine.on_time, mine.late) == (stats.count, stats.on_time, stats.late)
+        assert mine.total_miles == pytest.approx(stats.total_miles)
+
+
+def test_appended_rows_only(log, monkeypatch):
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (200, True)
+
+    with log.open("a", encoding="utf-8") as f:
+        f.write(csv_lines(ROWS[200:450]))
+    monkeypatch.setattr(incremental_kpis, "READ_BLOCK", 1000)  # several blocks per run
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (250, False)
+    assert_matches_full_parse(summary, log)
+
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (0, False)
+
+
+def test_partial_row_waits_for_its_newline(log):
+    update(log)
+    line = csv_lines(ROWS[200:201])
+    with log.open("a", encoding="utf-8") as f:
+        f.write(line[:5])
+    assert update(log)[1:] == (0, False)
+
+    with log.open("a", encoding="utf-8") as f:
+        f.write(line[5:])
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (1, False)
+    assert_matches_full_parse(summary, log)
+
+
+def test_truncated_log_is_rebuilt(log):
+    update(log)
+    log.write_text(HEADER + csv_lines(ROWS[300:350]), encoding="utf-8")
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (50, True)
+    assert_matches_full_parse(summary, log)
+
+
+@pytest.mark.parametrize("keep_head", [False, True], ids=["new-head", "same-head"])
+def test_same_size_rewrite_is_rebuilt(log, keep_head):
+    update(log)
+    before = log.read_bytes()
+    inode = os.stat(log).st_ino
+
+    # rewritten in place (same inode, same size); with keep_head the first
+    # HEAD_BYTES are unchanged as well, only rows near the end differ
+    raw = bytearray(before)
+    at = len(raw) - 40 if keep_head else len(HEADER) + 2
+    raw[at:at + 3] = b"yes" if raw[at:at + 3] != b"yes" else b"abc"
+    with log.open("r+b") as f:
+        f.write(raw)
+    assert os.stat(log).st_ino == inode and log.stat().st_size == len(before)
+    assert (bytes(raw[:incremental_kpis.HEAD_BYTES]) == before[:incremental_kpis.HEAD_BYTES]) == keep_head
+
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (200, True)
+    assert_matches_full_parse(summary, log)
+
+
+def test_rotated_log_is_rebuilt(log):
+    update(log)
+    rotated = log.with_name("today.csv.new")
+    rotated.write_text(log.read_text(encoding="utf-8") + csv_lines(ROWS[200:210]), encoding="utf-8")
+    os.replace(rotated, log)
+
+    summary, new_rows, rebuilt = update(log)
+    assert (new_rows, rebuilt) == (210, True)
+    assert_matches_full_parse(summary, log)
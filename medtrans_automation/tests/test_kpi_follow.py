@@ -0,0 +1,104 @@
+import asyncio
+
+import kpi_follow
+from first_project_template import aggregate_csv
+from generate_delivery_logs import COLUMNS, generate_rows
+
+HEADER = ",".join(COLUMNS) + "\n"
+TEXT = "".join(",".join(str(v) for v in row) + "\n" for row in generate_rows(120, routes=5, dirty=0.05))
+
+POLL = 0.005
+
+
+async def wait_for(condition, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "follower did not catch up"
+        await asyncio.sleep(POLL)
+
+
+def follow(path, feed, from_start=True):
+    """Run follow_csv on `path` until the coroutine feed(kpis) returns; returns the LiveKpis."""
+    async def main():
+        kpis = kpi_follow.LiveKpis(3600)
+        task = asyncio.create_task(kpi_follow.follow_csv(path, kpis, POLL, from_start))
+        try:
+            await feed(kpis)
+        finally:
+            task.cancel()
+        return kpis
+
+    return asyncio.run(main())
+
+
+def append(path, text):
+    with path.open("a", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def test_rows_fed_in_increments(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_text(HEADER[:10], encoding="utf-8")  # even the header arrives in pieces
+
+    async def feed(kpis):
+        append(path, HEADER[10:])
+        for end in range(37, len(TEXT) + 37, 37):
+            append(path, TEXT[end - 37:end])
+            complete = TEXT[:end].count("\n")  # a row counts once its newline is in
+            await wait_for(lambda: kpis.totals.total_rows == complete)
+            await asyncio.sleep(POLL)
+            assert kpis.totals.total_rows == complete
+
+    kpis = follow(path, feed)
+
+    full = aggregate_csv(path)
+    assert (kpis.totals.total_rows, kpis.totals.on_time, kpis.totals.late) == \
+        (full.total_rows, full.on_time, full.late)
+    assert {r: s.count for r, s in kpis.totals.route_stats.items()} == \
+        {r: s.count for r, s in full.route_stats.items()}
+    assert kpis.window.snapshot()["deliveries"] == 120
+    assert kpis.files == {str(path): 120}
+
+
+def test_joining_mid_row_skips_to_the_next_line(tmp_path):
+    path = tmp_path / "feed.csv"
+    lines = TEXT.splitlines(keepends=True)
+    path.write_text(HEADER + "".join(lines[:10]) + lines[10][:8], encoding="utf-8")
+
+    async def feed(kpis):
+        await asyncio.sleep(POLL * 4)
+        assert kpis.totals.total_rows == 0  # rows already there are not counted
+        append(path, lines[10][8:] + "".join(lines[11:15]))
+        await wait_for(lambda: kpis.totals.total_rows == 4)
+
+    kpis = follow(path, feed, from_start=False)
+    assert kpis.files == {str(path): 4}
+
+
+def test_truncated_file_is_read_again_from_the_top(tmp_path):
+    path = tmp_path / "feed.csv"
+    lines = TEXT.splitlines(keepends=True)
+    path.write_text(HEADER + "".join(lines[:20]), encoding="utf-8")
+
+    async def truncate(kpis):
+        await wait_for(lambda: kpis.totals.total_rows == 20)
+        path.write_text(HEADER + "".join(lines[20:25]), encoding="utf-8")
+        await wait_for(lambda: kpis.totals.total_rows == 25)
+
+    follow(path, truncate)
+
+
+def test_rolling_window_evicts_old_rows():
+    window = kpi_follow.RollingWindow(60)
+    window.add({"route": "Route A", "miles": "10", "delivered_on_time": "yes"}, now=0)
+    window.add({"route": "Route B", "miles": "n/a", "delivered_on_time": "no"}, now=30)
+    window.add({"route": "Route A", "miles": "5", "delivered_on_time": "no"}, now=90)
+
+    window.evict(now=85)
+    snap = window.snapshot()
+    assert (snap["deliveries"], snap["on_time"], snap["late"]) == (2, 0, 2)
+    assert snap["routes"]["Route A"] == {"count": 1, "total_miles": 5.0, "avg_miles": 5.0, "on_time_rate": 0.0}
+
+    window.evict(now=200)
+    assert window.snapshot()["routes"] == {} and not window.route_stats
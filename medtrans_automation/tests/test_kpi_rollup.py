@@ -0,0 +1,88 @@
+import sys
+from datetime import date
+
+import pytest
+
+import kpi_rollup
+from first_project_template import aggregate_csv
+from generate_delivery_logs import generate_rows, write_log
+
+
+def as_numbers(periods):
+    """{period: (rows, on_time, late, {route: (count, miles, on_time, late)})}, miles rounded."""
+    return {
+        period: (s.total_rows, s.on_time, s.late,
+                 {route: (r.count, round(r.total_miles, 6), r.on_time, r.late)
+                  for route, r in sorted(s.route_stats.items())})
+        for period, s in periods.items()
+    }
+
+
+@pytest.fixture
+def logs(tmp_path):
+    """One week of per-depot daily files, plus the same rows as a single file."""
+    paths = []
+    everything = []
+    for day in range(7):
+        for depot in range(2):
+            rows = list(generate_rows(300, routes=8, start=date(2025, 11, 17 + day), dirty=0.03,
+                                      seed=day * 10 + depot, first_id=(day * 2 + depot) * 300 + 1))
+            path = tmp_path / f"depot{depot}_2025-11-{17 + day}.csv"
+            write_log(path, rows)
+            paths.append(path)
+            everything.extend(rows)
+    single = tmp_path / "single" / "all.csv"
+    single.parent.mkdir()
+    write_log(single, everything)
+    return sorted(paths), single
+
+
+def test_split_files_merge_like_a_single_pass(logs):
+    paths, single = logs
+    one_pass = kpi_rollup.aggregate_file_by_date(single)
+
+    serial = kpi_rollup.rollup_daily(paths, workers=1)
+    assert as_numbers(serial) == as_numbers(one_pass)
+
+    # any grouping and order of the partials gives the same totals
+    partials = [kpi_rollup.aggregate_file_by_date(p) for p in paths]
+    left = kpi_rollup.merge_partials([kpi_rollup.merge_partials(partials[:5]),
+                                      kpi_rollup.merge_partials(partials[5:])])
+    right = kpi_rollup.merge_partials(reversed([kpi_rollup.aggregate_file_by_date(p) for p in paths]))
+    assert as_numbers(left) == as_numbers(one_pass) == as_numbers(right)
+
+
+def test_pool_matches_serial(logs):
+    paths, _ = logs
+    assert as_numbers(kpi_rollup.rollup_daily(paths, workers=3)) == \
+        as_numbers(kpi_rollup.rollup_daily(paths, workers=1))
+
+
+def test_weekly_totals_match_the_whole_file(logs):
+    paths, single = logs
+    weekly = kpi_rollup.rollup_weekly(kpi_rollup.rollup_daily(paths, workers=1))
+    assert list(weekly) == ["2025-W47"]
+
+    whole = aggregate_csv(single)
+    week = weekly["2025-W47"]
+    assert (week.total_rows, week.on_time, week.late) == (whole.total_rows, whole.on_time, whole.late)
+
+
+def test_report_headings(logs, tmp_path):
+    paths, _ = logs
+    daily = kpi_rollup.rollup_daily(paths, workers=1)
+    _, daily_md = kpi_rollup.write_kpi_report(daily, tmp_path / "reports/daily_kpis", "date", "Daily")
+    _, weekly_md = kpi_rollup.write_kpi_report(kpi_rollup.rollup_weekly(daily), tmp_path / "reports/weekly_kpis",
+                                               "week", "Weekly")
+
+    assert daily_md.read_text(encoding="utf-8").startswith("# MedTrans Daily KPI Report\n\n| Date |")
+    assert weekly_md.read_text(encoding="utf-8").startswith("# MedTrans Weekly KPI Report\n\n| Week |")
+
+
+@pytest.mark.parametrize("workers", ["0", "-2", "many"])
+def test_workers_must_be_positive(monkeypatch, capsys, workers):
+    monkeypatch.setattr(sys, "argv", ["kpi_rollup.py", "--workers", workers])
+    with pytest.raises(SystemExit) as exit_info:
+        kpi_rollup.main()
+    assert exit_info.value.code == 2
+    assert "--workers: must be a positive integer" in capsys.readouterr().err
@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+import route_analytics
+
+pytest.importorskip("numpy")
+
+# blank, unparseable and "nan" miles, odd status spelling, a short row,
+# a blank line and a route written with padding
+DIRTY = (
+    "delivery_id,date,route,miles,delivered_on_time\n"
+    "1,2025-11-20,Route A,32,yes\n"
+    "2,2025-11-20, Route A ,n/a,No\n"
+    "3,2025-11-20,Route B,nan,YES\n"
+    "4,2025-11-21,Route B, 12.5 ,\n"
+    "\n"
+    "5,2025-11-21,Route C,,maybe\n"
+    "6,2025-11-21,Route C\n"
+    "7,2025-11-22,Route A,18,yes\n"
+)
+
+NO_MILES = (
+    "delivery_id,route,delivered_on_time\n"
+    "1,Route A,yes\n"
+    "2,Route B,no\n"
+)
+
+
+def assert_same(left, right):
+    assert list(left) == list(right)
+    for route in left:
+        for key, value in left[route].items():
+            other = right[route][key]
+            assert (math.isnan(value) and math.isnan(other)) or value == pytest.approx(other), (route, key)
+
+
+def csv_numpy(monkeypatch, path):
+    """The NumPy backend reading the CSV with the csv module (as without pandas)."""
+    with monkeypatch.context() as m:
+        m.setattr(route_analytics, "pd", None)
+        return route_analytics.route_analytics(path, "numpy")
+
+
+@pytest.mark.parametrize("content", [DIRTY, NO_MILES], ids=["dirty", "no-miles-column"])
+def test_backends_agree(tmp_path, monkeypatch, content):
+    path = tmp_path / "deliveries.csv"
+    path.write_text(content, encoding="utf-8")
+    assert_same(csv_numpy(monkeypatch, path), route_analytics.route_analytics(path, "python"))
+
+
+@pytest.mark.parametrize("content", [DIRTY, NO_MILES], ids=["dirty", "no-miles-column"])
+def test_pandas_backend_agrees(tmp_path, monkeypatch, content):
+    pytest.importorskip("pandas")
+    path = tmp_path / "deliveries.csv"
+    path.write_text(content, encoding="utf-8")
+
+    python = route_analytics.route_analytics(path, "python")
+    assert_same(route_analytics.route_analytics(path, "numpy"), python)
+    assert_same(csv_numpy(monkeypatch, path), python)
+
+
+def test_auto_needs_pandas_for_the_columnar_path(tmp_path, monkeypatch):
+    path = tmp_path / "deliveries.csv"
+    path.write_text(DIRTY, encoding="utf-8")
+    monkeypatch.setattr(route_analytics, "pd", None)
+    monkeypatch.setattr(route_analytics, "load_columns", None)  # would fail if called
+    assert_same(route_analytics.route_analytics(path), route_analytics.route_analytics(path, "python"))
+
+
+def test_dirty_values(tmp_path):
+    path = tmp_path / "deliveries.csv"
+    path.write_text(DIRTY, encoding="utf-8")
+    results = route_analytics.route_analytics(path, "python")
+
+    assert results["Route A"]["count"] == 3 and results["Route A"]["total_miles"] == 50.0
+    assert math.isnan(results["Route B"]["total_miles"])
+    assert (results["Route B"]["on_time"], results["Route B"]["late"]) == (1, 0)
+    assert results["Route C"]["count"] == 2 and results["Route C"]["on_time_rate"] == 0.0
+
@@ -0,0 +1,282 @@
+"""
+UTM Tagger Benchmark Suite
+Generates synthetic `Book C:V | text` corpora and times each pipeline stage:
+
+- score_themes (substring matcher and whole-word TokenScorer)
+- process_scripture_file
+- v4 writers (save_json, save_markdown, save_csv, save_text, and all four
+  at once on background writer threads)
+- v5 exporters (markdown report, slide outline, social snippets)
+- Phase 6 filter_by_themes
+
+For every stage it records wall/CPU time, throughput (verses/s), memory
+and, with --trace-alloc, the peak bytes allocated during the stage. Results
+are written to a JSON file so two runs can be diffed.
+
+Memory is the stage's own RSS high-water mark: on Linux the process peak is
+reset before each stage (/proc/self/clear_refs), so peak_rss_kb is the most
+the process held while that stage ran, next to start_rss_kb at its start.
+Where the peak cannot be reset, those are null and process_max_rss_kb gives
+getrusage's ru_maxrss instead. That is the peak over the whole process
+lifetime so far: it only ever grows from stage to stage, so it is not a
+per-stage figure and is only comparable between identical runs.
+
+--check-startup instead times each CLI entry point (`--help`) in fresh
+interpreters and exits non-zero if any exceeds the startup budget, measured
+as milliseconds over a bare `python -c pass`. The test suite enforces the
+budget itself (tests/test_startup.py); this is the interactive report.
+
+Usage:
+
+    python3 benchmark_tagger.py                          # 1k + 100k verses
+    python3 benchmark_tagger.py --sizes 1000,100000,1000000 --density 0.3
+    python3 benchmark_tagger.py --output bench_before.json --trace-alloc
+    python3 benchmark_tagger.py --check-startup --startup-budget 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import scripture_tagger_v3 as v3
+import scripture_tagger_v4 as v4
+import scripture_tagger_v5 as v5
+import study_pack_builder as phase6
+
+BOOKS = ["Genesis", "Exodus", "Leviticus", "Deuteronomy", "Isaiah", "Jeremiah",
+         "Hosea", "Amos", "Psalms", "Matthew", "John", "Revelation"]
+
+# Entry points held to the startup budget
+STARTUP_COMMANDS = [
+    ["scripture_tagger_v4.py", "--help"],
+    ["scripture_tagger_v5.py", "--help"],
+    ["study_pack_builder.py", "--help"],
+]
+
+# Allowed milliseconds over a bare interpreter start (--help measures
+# 25-75 ms depending on machine load, so the default leaves 2x headroom)
+STARTUP_BUDGET_MS = 150
+
+FILLER = ("and the of unto them that he said in his all thou shall be for "
+          "with not this upon thee thy is which from before were house land "
+          "hand went made say son man children day heart").split()
+
+
+def generate_corpus(path: Path, verses: int, keyword_density: float = 0.2, seed: int = 7) -> None:
+    """
+    Write a synthetic verse file. keyword_density is the chance that any
+    given word is drawn from THEME_KEYWORDS instead of plain filler.
+    """
+    rng = random.Random(seed)
+    keywords = [k for ks in v3.THEME_KEYWORDS.values() for k in ks]
+
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(verses):
+            book = BOOKS[i % len(BOOKS)]
+            chapter = 1 + (i // 40) % 150
+            verse = 1 + i % 40
+            words = [
+                rng.choice(keywords) if rng.random() < keyword_density else rng.choice(FILLER)
+                for _ in range(rng.randint(8, 30))
+            ]
+            words[0] = words[0].capitalize()
+            f.write(f"{book} {chapter}:{verse} | {' '.join(words)}.\n")
+
+
+def _proc_status_kb(field: str) -> int | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process RSS high-water mark (Linux only); False where that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return _proc_status_kb("VmHWM") is not None
+
+
+def process_max_rss_kb() -> int | None:
+    """ru_maxrss: the peak RSS over the whole process lifetime, not per stage."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS reports bytes
+
+
+def measure(name: str, fn: Callable, items: int, trace_alloc: bool = False) -> Dict:
+    if trace_alloc:
+        tracemalloc.start()
+
+    per_stage = reset_peak_rss()
+    start_rss = _proc_status_kb("VmRSS") if per_stage else None
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    fn()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+
+    result = {
+        "stage": name,
+        "items": items,
+        "wall_s": round(wall, 6),
+        "cpu_s": round(cpu, 6),
+        "verses_per_s": round(items / wall, 1) if wall > 0 else None,
+        "start_rss_kb": start_rss,
+        "peak_rss_kb": _proc_status_kb("VmHWM") if per_stage else None,
+    }
+    if not per_stage:
+        result["process_max_rss_kb"] = process_max_rss_kb()
+
+    if trace_alloc:
+        result["peak_alloc_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+
+def run_size(verses: int, density: float, workdir: Path, trace_alloc: bool) -> List[Dict]:
+    corpus = workdir / f"corpus_{verses}.txt"
+    generate_corpus(corpus, verses, density)
+
+    texts = [text for _, text in v3.read_scripture_file(corpus)]
+    results = [measure("score_themes", lambda: [v3.score_themes(t) for t in texts], len(texts), trace_alloc)]
+    results.append(measure("score_themes[token]",
+                           lambda: [v3.TOKEN_SCORER.score(t) for t in texts], len(texts), trace_alloc))
+    del texts
+
+    holder = {}
+    results.append(measure(
+        "process_scripture_file",
+        lambda: holder.__setitem__("tagged", v3.process_scripture_file(corpus)),
+        verses, trace_alloc,
+    ))
+    tagged = holder["tagged"]
+    meta = {"version": "3.0", "timestamp": datetime.now().isoformat(), "total": len(tagged)}
+
+    writers = {
+        "v4.save_json": lambda: v4.save_json(tagged, workdir / "out.json", meta),
+        "v4.save_markdown": lambda: v4.save_markdown(tagged, workdir / "out.md", meta),
+        "v4.save_csv": lambda: v4.save_csv(tagged, workdir / "out.csv"),
+        "v4.save_text": lambda: v4.save_text(tagged, workdir / "out.txt"),
+        # every text format at once, chunked, each on its own writer thread
+        "v4.export_all[threaded]": lambda: v4.stream_to_sinks(tagged, [
+            v4.json_sink(workdir / "all.json", meta, background=True),
+            v4.markdown_sink(workdir / "all.md", meta, background=True),
+            v4.csv_sink(workdir / "all.csv", background=True),
+            v4.text_sink(workdir / "all.txt", background=True),
+        ]),
+        "v5.export_markdown_report": lambda: v5.export_markdown_report(tagged, workdir / "report.md"),
+        "v5.export_slide_outline": lambda: v5.export_slide_outline(
+            tagged, workdir / "slides.json", workdir / "slides.md"),
+        "v5.export_social_snippets": lambda: v5.export_social_snippets(tagged, workdir / "social.md"),
+        "phase6.filter_by_themes": lambda: phase6.filter_by_themes(
+            tagged, ["identity", "covenant", "truth"], max_per_theme=None),
+    }
+    for name, fn in writers.items():
+        results.append(measure(name, fn, len(tagged), trace_alloc))
+
+    for r in results:
+        r["corpus_verses"] = verses
+    return results
+
+
+def startup_ms(args: List[str], runs: int) -> float:
+    """Median wall time (ms) of running `python <args>` in a fresh interpreter."""
+    here = Path(__file__).resolve().parent
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=here, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def check_startup(budget_ms: float, runs: int = 11) -> bool:
+    baseline = startup_ms(["-c", "pass"], runs)
+    print(f"Interpreter baseline: {baseline:.1f} ms (budget: +{budget_ms:g} ms)")
+
+    ok = True
+    for command in STARTUP_COMMANDS:
+        overhead = startup_ms(command, runs) - baseline
+        status = "ok" if overhead <= budget_ms else "OVER BUDGET"
+        ok = ok and overhead <= budget_ms
+        print(f"  {' '.join(command):<32} +{overhead:>7.1f} ms  {status}")
+
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the UTM tagger and study pack pipeline")
+    parser.add_argument("--sizes", default="1000,100000",
+                        help="Comma-separated corpus sizes in verses (default: 1000,100000)")
+    parser.add_argument("--density", type=float, default=0.2,
+                        help="Share of words drawn from THEME_KEYWORDS (default: 0.2)")
+    parser.add_argument("--output", default="bench_results.json",
+                        help="Where to write the JSON results (default: bench_results.json)")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="Record peak allocated bytes per stage (slower)")
+    parser.add_argument("--check-startup", action="store_true",
+                        help="Only check CLI startup time against the budget (exit 1 if over)")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS,
+                        help=f"Startup budget in ms over a bare interpreter (default: {STARTUP_BUDGET_MS})")
+    args = parser.parse_args()
+
+    if args.check_startup:
+        if not check_startup(args.startup_budget):
+            sys.exit(1)
+        print("✔ Startup within budget")
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict] = []
+
+    with tempfile.TemporaryDirectory(prefix="utm_bench_") as tmp:
+        for size in sizes:
+            print(f"Benchmarking {size:,} verses...")
+            for r in run_size(size, args.density, Path(tmp), args.trace_alloc):
+                results.append(r)
+                print(f"  {r['stage']:<28} {r['wall_s']:>9.3f}s  {r['verses_per_s'] or 0:>12,.0f} verses/s")
+
+    report = {
+        "generated": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "keyword_density": args.density,
+        "results": results,
+    }
+
+    with Path(args.output).open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+
+    print("✔ Benchmark results:", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+UTM Bulk Export
+Buffered, optionally compressed and concurrently written export files for
+the Phase 4 output engine.
+
+    with open_export(path, compress="gzip", background=True) as f:
+        f.write(...)          # appended to an in-memory chunk
+
+Writes are collected into a list and handed to the file as one joined
+write per chunk (CHUNK_BYTES of text), so a slow or remote
+export directory (network mounts, S3-synced folders) sees a few large
+writes instead of several small ones per verse. With background=True each
+file gets its own writer thread: while one chunk is written (and
+compressed) the next is serialized, and all formats write concurrently.
+At most one chunk per file is in flight, which bounds memory.
+
+Compression: "gzip" (stdlib) or "zstd" (needs the zstandard package);
+the matching suffix (.gz / .zst) is appended to the file name.
+
+Each export is written into a hidden temporary directory next to its
+target (under its real name, which gzip records in its header) and moved
+into place only when it was closed successfully; on an error the partial
+file is deleted, so a truncated export never takes the real name.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List
+
+CHUNK_BYTES = 1 << 20
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def export_path(path: Path, compress: str | None = None) -> Path:
+    """The file name actually written for `path` with the given compression."""
+    if compress is None:
+        return path
+    if compress not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compress!r} (use gzip or zstd)")
+    return path.with_name(path.name + COMPRESSION_SUFFIXES[compress])
+
+
+def _open_text(path: Path, compress: str | None, newline: str | None):
+    if compress is None:
+        return path.open("w", encoding="utf-8", newline=newline)
+
+    if compress == "gzip":
+        import gzip
+
+        return gzip.open(path, "wt", encoding="utf-8", newline=newline)
+
+    return _zstandard().open(path, "wt", encoding="utf-8", newline=newline)
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd output requires the zstandard package (pip install zstandard); use gzip instead.")
+    return zstandard
+
+
+def check_compression(compress: str | None) -> None:
+    """Raise ValueError up front if `compress` is unknown or its codec is not installed."""
+    export_path(Path("check"), compress)
+    if compress == "zstd":
+        _zstandard()
+
+
+class ChunkedWriter:
+    """
+    Text file-like object that batches write() calls into chunks. Used
+    through open_export(): close() flushes the last chunk and renames the
+    file into place, abort() deletes it. Leaving a with block on an error
+    aborts; GeneratorExit (a sink coroutine being closed) counts as done.
+    """
+
+    def __init__(self, f, background: bool = False, chunk_bytes: int = CHUNK_BYTES,
+                 path: Path | None = None, temp_path: Path | None = None):
+        self._f = f
+        self._chunk: List[str] = []
+        self._size = 0
+        self._chunk_bytes = chunk_bytes
+        self._pending = None
+        self._pool = None
+        self._path = path            # final name, when `f` is open on temp_path
+        self._temp_path = temp_path  # same name, in a temporary directory of its own
+
+        if background:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # one thread per file keeps its chunks in order
+            self._pool = ThreadPoolExecutor(max_workers=1)
+
+    def write(self, text: str) -> int:
+        self._chunk.append(text)
+        self._size += len(text)
+        if self._size >= self._chunk_bytes:
+            self.flush_chunk()
+        return len(text)
+
+    def writelines(self, lines) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush_chunk(self) -> None:
+        """Hand the buffered text to the file (or its writer thread)."""
+        if not self._chunk:
+            return
+        chunk, self._chunk, self._size = self._chunk, [], 0
+
+        if self._pool is None:
+            self._write(chunk)
+            return
+
+        # wait for the previous chunk (and surface its error) before queueing this one
+        if self._pending is not None:
+            self._pending.result()
+        self._pending = self._pool.submit(self._write, chunk)
+
+    def _write(self, chunk: List[str]) -> None:
+        # one large write goes straight through the text layer's 8 KiB buffer
+        self._f.write("".join(chunk))
+
+    def close(self) -> None:
+        """Write the last chunk, close the file and move it into place."""
+        try:
+            self.flush_chunk()
+            if self._pending is not None:
+                self._pending.result()
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._f.close()
+        except BaseException:
+            self.abort()
+            raise
+
+        if self._temp_path is not None:
+            try:
+                os.replace(self._temp_path, self._path)
+            finally:
+                shutil.rmtree(self._temp_path.parent, ignore_errors=True)
+
+    def abort(self) -> None:
+        """Stop writing and delete the partial file."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        with contextlib.suppress(Exception):
+            self._f.close()
+        if self._temp_path is not None:
+            shutil.rmtree(self._temp_path.parent, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None or issubclass(exc_type, GeneratorExit):
+            self.close()
+        else:
+            self.abort()
+
+
+def open_export(path: Path, compress: str | None = None, background: bool = False,
+                newline: str | None = None) -> ChunkedWriter:
+    """
+    Open an export file for chunked text writes. `path` gets the
+    compression suffix appended; newline is passed to the text layer
+    ("" for csv).
+    """
+    path = export_path(path, compress)
+    temp_path = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent)) / path.name
+    try:
+        f = _open_text(temp_path, compress, newline)
+    except BaseException:
+        shutil.rmtree(temp_path.parent, ignore_errors=True)
+        raise
+    return ChunkedWriter(f, background, path=path, temp_path=temp_path)
@@ -0,0 +1,158 @@
+"""
+UTM Cross-References
+Resolves cross-reference strings ("Deut 7:6", "Lev 26:14-33") to verse
+text and links tagged verses into a small graph for teaching outlines.
+
+- CrossReferenceResolver:  reference -> resolved verses, LRU-cached, so a
+                           reference repeated across an outline is looked
+                           up once
+- CrossReferenceGraph:     adjacency between themes, tagged verses and
+                           the references they point at; walk() gives the
+                           connections up to N hops away
+
+Graph nodes are canonical reference strings (str(ScriptureRef)), so
+"Deut 7:6" and "Deuteronomy 7:6" are the same node. Theme nodes are
+prefixed with "theme:".
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from scripture_refs import (
+    VerseIndex,
+    format_verse_id,
+    parse_reference,
+    single_verse_id,
+)
+
+
+class ResolvedReference(NamedTuple):
+    reference: str                      # as written in the source
+    canonical: str                      # e.g. "Deuteronomy 7:6"
+    verses: Tuple[Tuple[int, str], ...]  # (verse id, text) found in the store
+
+
+@lru_cache(maxsize=65536)
+def canonical_reference(reference: str) -> str:
+    """Canonical form of a reference, or the stripped input if it does not parse."""
+    try:
+        vid = single_verse_id(reference)
+        if vid is not None:
+            return format_verse_id(vid)
+        return str(parse_reference(reference))
+    except ValueError:
+        return reference.strip()
+
+
+class CrossReferenceResolver:
+    """Resolves references against a verse store; results are LRU-cached per reference."""
+
+    def __init__(self, store, cache_size: int = 4096):
+        self.store = store
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, reference: str) -> ResolvedReference:
+        try:
+            ref = parse_reference(reference)
+        except ValueError:
+            return ResolvedReference(reference, reference.strip(), ())
+        return ResolvedReference(reference, str(ref), tuple(self.store.range(*ref.id_range())))
+
+    def render(self, reference: str, max_verses: int = 3) -> str:
+        """One line of text for a reference; long ranges are cut after max_verses."""
+        resolved = self.resolve(reference)
+        if not resolved.verses:
+            return "_(not in verse store)_"
+
+        if len(resolved.verses) == 1:
+            return resolved.verses[0][1]
+
+        parts = [f"[{vid & 0xFF}] {text}" for vid, text in resolved.verses[:max_verses]]
+        if len(resolved.verses) > max_verses:
+            parts.append(f"… (+{len(resolved.verses) - max_verses} more)")
+        return " ".join(parts)
+
+    def cache_info(self):
+        return self.resolve.cache_info()
+
+
+class CrossReferenceGraph:
+    """Directed adjacency between themes, tagged verses and their cross-references."""
+
+    def __init__(self):
+        # node -> targets; a dict keeps insertion order and makes linking O(1)
+        self.edges: Dict[str, Dict[str, None]] = {}
+
+    def _link(self, source: str, target: str) -> None:
+        if target != source:
+            self.edges.setdefault(source, {})[target] = None
+
+    @classmethod
+    def build(cls, tagged: Iterable[Dict], theme_map: Dict[str, List[str]] | None = None
+              ) -> "CrossReferenceGraph":
+        """
+        Edges:
+            theme:<t>  -> every reference in theme_map[t] and every verse tagged <t>
+            verse      -> each of its cross_references
+            reference  -> tagged verses that fall inside it (ranges included)
+        """
+        graph = cls()
+        ref_nodes: Dict[str, None] = {}  # every cross-reference target, in first-seen order
+
+        for theme, refs in (theme_map or {}).items():
+            for ref in refs:
+                node = canonical_reference(ref)
+                ref_nodes[node] = None
+                graph._link(f"theme:{theme}", node)
+
+        nodes = []
+        for entry in tagged:
+            node = canonical_reference(entry["reference"])
+            nodes.append(node)
+            for theme in entry.get("themes", []):
+                graph._link(f"theme:{theme}", node)
+            for ref in entry.get("cross_references", []):
+                target = canonical_reference(ref)
+                ref_nodes[target] = None
+                graph._link(node, target)
+
+        # a reference (or range) reaches the tagged verses it contains
+        verses = VerseIndex.build(nodes)
+        for target in ref_nodes:
+            try:
+                first, last = parse_reference(target).id_range()
+            except ValueError:
+                continue
+            for position in verses.positions_between(first, last):
+                graph._link(target, nodes[position])
+
+        return graph
+
+    def neighbors(self, node: str) -> List[str]:
+        return list(self.edges.get(node, ()))
+
+    def walk(self, reference: str, hops: int = 2) -> List[Tuple[str, int]]:
+        """
+        Breadth-first connections of a verse up to `hops` away, as
+        (node, distance) pairs in discovery order.
+        """
+        start = canonical_reference(reference)
+        seen = {start}
+        found: List[Tuple[str, int]] = []
+        queue = deque([(start, 0)])
+
+        while queue:
+            node, distance = queue.popleft()
+            if distance == hops:
+                continue
+            for target in self.edges.get(node, ()):
+                if target in seen:
+                    continue
+                seen.add(target)
+                found.append((target, distance + 1))
+                queue.append((target, distance + 1))
+
+        return found
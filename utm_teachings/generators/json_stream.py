@@ -0,0 +1,91 @@
+"""
+UTM JSON Streaming Helpers
+Writes JSON arrays one item at a time, producing the exact same bytes as
+json.dump(..., indent=4, ensure_ascii=False) without holding the list.
+"""
+
+import json
+import json.encoder
+from typing import Iterable, TextIO
+
+from tagged_verse import TaggedVerse, json_default
+
+INDENT = 4
+
+_ENCODER = json.JSONEncoder(indent=INDENT, ensure_ascii=False, default=json_default)
+
+
+def _floatstr(value: float) -> str:
+    # as JSONEncoder.iterencode's float formatting (allow_nan=True)
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == float("-inf"):
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+def make_iterencode():
+    """
+    The encoder loop json.dump runs for _ENCODER, called as
+    iterencode(obj, level). Unlike JSONEncoder.iterencode, it can start
+    `level` containers deep, so an item of a nested array comes out already
+    indented. Build one per document and reuse it for every item.
+    """
+    return json.encoder._make_iterencode(
+        {}, _ENCODER.default, json.encoder.encode_basestring, _ENCODER.indent, _floatstr,
+        _ENCODER.key_separator, _ENCODER.item_separator, False, False, False,
+    )
+
+
+def dumps_indented(obj, level: int = 0) -> str:
+    """
+    Serialize `obj` as it would appear nested `level` containers deep
+    inside an indent=4 json.dump. TaggedVerse records are written as their
+    dicts.
+    """
+    return "".join(make_iterencode()(obj, level))
+
+
+class JsonArrayWriter:
+    """Incremental writer for one JSON array nested `level` deep."""
+
+    def __init__(self, f: TextIO, level: int = 0):
+        self.f = f
+        self.level = level
+        self.count = 0
+        self._iterencode = make_iterencode()
+        self._separator = ",\n" + " " * INDENT * (level + 1)
+
+    def write(self, item) -> None:
+        if isinstance(item, TaggedVerse):
+            # its fields dict goes to the encoder directly; through the
+            # default hook every chunk would pass one more generator
+            item = item._fields()
+        prefix = self._separator if self.count else "[" + self._separator[1:]
+        self.f.write(prefix + "".join(self._iterencode(item, self.level + 1)))
+        self.count += 1
+
+    def close(self) -> None:
+        if self.count == 0:
+            self.f.write("[]")
+        else:
+            self.f.write("\n" + " " * INDENT * self.level + "]")
+
+
+def write_json_array(items: Iterable, f: TextIO, level: int = 0) -> int:
+    """
+    Write every item of an iterable into `f` as a JSON array. Lists and
+    tuples of plain values go straight to json.dump; anything else, and
+    TaggedVerse records (faster through JsonArrayWriter.write), is streamed.
+    """
+    if level == 0 and isinstance(items, (list, tuple)) and not (items and isinstance(items[0], TaggedVerse)):
+        json.dump(items, f, indent=INDENT, ensure_ascii=False, default=json_default)
+        return len(items)
+
+    writer = JsonArrayWriter(f, level)
+    for item in items:
+        writer.write(item)
+    writer.close()
+    return writer.count
@@ -0,0 +1,137 @@
+"""
+UTM Keyword Matcher
+Compiles THEME_KEYWORDS once into an Aho-Corasick automaton so every
+keyword hit in a verse is found in a single pass over the text.
+
+The cost per verse depends on the length of the verse, not on how many
+keywords are configured, so the theme lists can grow into the thousands.
+Keyword sets smaller than SUBSTRING_SCAN_LIMIT are still checked with
+C-level substring tests, which at that size run several times faster than
+the pure-Python automaton.
+"""
+
+from collections import Counter, deque
+from typing import Dict, List
+
+# Below this many distinct keywords, `k in text` per keyword is used. On
+# verse-length text it stays ahead of the automaton up to about 200
+# keywords; the limit is kept lower so the automaton path is exercised
+# well before the lists reach that size
+SUBSTRING_SCAN_LIMIT = 64
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher built from a theme → keywords mapping.
+
+    Matching follows the same rules as the original `k in lower` loops:
+    a keyword counts once per verse no matter how often it appears, and
+    overlapping keywords (e.g. "judge" inside "judgment") are all found.
+    """
+
+    def __init__(self, theme_keywords: Dict[str, List[str]]):
+        self.themes = list(theme_keywords)
+        self.keywords: List[str] = []
+
+        # keyword id -> theme indices (a keyword listed twice counts twice,
+        # exactly like the per-keyword loop did)
+        self._keyword_themes: List[List[int]] = []
+        keyword_ids: Dict[str, int] = {}
+
+        for theme_index, keywords in enumerate(theme_keywords.values()):
+            for k in keywords:
+                if k not in keyword_ids:
+                    keyword_ids[k] = len(self.keywords)
+                    self.keywords.append(k)
+                    self._keyword_themes.append([])
+                self._keyword_themes[keyword_ids[k]].append(theme_index)
+
+        self._build(keyword_ids)
+
+    # ---------------------------
+    # AUTOMATON CONSTRUCTION
+    # ---------------------------
+
+    def _build(self, keyword_ids: Dict[str, int]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        output: List[tuple] = [()]
+
+        # an empty keyword is "in" every verse, so it is reported up front
+        self._always = frozenset(kid for k, kid in keyword_ids.items() if not k)
+
+        # trie
+        for k, kid in keyword_ids.items():
+            if not k:
+                continue
+            state = 0
+            for ch in k:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append(())
+                state = nxt
+            output[state] = output[state] + (kid,)
+
+        # failure links (breadth-first)
+        # (children of the root keep fail = 0)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                output[nxt] = output[nxt] + output[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    # ---------------------------
+    # MATCHING
+    # ---------------------------
+
+    def find_keywords(self, lower: str) -> set:
+        """Return the ids of every keyword found in already-lowercased text."""
+        if len(self.keywords) < SUBSTRING_SCAN_LIMIT:
+            return {kid for kid, k in enumerate(self.keywords) if k in lower}
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        hits = set(self._always)
+        state = 0
+
+        for ch in lower:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if output[state]:
+                hits.update(output[state])
+
+        return hits
+
+    def count_themes(self, text: str) -> Counter:
+        """
+        Per-theme keyword counts for a verse, in THEME_KEYWORDS order —
+        the same Counter score_themes used to build keyword by keyword.
+        """
+        per_theme = [0] * len(self.themes)
+        for kid in self.find_keywords(text.lower()):
+            for theme_index in self._keyword_themes[kid]:
+                per_theme[theme_index] += 1
+
+        theme_counter = Counter()
+        for theme_index, count in enumerate(per_theme):
+            if count:
+                theme_counter[self.themes[theme_index]] = count
+        return theme_counter
@@ -0,0 +1,290 @@
+"""
+UTM Scripture References
+Parses free-text references ("Deuteronomy 7:6", "Deut 7:6", "Lev 26:14-33",
+"1 Sam 17", "Gen 1:1-2:3") and maps every verse to a compact integer id:
+
+    verse id = book << 16 | chapter << 8 | verse
+
+Ids sort in canonical (Genesis → Revelation) order, so a reference range is
+a contiguous id interval and VerseIndex answers "every tagged verse in
+Deut 28:15-68" with two bisections instead of comparing every entry.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Canonical order; the book number is the position + 1
+BOOKS = [
+    "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy", "Joshua", "Judges",
+    "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings", "1 Chronicles",
+    "2 Chronicles", "Ezra", "Nehemiah", "Esther", "Job", "Psalms", "Proverbs",
+    "Ecclesiastes", "Song of Solomon", "Isaiah", "Jeremiah", "Lamentations",
+    "Ezekiel", "Daniel", "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah",
+    "Nahum", "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi",
+    "Matthew", "Mark", "Luke", "John", "Acts", "Romans", "1 Corinthians",
+    "2 Corinthians", "Galatians", "Ephesians", "Philippians", "Colossians",
+    "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy", "Titus",
+    "Philemon", "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John",
+    "3 John", "Jude", "Revelation",
+]
+
+# Abbreviations that are not simply a unique prefix of the book name
+EXTRA_ALIASES = {
+    "Exodus": ["ex"],
+    "Leviticus": ["lv"],
+    "Numbers": ["nm", "nb"],
+    "Deuteronomy": ["dt"],
+    "Judges": ["jdg", "jgs", "jdgs"],
+    "1 Kings": ["1kgs", "1kg"],
+    "2 Kings": ["2kgs", "2kg"],
+    "Psalms": ["ps", "psa", "psalm", "pss"],
+    "Proverbs": ["prv"],
+    "Ecclesiastes": ["qoh", "qoheleth"],
+    "Song of Solomon": ["song", "songofsongs", "sos", "canticles", "cant"],
+    "Ezekiel": ["ezk"],
+    "Joel": ["jl"],
+    "Nahum": ["nah"],
+    "Habakkuk": ["hab", "hb"],
+    "Zephaniah": ["zep", "zeph"],
+    "Haggai": ["hag", "hg"],
+    "Matthew": ["mt"],
+    "Mark": ["mk", "mrk"],
+    "Luke": ["lk"],
+    "John": ["jn", "jhn"],
+    "Philippians": ["phil", "php"],
+    "1 John": ["1jn", "1jhn"],
+    "2 John": ["2jn", "2jhn"],
+    "3 John": ["3jn", "3jhn"],
+    "Philemon": ["phm", "philem"],
+    "James": ["jas", "jms"],
+    "Jude": ["jud"],
+    "Revelation": ["revelations", "apocalypse"],
+}
+
+MAX_CHAPTER = 255
+MAX_VERSE = 255
+
+_ORDINALS = {"i": "1", "ii": "2", "iii": "3", "first": "1", "second": "2", "third": "3"}
+
+_REF_RE = re.compile(
+    r"""^\s*
+    (?P<book>(?:[1-3]|i{1,3}|first|second|third)?\s*[a-z][a-z .]*?)\.?\s*
+    (?:
+        (?P<c1>\d+)(?::(?P<v1>\d+))?
+        (?:\s*[-–]\s*(?:(?P<c2>\d+):)?(?P<v2>\d+))?
+    )?
+    \s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def _normalize_book(name: str) -> str:
+    parts = name.lower().replace(".", " ").split()
+    if len(parts) > 1 and parts[0] in _ORDINALS:
+        parts[0] = _ORDINALS[parts[0]]
+    return "".join(parts)
+
+
+def _build_aliases() -> Dict[str, int]:
+    aliases: Dict[str, int] = {}
+    prefixes: Dict[str, set] = {}
+
+    for number, name in enumerate(BOOKS, start=1):
+        key = _normalize_book(name)
+        aliases[key] = number
+        start = 2 if key[0].isdigit() else 1
+        for end in range(start + 1, len(key)):
+            prefixes.setdefault(key[:end], set()).add(number)
+
+    # an abbreviation is accepted only if it names exactly one book
+    for prefix, numbers in prefixes.items():
+        if len(numbers) == 1 and prefix not in aliases:
+            aliases[prefix] = next(iter(numbers))
+
+    for name, extra in EXTRA_ALIASES.items():
+        for alias in extra:
+            aliases[alias] = BOOKS.index(name) + 1
+
+    return aliases
+
+
+BOOK_ALIASES = _build_aliases()
+
+
+@lru_cache(maxsize=1024)
+def book_number(name: str) -> int:
+    """1-based canonical book number for a name or abbreviation."""
+    number = BOOK_ALIASES.get(_normalize_book(name))
+    if number is None:
+        raise ValueError(f"Unknown book: {name!r}")
+    return number
+
+
+def verse_id(book: int, chapter: int, verse: int) -> int:
+    if not (1 <= book <= len(BOOKS) and 0 <= chapter <= MAX_CHAPTER and 0 <= verse <= MAX_VERSE):
+        raise ValueError(f"Verse out of range: {book}/{chapter}:{verse}")
+    return book << 16 | chapter << 8 | verse
+
+
+def split_verse_id(vid: int) -> Tuple[int, int, int]:
+    return vid >> 16, (vid >> 8) & 0xFF, vid & 0xFF
+
+
+def format_verse_id(vid: int) -> str:
+    book, chapter, verse = split_verse_id(vid)
+    return f"{BOOKS[book - 1]} {chapter}:{verse}"
+
+
+class ScriptureRef(NamedTuple):
+    """A parsed reference; chapter/verse of None mean the whole book/chapter."""
+    book: int
+    chapter: int | None = None
+    verse: int | None = None
+    end_chapter: int | None = None
+    end_verse: int | None = None
+
+    @property
+    def book_name(self) -> str:
+        return BOOKS[self.book - 1]
+
+    def id_range(self) -> Tuple[int, int]:
+        """Inclusive (first, last) verse id covered by the reference."""
+        if self.chapter is None:
+            return verse_id(self.book, 0, 0), verse_id(self.book, MAX_CHAPTER, MAX_VERSE)
+
+        end_chapter = self.end_chapter if self.end_chapter is not None else self.chapter
+
+        if self.verse is None:
+            first = verse_id(self.book, self.chapter, 0)
+            last = verse_id(self.book, end_chapter, MAX_VERSE)
+        else:
+            first = verse_id(self.book, self.chapter, self.verse)
+            end_verse = self.end_verse if self.end_verse is not None else self.verse
+            last = verse_id(self.book, end_chapter, end_verse)
+
+        if last < first:
+            raise ValueError(f"Reference range runs backwards: {self}")
+        return first, last
+
+    def __str__(self) -> str:
+        text = self.book_name
+        if self.chapter is None:
+            return text
+        text += f" {self.chapter}"
+        if self.verse is not None:
+            text += f":{self.verse}"
+        if self.end_chapter is not None and self.end_chapter != self.chapter:
+            text += f"-{self.end_chapter}"
+            if self.end_verse is not None:
+                text += f":{self.end_verse}"
+        elif self.end_verse is not None:
+            text += f"-{self.end_verse}"
+        return text
+
+
+def parse_reference(text: str) -> ScriptureRef:
+    """
+    Parse one reference. Supported forms:
+        Deut, Deut 28, Deut 28:15, Deut 28:15-68, Gen 1:1-2:3, Gen 1-3
+    Raises ValueError for anything else.
+    """
+    m = _REF_RE.match(text)
+    if not m:
+        raise ValueError(f"Unrecognised scripture reference: {text!r}")
+
+    book = book_number(m.group("book"))
+    c1, v1, c2, v2 = (int(g) if g else None for g in m.group("c1", "v1", "c2", "v2"))
+
+    if c1 is None:
+        return ScriptureRef(book)
+
+    if v1 is None:
+        if c2 is not None:
+            raise ValueError(f"Unrecognised scripture reference: {text!r}")
+        # "Gen 1-3" is a chapter range
+        return ScriptureRef(book, c1, None, v2, None)
+
+    if v2 is None:
+        return ScriptureRef(book, c1, v1)
+
+    return ScriptureRef(book, c1, v1, c2, v2)
+
+
+def parse_references(text: str) -> List[ScriptureRef]:
+    """Parse a ';'-separated list, e.g. "Deut 28:15-68; Lev 26"."""
+    return [parse_reference(part) for part in text.split(";") if part.strip()]
+
+
+def single_verse_id(reference: str) -> int | None:
+    """
+    Fast path for a plain "Book C:V" (the form every tagged entry uses);
+    None when the reference has any other shape.
+    """
+    book, _, location = reference.strip().rpartition(" ")
+    chapter, colon, verse = location.partition(":")
+    if book and colon and chapter.isdigit() and verse.isdigit():
+        return verse_id(book_number(book), int(chapter), int(verse))
+    return None
+
+
+def reference_verse_id(reference: str) -> int:
+    """Verse id of the first verse a reference points at (its sort key)."""
+    vid = single_verse_id(reference)
+    if vid is not None:
+        return vid
+    return parse_reference(reference).id_range()[0]
+
+
+class VerseIndex:
+    """
+    Sorted verse ids with the corpus position of each verse. Range lookups
+    bisect the id list, so they cost O(log n + matches).
+    """
+
+    def __init__(self, ids: List[int], positions: List[int], unparsed: int = 0):
+        self.ids = ids              # sorted verse ids
+        self.positions = positions  # corpus position of ids[i]
+        self.unparsed = unparsed    # entries whose reference could not be parsed
+
+    @classmethod
+    def build(cls, references: Iterable[str]) -> "VerseIndex":
+        pairs = []
+        unparsed = 0
+        for position, reference in enumerate(references):
+            try:
+                pairs.append((reference_verse_id(reference), position))
+            except (ValueError, TypeError):
+                unparsed += 1
+
+        pairs.sort()
+        return cls([vid for vid, _ in pairs], [pos for _, pos in pairs], unparsed)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions_between(self, first: int, last: int) -> List[int]:
+        """Corpus positions of verses with first <= id <= last, in canonical order."""
+        lo = bisect_left(self.ids, first)
+        hi = bisect_right(self.ids, last, lo)
+        return self.positions[lo:hi]
+
+    def lookup(self, references: str) -> List[int]:
+        """
+        Corpus positions (in source order) of every verse inside the
+        ';'-separated references. Raises ValueError on a bad reference.
+        """
+        found = set()
+        for ref in parse_references(references):
+            found.update(self.positions_between(*ref.id_range()))
+        return sorted(found)
+
+    def to_dict(self) -> Dict:
+        return {"ids": self.ids, "positions": self.positions, "unparsed": self.unparsed}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "VerseIndex":
+        return cls(data["ids"], data["positions"], data.get("unparsed", 0))
@@ -2,40 +2,38 @@
 # Adds theme detection, keyword tagging, and export formats.
 
 from pathlib import Path
-import json
 
+import theme_rules
+from json_stream import write_json_array
+from tagged_verse import TaggedVerse
 
-THEME_KEYWORDS = {
-    "identity": ["chosen", "people", "israel", "yah", "tribe", "nation"],
-    "covenant": ["law", "commandments", "statutes", "covenant", "keep", "obey"],
-    "judgment": ["punish", "destruction", "wrath", "judge", "scatter"],
-    "prophecy": ["shall come", "in that day", "behold", "prophesy", "future"],
-    "truth": ["truth", "light", "wisdom", "knowledge", "word"],
-    "warning": ["beware", "take heed", "lest", "danger", "turn away"],
-}
+# Theme keywords come from the shared rule set (theme_rules.json), the
+# same compiled matcher Phase 3 uses; weights and cross-references are
+# Phase 3 only.
 
 
-def detect_themes(verse_text: str):
-    """Return a list of detected themes based on keywords."""
-    lower = verse_text.lower()
-    found = []
+def __getattr__(name):
+    if name == "THEME_KEYWORDS":
+        return theme_rules.active().keywords
+    if name == "THEME_MATCHER":
+        return theme_rules.active().matcher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-    for theme, keywords in THEME_KEYWORDS.items():
-        if any(k in lower for k in keywords):
-            found.append(theme)
+def detect_themes(verse_text: str, rules=None):
+    """Return a list of detected themes based on keywords."""
+    if rules is None:
+        rules = theme_rules.active()
+    found = list(rules.matcher.count_themes(verse_text))
 
     return found or ["uncategorized"]
 
 
-def tag_verse(reference: str, text: str):
-    """Return a structured dictionary for the tagged verse."""
-    themes = detect_themes(text)
+def tag_verse(reference: str, text: str, rules=None):
+    """Return a TaggedVerse record (reference, text and themes) for the verse."""
+    themes = detect_themes(text, rules)
 
-    return {
-        "reference": reference,
-        "text": text.strip(),
-        "themes": themes,
-    }
+    return TaggedVerse(reference, text.strip(), themes)
 
 
 def export_markdown(tagged_data, output_file: Path):
@@ -48,25 +46,33 @@ def export_markdown(tagged_data, output_file: Path):
 
 
 def export_json(tagged_data, output_file: Path):
+    # streamed item by item, so tagged_data may be a generator
     with output_file.open("w", encoding="utf-8") as f:
-        json.dump(tagged_data, f, indent=4, ensure_ascii=False)
+        write_json_array(tagged_data, f)
 
 
-def process_scripture_file(input_file: Path):
-    """Reads a text file where each line is formatted:
+def read_scripture_file(input_file: Path):
+    """Yields (reference, text) pairs from a text file where each line is formatted:
        Book Chapter:Verse | Scripture text
     """
-    tagged = []
-
     with input_file.open("r", encoding="utf-8") as f:
         for line in f:
             if "|" not in line:
                 continue
 
             ref, text = line.split("|", 1)
-            tagged.append(tag_verse(ref.strip(), text.strip()))
+            yield ref.strip(), text.strip()
 
-    return tagged
+
+def iter_tagged_verses(input_file: Path):
+    """Streaming form of process_scripture_file: one tagged verse at a time."""
+    rules = theme_rules.active()
+    for ref, text in read_scripture_file(input_file):
+        yield tag_verse(ref, text, rules)
+
+
+def process_scripture_file(input_file: Path):
+    return list(iter_tagged_verses(input_file))
 
 
 if __name__ == "__main__":
@@ -4,65 +4,81 @@ Theme scoring • Primary/Secondary Theme Detection • Cross-Reference Framewor
 Teaching Outline Export • Profile-Based Output • Configurable Rules
 """
 
+from functools import partial
 from pathlib import Path
-import json
-from collections import Counter
+
+import theme_rules
+from scripture_refs import format_verse_id
+from tagged_verse import TaggedVerse
 
 
 # ---------------------------
 # CONFIGURATION
 # ---------------------------
-
-THEME_KEYWORDS = {
-    "identity": ["chosen", "people", "israel", "yah", "tribe", "nation"],
-    "covenant": ["law", "commandments", "statutes", "covenant", "keep", "obey"],
-    "judgment": ["punish", "destruction", "wrath", "judge", "scatter"],
-    "prophecy": ["shall come", "in that day", "behold", "prophesy", "future"],
-    "truth": ["truth", "light", "wisdom", "knowledge", "word"],
-    "warning": ["beware", "take heed", "lest", "danger", "turn away"],
+# Theme keywords, weights and cross-references live in theme_rules.json
+# (see theme_rules.py), shared with Phase 2 and compiled once. The old
+# module constants (THEME_KEYWORDS, THEME_WEIGHTS, CROSS_REFERENCE_MAP,
+# THEME_MATCHER, TOKEN_SCORER) still resolve, to the active rule set.
+
+_RULE_ATTRIBUTES = {
+    "THEME_KEYWORDS": "keywords",
+    "THEME_WEIGHTS": "weights",
+    "CROSS_REFERENCE_MAP": "cross_references",
+    "THEME_MATCHER": "matcher",
+    "TOKEN_SCORER": "token_scorer",
 }
 
-# Weight per theme occurrence
-THEME_WEIGHTS = {
-    "identity": 1.0,
-    "covenant": 1.0,
-    "judgment": 1.2,
-    "prophecy": 1.3,
-    "truth": 0.8,
-    "warning": 1.1,
-}
 
-# Placeholder cross-reference map (expand in Phase 4)
-CROSS_REFERENCE_MAP = {
-    "identity": ["Deut 7:6", "Exo 19:5"],
-    "covenant": ["Deut 4:1", "Jer 31:31"],
-    "judgment": ["Lev 26:14-33", "Amos 3:2"],
-    "prophecy": ["Isa 2:2", "Joel 2:28"],
-    "truth": ["Psa 119:142", "John 17:17"],
-    "warning": ["Deut 28:15-68", "Matt 24:4"],
-}
+def __getattr__(name):
+    if name in _RULE_ATTRIBUTES:
+        return getattr(theme_rules.active(), _RULE_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# How keywords are matched:
+#   "substring" - a keyword counts once per verse if it appears anywhere,
+#                 even inside a longer word (the original Phase 3 rules)
+#   "token"     - whole words / phrases only, every occurrence counts
+SCORING_MODES = ("substring", "token")
+SCORING_MODE = "substring"
+
+
+def set_scoring_mode(mode: str) -> None:
+    global SCORING_MODE
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode!r} (expected one of {', '.join(SCORING_MODES)})")
+    SCORING_MODE = mode
+
+
+def config_fingerprint() -> str:
+    """Hash of every rule that affects tag_verse output (used to key the tag cache)."""
+    return f"{theme_rules.active().fingerprint}:{SCORING_MODE}"
 
 
 # ---------------------------
 # THEME ANALYSIS
 # ---------------------------
 
-def score_themes(text: str) -> dict:
+def score_themes(text: str, rules=None) -> dict:
     """
     Returns:
     - theme counts
     - weighted score
     - primary theme
     - secondary themes
+
+    rules defaults to theme_rules.active(); callers tagging many verses
+    look it up once and pass it in.
     """
-    lower = text.lower()
-    theme_counter = Counter()
+    if rules is None:
+        rules = theme_rules.active()
+    weights = rules.weights
 
     # count occurrences
-    for theme, keywords in THEME_KEYWORDS.items():
-        for k in keywords:
-            if k in lower:
-                theme_counter[theme] += 1
+    if SCORING_MODE == "token":
+        theme_counter, score = rules.token_scorer.score(text)
+    else:
+        theme_counter = rules.matcher.count_themes(text)
 
     if not theme_counter:
         return {
@@ -73,10 +89,11 @@ def score_themes(text: str) -> dict:
         }
 
     # weighted score
-    score = sum(theme_counter[t] * THEME_WEIGHTS.get(t, 1.0) for t in theme_counter)
+    if SCORING_MODE != "token":
+        score = sum(theme_counter[t] * weights.get(t, 1.0) for t in theme_counter)
 
     # sort by frequency & weight
-    sorted_themes = sorted(theme_counter.items(), key=lambda x: (-x[1], -THEME_WEIGHTS[x[0]]))
+    sorted_themes = sorted(theme_counter.items(), key=lambda x: (-x[1], -weights[x[0]]))
     primary = sorted_themes[0][0]
     secondary = [t for t, _ in sorted_themes[1:]]
 
@@ -92,34 +109,43 @@ def score_themes(text: str) -> dict:
 # CROSS-REFERENCE GENERATION
 # ---------------------------
 
-def generate_cross_references(primary_theme: str):
-    return CROSS_REFERENCE_MAP.get(primary_theme, [])
+def generate_cross_references(primary_theme: str, rules=None):
+    if rules is None:
+        rules = theme_rules.active()
+    return rules.cross_references.get(primary_theme, [])
 
 
 # ---------------------------
 # MAIN TAGGING
 # ---------------------------
 
-def tag_verse(reference: str, text: str):
-    analysis = score_themes(text)
-    cross_refs = generate_cross_references(analysis["primary"])
+def tag_verse(reference: str, text: str, rules=None):
+    if rules is None:
+        rules = theme_rules.active()
+    analysis = score_themes(text, rules)
+    cross_refs = generate_cross_references(analysis["primary"], rules)
 
-    return {
-        "reference": reference,
-        "text": text.strip(),
-        "themes": analysis["themes"],
-        "primary_theme": analysis["primary"],
-        "secondary_themes": analysis["secondary"],
-        "score": analysis["score"],
-        "cross_references": cross_refs,
-    }
+    return TaggedVerse(
+        reference,
+        text.strip(),
+        themes=analysis["themes"],
+        primary_theme=analysis["primary"],
+        secondary_themes=analysis["secondary"],
+        score=analysis["score"],
+        cross_references=cross_refs,
+    )
 
 
 # ---------------------------
 # EXPORT FORMATS
 # ---------------------------
 
-def export_teaching_outline(tagged, output_file: Path):
+def export_teaching_outline(tagged, output_file: Path, resolver=None, graph=None, hops: int = 1):
+    """
+    With a CrossReferenceResolver (cross_references.py) the text of each
+    cross-reference is inlined; with a CrossReferenceGraph and hops >= 2 the
+    verses reachable in up to `hops` steps are listed as well.
+    """
     with output_file.open("w", encoding="utf-8") as f:
         f.write("# UTM Phase 3 – Teaching Outline\n\n")
 
@@ -130,30 +156,116 @@ def export_teaching_outline(tagged, output_file: Path):
             f.write(f"Score: {entry['score']}\n")
             f.write(f"Secondary: {', '.join(entry['secondary_themes']) or 'None'}\n")
             f.write(f"Cross-References: {', '.join(entry['cross_references'])}\n")
+
+            if resolver is not None:
+                f.write("\n")
+                for ref in entry["cross_references"]:
+                    f.write(f"> **{ref}** — {resolver.render(ref)}\n")
+
+            if graph is not None and hops >= 2:
+                # distance 1 is the cross-reference list already written above
+                connected = [(node, d) for node, d in graph.walk(entry["reference"], hops) if d >= 2]
+                if connected:
+                    f.write(f"\nConnected (up to {hops} hops):\n")
+                    for node, distance in connected:
+                        line = f"- {node} ({distance} hops)"
+                        if resolver is not None:
+                            line += f" — {resolver.render(node)}"
+                        f.write(line + "\n")
+
             f.write("\n---\n\n")
 
 
 def export_json(tagged, output_file: Path):
+    from json_stream import write_json_array
+
+    # streamed item by item, so tagged may be a generator
     with output_file.open("w", encoding="utf-8") as f:
-        json.dump(tagged, f, indent=4, ensure_ascii=False)
+        write_json_array(tagged, f)
 
 
 # ---------------------------
 # PROCESSOR
 # ---------------------------
 
-def process_scripture_file(input_file: Path):
-    tagged = []
+def parse_scripture_lines(lines, store=None):
+    """
+    Yields (reference, text) pairs from `Book Chapter:Verse | text` lines.
+    With a VerseStore (verse_store.py), bare reference lines such as
+    "Deut 7:6" or "Deut 28:15-20" (the Phase 1 list format) are also
+    accepted and their text is fetched from the store, one pair per verse.
+    """
+    for line in lines:
+        if "|" in line:
+            ref, text = line.split("|", 1)
+            yield ref.strip(), text.strip()
+            continue
+
+        if store is None or not line.strip():
+            continue
+
+        try:
+            verses = store.verses(line.strip())
+        except ValueError as e:
+            print(f"[WARN] Skipping reference: {e}")
+            continue
+        if not verses:
+            print(f"[WARN] Not in verse store: {line.strip()}")
+            continue
+
+        if len(verses) == 1:
+            yield line.strip(), verses[0][1]
+        else:
+            for vid, text in verses:
+                yield format_verse_id(vid), text
+
 
+def read_scripture_file(input_file: Path, store=None):
+    with input_file.open("r", encoding="utf-8") as f:
+        yield from parse_scripture_lines(f, store)
+
+
+def count_scripture_lines(input_file: Path, store=None) -> int:
+    """
+    Cheap pre-pass: number of verse lines, without tagging. Lines are read
+    exactly as read_scripture_file reads them (universal newlines), so CR
+    or CRLF input counts the verses the parser will yield.
+    With a store, reference lines count the stored verses they cover.
+    """
     with input_file.open("r", encoding="utf-8") as f:
+        if store is None:
+            return sum(1 for line in f if "|" in line)
+
+        total = 0
         for line in f:
-            if "|" not in line:
-                continue
+            if "|" in line:
+                total += 1
+            elif line.strip():
+                try:
+                    total += len(store.verse_ids(line.strip()))
+                except ValueError:
+                    pass
+        return total
 
-            ref, text = line.split("|", 1)
-            tagged.append(tag_verse(ref.strip(), text.strip()))
 
-    return tagged
+def iter_tagged_verses(input_file: Path, cache=None, store=None):
+    """
+    Streaming form of process_scripture_file: one tagged verse at a time.
+    With a TagCache, unchanged verses are served from the cache.
+    """
+    verses = read_scripture_file(input_file, store)
+    # the rule set is looked up once per run, not once per verse
+    tag = partial(tag_verse, rules=theme_rules.active())
+    if cache is not None:
+        yield from cache.tag_all(verses, tag)
+        return
+
+    for ref, text in verses:
+        yield tag(ref, text)
+
+
+def process_scripture_file(input_file: Path, cache=None, store=None):
+    return list(iter_tagged_verses(input_file, cache, store))
 
 
 # ---------------------------
@@ -161,15 +273,61 @@ def process_scripture_file(input_file: Path):
 # ---------------------------
 
 if __name__ == "__main__":
+    import argparse
+
     base = Path(__file__).resolve().parent
 
     input_file = base / "verses_input.txt"
     outline_output = base / "teaching_outline_v3.md"
     json_output = base / "tagged_output_v3.json"
 
-    tagged_verses = process_scripture_file(input_file)
-
-    export_teaching_outline(tagged_verses, outline_output)
+    parser = argparse.ArgumentParser(description="UTM Scripture Tagger – Phase 3")
+    parser.add_argument("--input", default=str(input_file),
+                        help="Verse file: `Book C:V | text` lines, or bare references with --store")
+    parser.add_argument("--store", default=None, metavar="BIBLE_FILE",
+                        help="Full Bible text (`Book C:V | text`) that bare references are read from")
+    parser.add_argument("--inline-refs", nargs="?", const="", default=None,
+                        metavar="VERSE_FILE",
+                        help="Inline cross-reference text in the outline, resolved from a "
+                             "`Book C:V | text` file (default: --store, else the input verses)")
+    parser.add_argument("--scoring", choices=SCORING_MODES, default=SCORING_MODE,
+                        help="Keyword matching: substring (original) or token (whole words, "
+                             "every occurrence counts)")
+    parser.add_argument("--hops", type=int, default=1,
+                        help="Also list verses connected through up to N cross-reference hops")
+    parser.add_argument("--rules", default=None, metavar="RULES_FILE",
+                        help="Theme rules (.json or .toml; default: theme_rules.json)")
+    args = parser.parse_args()
+    set_scoring_mode(args.scoring)
+    try:
+        theme_rules.use_rules(args.rules)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"[ERROR] {e}")
+        raise SystemExit(1)
+
+    store = None
+    if args.store:
+        from verse_store import VerseStore
+
+        store = VerseStore(Path(args.store))
+
+    tagged_verses = process_scripture_file(Path(args.input), store=store)
+
+    resolver = graph = None
+    if args.inline_refs is not None or args.hops >= 2:
+        from cross_references import CrossReferenceGraph, CrossReferenceResolver
+
+        if args.inline_refs is not None:
+            from verse_store import VerseStore
+
+            if args.inline_refs:
+                resolver = CrossReferenceResolver(VerseStore(Path(args.inline_refs)))
+            else:
+                resolver = CrossReferenceResolver(store or VerseStore(Path(args.input)))
+        if args.hops >= 2:
+            graph = CrossReferenceGraph.build(tagged_verses, theme_rules.active().cross_references)
+
+    export_teaching_outline(tagged_verses, outline_output, resolver, graph, args.hops)
     export_json(tagged_verses, json_output)
 
     print("✔ Phase 3 tagging completed.")
@@ -1,93 +1,499 @@
 # UTM Scripture Tagger – Phase 4
 # Output Engine: JSON, Markdown, CSV, Pretty Text
-# Adds --json, --md, --csv, --all switches
+# Adds --json, --md, --csv, --bin, --all switches
+# --stream tags and writes one verse at a time (memory independent of corpus size)
+# --workers N tags byte-range chunks of the input in a process pool
+# --profile prints per-stage timings and stores them in the JSON metadata
+# --store BIBLE_FILE lets --input list bare references; text comes from the store
+# --rules FILE tags with theme rules from a JSON/TOML file (default theme_rules.json)
+# --compress gzip|zstd compresses the text formats; every format is written in
+#   large chunks on its own thread (see bulk_export.py)
+#
+# Startup matters (shell loops, Lambda): everything beyond pathlib is
+# imported inside the function that needs it, so --help and single-format
+# runs only pay for what they use. benchmark_tagger.py --check-startup
+# enforces the budget.
 
-import json
-import csv
-import argparse
 from pathlib import Path
-from datetime import datetime
-from scripture_tagger_v3 import tag_verse, process_scripture_file
 
+# Below this size a chunk is not worth shipping to another process
+MIN_CHUNK_BYTES = 1 << 20
 
-def ensure_dirs(base: Path):
-    """Create output directories if missing."""
-    (base / "json").mkdir(parents=True, exist_ok=True)
-    (base / "markdown").mkdir(parents=True, exist_ok=True)
-    (base / "csv").mkdir(parents=True, exist_ok=True)
-    (base / "text").mkdir(parents=True, exist_ok=True)
+# format flag -> export subdirectory
+OUTPUT_DIRS = {
+    "json": "json",
+    "md": "markdown",
+    "csv": "csv",
+    "text": "text",
+    "bin": "binary",
+}
 
 
-def save_json(data, output_path: Path, meta):
-    bundle = {"metadata": meta, "verses": data}
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(bundle, f, indent=4, ensure_ascii=False)
+def ensure_dirs(base: Path, formats=None):
+    """Create output directories if missing (only those of `formats`, default all)."""
+    for fmt in formats or OUTPUT_DIRS:
+        (base / OUTPUT_DIRS[fmt]).mkdir(parents=True, exist_ok=True)
 
 
-def save_markdown(data, output_path: Path, meta):
-    with output_path.open("w", encoding="utf-8") as f:
-        f.write("# UTM Tagged Scripture Output – Phase 4\n")
-        f.write(f"Generated: {meta['timestamp']}\n")
-        f.write(f"Script Version: {meta['version']}\n")
-        f.write(f"Total Verses: {meta['total']}\n\n")
+# ---------------------------
+# PARALLEL TAGGING
+# ---------------------------
 
-        for entry in data:
-            f.write(f"## {entry['reference']}\n")
-            f.write(f"{entry['text']}\n\n")
-            f.write(f"**Themes:** {', '.join(entry['themes'])}\n\n---\n\n")
+def chunk_byte_ranges(input_file: Path, chunks: int):
+    """
+    Split a file into up to `chunks` (start, end) byte ranges. Every range
+    ends just after a newline, so no line (or UTF-8 character) is split.
+    """
+    size = input_file.stat().st_size
+    chunks = max(1, min(chunks, size // MIN_CHUNK_BYTES))
+    step = size // chunks
 
+    ranges = []
+    start = 0
 
-def save_csv(data, output_path: Path):
-    with output_path.open("w", newline="", encoding="utf-8") as f:
+    with input_file.open("rb") as f:
+        for i in range(1, chunks):
+            if start >= size:
+                break
+            f.seek(max(start, i * step))
+            f.readline()
+            end = f.tell()
+            if end > start:
+                ranges.append((start, end))
+                start = end
+
+    if start < size or not ranges:
+        ranges.append((start, size))
+
+    return ranges
+
+
+def tag_byte_range(job):
+    """
+    Worker: tag every verse line inside one byte range of the input.
+    Returns the tagged verses and the cache keys they used (for pruning).
+    """
+    import io
+    from functools import partial
+
+    import theme_rules
+    from scripture_tagger_v3 import (
+        config_fingerprint,
+        parse_scripture_lines,
+        set_scoring_mode,
+        tag_verse,
+    )
+
+    input_file, start, end, cache_path, store_path, scoring, rules_path = job
+    # workers may be spawned rather than forked, so mode and rules travel with the job
+    set_scoring_mode(scoring)
+    rules = theme_rules.use_rules(rules_path)
+
+    with open(input_file, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+
+    # same universal-newline decoding as the serial text-mode reader
+    lines = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8")
+
+    store = None
+    if store_path is not None:
+        from verse_store import VerseStore
+
+        store = VerseStore(store_path)
+
+    try:
+        if cache_path is None:
+            return [tag_verse(ref, text, rules) for ref, text in parse_scripture_lines(lines, store)], set()
+
+        from tag_cache import TagCache
+
+        with TagCache(cache_path, config_fingerprint()) as cache:
+            tag = partial(tag_verse, rules=rules)
+            return list(cache.tag_all(parse_scripture_lines(lines, store), tag)), cache.seen
+    finally:
+        if store is not None:
+            store.close()
+
+
+def parallel_tagged_verses(input_file: Path, workers: int, chunks_per_worker: int = 4,
+                           cache_path=None, store_path=None, scoring="substring", rules_path=None,
+                           cache_keys=None):
+    """
+    Tag the input in a process pool. Chunk results are yielded back in
+    file order, so the writers see exactly the serial sequence. The cache
+    keys the workers used are added to the `cache_keys` set, if given.
+
+    At most 2 x workers chunks are submitted ahead of the one being
+    yielded, so finished chunks cannot pile up behind a slow consumer.
+    """
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import islice
+
+    ranges = chunk_byte_ranges(input_file, workers * chunks_per_worker)
+    cache_arg = str(cache_path) if cache_path is not None else None
+    store_arg = str(store_path) if store_path is not None else None
+    rules_arg = str(rules_path) if rules_path is not None else None
+    jobs = ((str(input_file), start, end, cache_arg, store_arg, scoring, rules_arg) for start, end in ranges)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = deque(pool.submit(tag_byte_range, job) for job in islice(jobs, 2 * workers))
+        try:
+            while window:
+                chunk, keys = window.popleft().result()
+                for job in islice(jobs, 1):
+                    window.append(pool.submit(tag_byte_range, job))
+                if cache_keys is not None:
+                    cache_keys.update(keys)
+                yield from chunk
+        finally:
+            # consumer stopped early (or a chunk failed): drop queued chunks
+            for future in window:
+                future.cancel()
+
+
+# ---------------------------
+# STREAMING SINKS
+# ---------------------------
+# Each sink is a generator-based coroutine: prime it, send() one tagged
+# verse at a time, then close() to finish the file. If the run fails, the
+# error is thrown into the sink instead, which discards its partial file. The save_* functions
+# below are thin wrappers, so batch and streaming runs write identical files.
+# stream_to_sinks hands every sink a TaggedVerse (dicts are converted once),
+# so the sinks read attributes rather than going through its __getitem__.
+# Text sinks write through bulk_export.open_export: `compress` ("gzip" or
+# "zstd") appends .gz/.zst to the file name, `background` moves the chunked
+# writes to a per-file thread.
+
+def json_sink(output_path: Path, meta, metadata_last: bool = False, compress=None, background=False):
+    """
+    metadata_last writes the "metadata" block after the verses, so values
+    only known at the end of a run (such as --profile results) can go in.
+    """
+    from bulk_export import open_export
+    from json_stream import JsonArrayWriter, dumps_indented
+
+    with open_export(output_path, compress, background) as f:
+        if metadata_last:
+            f.write('{\n    "verses": ')
+        else:
+            f.write('{\n    "metadata": ' + dumps_indented(meta, 1) + ',\n    "verses": ')
+        verses = JsonArrayWriter(f, level=1)
+        try:
+            while True:
+                verses.write((yield))
+        except GeneratorExit:
+            verses.close()
+            if metadata_last:
+                f.write(',\n    "metadata": ' + dumps_indented(meta, 1))
+            f.write("\n}")
+
+
+def markdown_sink(output_path: Path, meta, compress=None, background=False):
+    from bulk_export import open_export
+
+    with open_export(output_path, compress, background) as f:
+        f.write("# UTM Tagged Scripture Output – Phase 4\n"
+                f"Generated: {meta['timestamp']}\n"
+                f"Script Version: {meta['version']}\n"
+                f"Total Verses: {meta['total']}\n\n")
+
+        while True:
+            entry = yield
+            f.write(f"## {entry.reference}\n"
+                    f"{entry.text}\n\n"
+                    f"**Themes:** {', '.join(entry.themes)}\n\n---\n\n")
+
+
+def csv_sink(output_path: Path, compress=None, background=False):
+    import csv
+
+    from bulk_export import open_export
+
+    with open_export(output_path, compress, background, newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["reference", "text", "themes"])
 
-        for e in data:
-            writer.writerow([e["reference"], e["text"], ", ".join(e["themes"])])
+        while True:
+            e = yield
+            writer.writerow([e.reference, e.text, ", ".join(e.themes)])
+
+
+def text_sink(output_path: Path, compress=None, background=False):
+    from bulk_export import open_export
+
+    rule = "-" * 40 + "\n"
+    with open_export(output_path, compress, background) as f:
+        while True:
+            e = yield
+            f.write(f"{e.reference} :: {', '.join(e.themes)}\n{e.text}\n{rule}")
+
+
+def binary_sink(output_path: Path):
+    """
+    Compact memory-mappable format (see tagged_binary.py). Never
+    compressed: readers map the file directly.
+    """
+    from tagged_binary import TaggedBinaryWriter
+
+    writer = TaggedBinaryWriter(output_path)
+    try:
+        while True:
+            writer.add((yield))
+    except GeneratorExit:
+        writer.close()
+    except BaseException:
+        writer.discard()
+        raise
+
+
+def profiled_sink(sink, profiler, name: str):
+    """Wrap a sink so its send/close time is accumulated into a profiler stage."""
+    send = profiler.wrap(name, sink.send)
+    next(sink)
+    try:
+        while True:
+            send((yield))
+    except GeneratorExit:
+        with profiler.stage(name):
+            sink.close()
+    except BaseException as e:
+        sink.throw(e)
+        raise
+
+
+def stream_to_sinks(verses, sinks, before_close=None) -> int:
+    """
+    Fan every verse out to all sinks in one pass; returns the verse count.
+    before_close() runs after the last verse, just before the files are finished.
+    """
+    from tagged_verse import TaggedVerse
+
+    count = 0
+    open_sinks = []
+    try:
+        # primed inside the try: if a later sink cannot open its file, the
+        # ones already started still clean up
+        for sink in sinks:
+            next(sink)
+            open_sinks.append(sink)
+
+        for entry in verses:
+            entry = TaggedVerse.of(entry)
+            for sink in sinks:
+                sink.send(entry)
+            count += 1
+        if before_close is not None:
+            before_close()
+        while open_sinks:
+            open_sinks.pop(0).close()
+    except BaseException as e:
+        # every sink not finished yet deletes its partial file
+        tb = e.__traceback__
+        for sink in open_sinks:
+            try:
+                sink.throw(e)
+            except BaseException:
+                pass
+        raise e.with_traceback(tb)
+
+    return count
+
+
+def save_json(data, output_path: Path, meta):
+    stream_to_sinks(data, [json_sink(output_path, meta)])
+
+
+def save_markdown(data, output_path: Path, meta):
+    stream_to_sinks(data, [markdown_sink(output_path, meta)])
+
+
+def save_csv(data, output_path: Path):
+    stream_to_sinks(data, [csv_sink(output_path)])
 
 
 def save_text(data, output_path: Path):
-    with output_path.open("w", encoding="utf-8") as f:
-        for e in data:
-            f.write(f"{e['reference']} :: {', '.join(e['themes'])}\n")
-            f.write(f"{e['text']}\n")
-            f.write("-" * 40 + "\n")
+    stream_to_sinks(data, [text_sink(output_path)])
 
 
-if __name__ == "__main__":
-    base = Path(__file__).resolve().parent
-    export_base = base / "../exports/v3"
-    export_base.mkdir(parents=True, exist_ok=True)
-    ensure_dirs(export_base)
+def save_binary(data, output_path: Path):
+    stream_to_sinks(data, [binary_sink(output_path)])
+
+
+def parse_args(base: Path):
+    import argparse
 
     parser = argparse.ArgumentParser(description="UTM Scripture Tagger – Phase 4 Output Engine")
     parser.add_argument("--json", action="store_true")
     parser.add_argument("--md", action="store_true")
     parser.add_argument("--csv", action="store_true")
     parser.add_argument("--text", action="store_true")
+    parser.add_argument("--bin", action="store_true",
+                        help="Compact binary corpus readable by Phase 5/6 without json.load")
     parser.add_argument("--all", action="store_true")
+    parser.add_argument("--stream", action="store_true",
+                        help="Tag and write one verse at a time instead of loading the corpus")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Tag the input with N processes (output is identical to a serial run)")
+    parser.add_argument("--cache", nargs="?", const=str(base / "tag_cache.sqlite"), default=None,
+                        help="Reuse tags for unchanged verses from an SQLite cache "
+                             "(default path: tag_cache.sqlite next to this script)")
+    parser.add_argument("--scoring", choices=("substring", "token"), default="substring",
+                        help="Keyword matching: substring (original) or token (whole words, "
+                             "every occurrence counts)")
+    parser.add_argument("--rules", default=None, metavar="RULES_FILE",
+                        help="Theme rules (.json or .toml; default: theme_rules.json)")
+    parser.add_argument("--input", default=str(base / "verses_input.txt"),
+                        help="Verse file: `Book C:V | text` lines, or bare references with --store")
+    parser.add_argument("--store", default=None, metavar="BIBLE_FILE",
+                        help="Full Bible text that bare reference lines are read from (mmap, indexed once)")
+    parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                        help="Compress the JSON/Markdown/CSV/text outputs (.gz / .zst; zstd needs zstandard)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record wall/CPU time, items and peak memory per stage; "
+                             "the table is printed and stored in the JSON metadata")
+    parser.add_argument("--profile-stage", default=None,
+                        help="Also run this stage under cProfile (e.g. score_themes, write:json)")
+    parser.add_argument("--profile-output", default=None,
+                        help="cProfile dump path (default: profile_<stage>.prof)")
+
+    return parser.parse_args()
+
+
+def main():
+    base = Path(__file__).resolve().parent
+    args = parse_args(base)
+
+    formats = [fmt for fmt in OUTPUT_DIRS if args.all or getattr(args, fmt)]
+    if not formats:
+        print("No output format selected. Use --json, --md, --csv, --text, --bin or --all.")
+        return
+
+    from datetime import datetime
 
-    args = parser.parse_args()
+    from bulk_export import check_compression
 
-    input_file = base / "verses_input.txt"
-    tagged = process_scripture_file(input_file)
+    try:
+        check_compression(args.compress)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return
+
+    import scripture_tagger_v3
+    import theme_rules
+    from scripture_tagger_v3 import config_fingerprint, count_scripture_lines, iter_tagged_verses
+    from stage_profiler import StageProfiler
+
+    # before the cache is opened: rules and mode make up its fingerprint
+    try:
+        rules = theme_rules.use_rules(args.rules)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"[ERROR] {e}")
+        return
+    scripture_tagger_v3.set_scoring_mode(args.scoring)
+
+    export_base = base / "../exports/v3"
+    ensure_dirs(export_base, formats)
+
+    profiler = StageProfiler(args.profile, args.profile_stage, args.profile_output)
+    # per-verse work is interleaved, so it is timed per call
+    profiler.instrument(scripture_tagger_v3, "tag_verse")
+    profiler.instrument(scripture_tagger_v3, "score_themes")
+    profiler.instrument(scripture_tagger_v3, "generate_cross_references", "cross_references")
+
+    input_file = Path(args.input)
+
+    store = None
+    if args.store:
+        from verse_store import VerseStore
+
+        # built (or refreshed) here once, so workers only read the offset table
+        store = VerseStore(Path(args.store))
+
+    cache = None
+    if args.cache:
+        from tag_cache import TagCache
+
+        # opening the cache here also drops it if the theme rules changed;
+        # entries this run does not use are pruned once it has finished
+        cache = TagCache(Path(args.cache), config_fingerprint())
+
+    if args.workers > 1:
+        # each worker opens its own connection to the same cache file
+        cache_path = cache.path if cache is not None else None
+        tagged = parallel_tagged_verses(input_file, args.workers, cache_path=cache_path,
+                                        store_path=store.source if store is not None else None,
+                                        scoring=args.scoring, rules_path=rules.source,
+                                        cache_keys=cache.seen if cache is not None else None)
+    else:
+        tagged = iter_tagged_verses(input_file, cache, store)
+
+    if args.stream:
+        # totals come from a cheap pre-pass so headers can be written first
+        with profiler.stage("count_lines"):
+            total = count_scripture_lines(input_file, store)
+        profiler.add_items("count_lines", total)
+    else:
+        with profiler.stage("parse+tag"):
+            tagged = list(tagged)
+        total = len(tagged)
+        profiler.add_items("parse+tag", total)
 
     meta = {
         "version": "3.0",
         "timestamp": datetime.now().isoformat(),
-        "total": len(tagged),
+        "total": total,
     }
+    if args.scoring != "substring":
+        meta["scoring"] = args.scoring
+
+    sinks = []
+    # every text format writes its chunks on its own thread, concurrently
+    # with tagging and with the other formats
+    out = {"compress": args.compress, "background": True}
+
+    if "json" in formats:
+        sinks.append(("json", json_sink(export_base / "json/tagged_output_v3.json", meta,
+                                         metadata_last=args.profile, **out)))
+
+    if "md" in formats:
+        sinks.append(("markdown", markdown_sink(export_base / "markdown/tagged_output_v3.md", meta, **out)))
+
+    if "csv" in formats:
+        sinks.append(("csv", csv_sink(export_base / "csv/tagged_output_v3.csv", **out)))
+
+    if "text" in formats:
+        sinks.append(("text", text_sink(export_base / "text/tagged_output_v3.txt", **out)))
 
-    if args.all or args.json:
-        save_json(tagged, export_base / "json/tagged_output_v3.json", meta)
+    if "bin" in formats:
+        sinks.append(("binary", binary_sink(export_base / "binary/tagged_output_v3.utmtag")))
 
-    if args.all or args.md:
-        save_markdown(tagged, export_base / "markdown/tagged_output_v3.md", meta)
+    if args.profile:
+        sinks = [(name, profiled_sink(sink, profiler, f"write:{name}")) for name, sink in sinks]
 
-    if args.all or args.csv:
-        save_csv(tagged, export_base / "csv/tagged_output_v3.csv")
+    def record_profile():
+        # the JSON metadata block is written after this, so it carries the profile
+        if args.profile:
+            meta["profile"] = profiler.summary()
 
-    if args.all or args.text:
-        save_text(tagged, export_base / "text/tagged_output_v3.txt")
+    with profiler.stage("stream+write" if args.stream else "write", items=total):
+        stream_to_sinks(tagged, [sink for _, sink in sinks], before_close=record_profile)
+
+    if cache is not None:
+        pruned = cache.prune()
+        cache.close()
+        if args.workers <= 1:
+            print(f"Cache: {cache.hits} hit(s), {cache.misses} tagged, {pruned} stale removed")
+        else:
+            print(f"Cache: {pruned} stale entries removed")
+
+    if store is not None:
+        store.close()
 
     print("✔ Phase 4 outputs generated successfully.")
+    profiler.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,118 +8,319 @@ Features:
 - Facebook/website snippet generator
 - Slide deck outline (JSON + MD)
 - Version stamping
+- Single-pass publishing to pluggable sinks
 """
 
 from pathlib import Path
-import json
 from datetime import datetime
 from collections import defaultdict
 
+# json, argparse and the binary reader are imported where used, to keep
+# CLI startup (and `import scripture_tagger_v5`) cheap
+
 
 VERSION = "Phase 5.0"
 
 
-def group_by_theme(tagged_data):
-    """Group verses by their themes."""
-    theme_groups = defaultdict(list)
-    for entry in tagged_data:
-        for theme in entry["themes"]:
-            theme_groups[theme].append(entry)
-    return theme_groups
+# ---------------------------
+# PUBLISHING PIPELINE
+# ---------------------------
+# The dataset is traversed once: every entry is bucketed into a shared
+# ThemeView and handed to each sink's entry() hook. The buckets are then
+# walked once, fanning each theme out to every sink's theme() hook.
+# New formats register a sink class (with its default output files)
+# instead of adding another pass; main() publishes every registered sink.
 
+class ThemeView:
+    """
+    Theme-bucketed view of the tagged data (buckets hold references, not
+    copies). Entries are TaggedVerse records, so the sinks read their
+    attributes directly.
+    """
 
-def export_markdown_report(tagged_data, output_file: Path):
-    groups = group_by_theme(tagged_data)
+    def __init__(self):
+        self.groups = defaultdict(list)
+        self.total = 0
+
+    def add(self, entry):
+        self.total += 1
+        for theme in entry.themes:
+            self.groups[theme].append(entry)
+
+
+class PublishSink:
+    """Base class for publishing sinks; override the hooks a format needs."""
+
+    def start(self):
+        pass
+
+    def entry(self, entry):
+        pass
+
+    def begin_groups(self, view: ThemeView):
+        pass
+
+    def theme(self, theme, verses):
+        pass
+
+    def finish(self):
+        pass
+
+
+# name -> (sink class, default output file names passed to its constructor)
+SINKS = {}
+
+
+def register_sink(name, *outputs):
+    """Class decorator: publish this sink from main() under `name`, writing `outputs`."""
+    def decorator(cls):
+        SINKS[name] = (cls, outputs)
+        return cls
+    return decorator
+
+
+def publish(tagged_data, sinks):
+    """
+    Run every sink over the data with one traversal of the entries and one
+    of the themes. Entries may be TaggedVerse records or their dicts.
+    """
+    from tagged_verse import TaggedVerse
+
+    view = ThemeView()
+    started = []
 
-    with output_file.open("w", encoding="utf-8") as f:
+    try:
+        for sink in sinks:
+            sink.start()
+            started.append(sink)
+
+        for entry in tagged_data:
+            entry = TaggedVerse.of(entry)
+            view.add(entry)
+            for sink in sinks:
+                sink.entry(entry)
+
+        for sink in sinks:
+            sink.begin_groups(view)
+
+        for theme, verses in view.groups.items():
+            for sink in sinks:
+                sink.theme(theme, verses)
+    finally:
+        # a sink whose start() failed (or was never reached) has nothing to finish
+        for sink in started:
+            sink.finish()
+
+    return view
+
+
+@register_sink("report", "tagged_output_v5.md")
+class MarkdownReportSink(PublishSink):
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+
+    def start(self):
+        self.f = self.output_file.open("w", encoding="utf-8")
+
+    def begin_groups(self, view):
+        f = self.f
         f.write(f"# UTM Tagged Scripture Report\n")
         f.write(f"### Version: {VERSION}\n")
         f.write(f"### Generated: {datetime.now()}\n\n")
         f.write("## Table of Contents\n")
-        for theme in groups:
+        for theme in view.groups:
             f.write(f"- [{theme.title()}](#{theme})\n")
         f.write("\n---\n\n")
 
-        for theme, verses in groups.items():
-            f.write(f"## {theme}\n\n")
-            for v in verses:
-                f.write(f"### {v['reference']}\n")
-                f.write(f"{v['text']}\n\n")
-            f.write("\n---\n")
+    def theme(self, theme, verses):
+        f = self.f
+        f.write(f"## {theme}\n\n")
+        for v in verses:
+            f.write(f"### {v.reference}\n")
+            f.write(f"{v.text}\n\n")
+        f.write("\n---\n")
 
+    def finish(self):
+        self.f.close()
 
-def export_slide_outline(tagged_data, output_json: Path, output_md: Path):
-    """Creates a slide-friendly structure."""
-    slides = []
-    groups = group_by_theme(tagged_data)
-
-    # Title slide
-    slides.append({
-        "type": "title",
-        "title": "UTM Teaching – Tagged Scripture Breakdown",
-        "version": VERSION
-    })
-
-    # Theme slides
-    for theme, verses in groups.items():
-        slides.append({
+
+@register_sink("slides", "slides_v5.json", "slides_v5.md")
+class SlideOutlineSink(PublishSink):
+    """Creates a slide-friendly structure; JSON and Markdown are written side by side."""
+
+    def __init__(self, output_json: Path, output_md: Path):
+        self.output_json = output_json
+        self.output_md = output_md
+
+    def start(self):
+        from json_stream import JsonArrayWriter
+
+        self.json_file = self.output_json.open("w", encoding="utf-8")
+        self.md_file = self.output_md.open("w", encoding="utf-8")
+        self.slides = JsonArrayWriter(self.json_file)
+
+        # Title slide
+        title = {
+            "type": "title",
+            "title": "UTM Teaching – Tagged Scripture Breakdown",
+            "version": VERSION
+        }
+        self.slides.write(title)
+        self.md_file.write("# Slide Deck Outline\n\n")
+        self.md_file.write(f"# {title['title']}\n")
+        self.md_file.write(f"**Version:** {VERSION}\n\n")
+
+    def theme(self, theme, verses):
+        # Theme slides
+        slide = {
             "type": "theme",
             "theme": theme,
-            "bullet_points": [f"{v['reference']}: {v['text']}" for v in verses]
-        })
-
-    # Write JSON
-    with output_json.open("w", encoding="utf-8") as f:
-        json.dump(slides, f, indent=4, ensure_ascii=False)
-
-    # Write Markdown outline
-    with output_md.open("w", encoding="utf-8") as f:
-        f.write("# Slide Deck Outline\n\n")
-        for s in slides:
-            if s["type"] == "title":
-                f.write(f"# {s['title']}\n")
-                f.write(f"**Version:** {VERSION}\n\n")
-            else:
-                f.write(f"## {s['theme'].title()}\n")
-                for b in s["bullet_points"]:
-                    f.write(f"- {b}\n")
-                f.write("\n")
+            "bullet_points": [f"{v.reference}: {v.text}" for v in verses]
+        }
+        self.slides.write(slide)
 
+        self.md_file.write(f"## {theme.title()}\n")
+        for b in slide["bullet_points"]:
+            self.md_file.write(f"- {b}\n")
+        self.md_file.write("\n")
 
-def export_social_snippets(tagged_data, output_file: Path):
+    def finish(self):
+        self.slides.close()
+        self.json_file.close()
+        self.md_file.close()
+
+
+@register_sink("social", "social_snippets_v5.md")
+class SocialSnippetSink(PublishSink):
     """Generates short UTM truth posts + hashtags."""
-    with output_file.open("w", encoding="utf-8") as f:
-        f.write("# Social Media Snippets\n\n")
-        for entry in tagged_data:
-            summary = entry["text"]
-            themes = entry["themes"]
 
-            hashtags = " ".join([f"#{t.lower()}" for t in themes])
-            hashtags += " #unitedtruthministry #scripture #truth"
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+
+    def start(self):
+        self.f = self.output_file.open("w", encoding="utf-8")
+        self.f.write("# Social Media Snippets\n\n")
+
+    def entry(self, entry):
+        summary = entry.text
+        themes = entry.themes
+
+        hashtags = " ".join([f"#{t.lower()}" for t in themes])
+        hashtags += " #unitedtruthministry #scripture #truth"
+
+        self.f.write(f"**{entry.reference}** – {summary}\n")
+        self.f.write(f"{hashtags}\n\n---\n\n")
+
+    def finish(self):
+        self.f.close()
+
+
+# ---------------------------
+# SINGLE-FORMAT EXPORTS
+# ---------------------------
+
+def group_by_theme(tagged_data):
+    """Group verses by their themes."""
+    from tagged_verse import TaggedVerse
+
+    view = ThemeView()
+    for entry in tagged_data:
+        view.add(TaggedVerse.of(entry))
+    return view.groups
+
+
+def export_markdown_report(tagged_data, output_file: Path):
+    publish(tagged_data, [MarkdownReportSink(output_file)])
+
+
+def export_slide_outline(tagged_data, output_json: Path, output_md: Path):
+    """Creates a slide-friendly structure."""
+    publish(tagged_data, [SlideOutlineSink(output_json, output_md)])
+
 
-            f.write(f"**{entry['reference']}** – {summary}\n")
-            f.write(f"{hashtags}\n\n---\n\n")
+def export_social_snippets(tagged_data, output_file: Path):
+    """Generates short UTM truth posts + hashtags."""
+    publish(tagged_data, [SocialSnippetSink(output_file)])
 
 
 def process_v3_export(input_json: Path):
-    """Phase 5 operates from v3 JSON output."""
+    """
+    Phase 5 operates from v3 JSON output (or the binary .utmtag form of it),
+    as a sequence of TaggedVerse records.
+    """
+    import json
+
+    from tagged_binary import TaggedCorpus, is_tagged_binary
+    from tagged_verse import TaggedVerse
+
+    if is_tagged_binary(input_json):
+        return TaggedCorpus(input_json)
+
     with input_json.open("r", encoding="utf-8") as f:
-        return json.load(f)
+        return [TaggedVerse.from_dict(entry) for entry in json.load(f)]
 
 
-if __name__ == "__main__":
+def default_input(base: Path) -> Path:
+    """
+    tagged_output_v3.json (Phase 3–4) next to the script, or the v4 binary
+    export (scripture_tagger_v4.py --bin) when there is no JSON.
+    """
+    json_file = base / "tagged_output_v3.json"
+    binary_file = base / "../exports/v3/binary/tagged_output_v3.utmtag"
+    if not json_file.exists() and binary_file.exists():
+        return binary_file
+    return json_file
+
+
+def main():
+    import argparse
+
+    from stage_profiler import StageProfiler
+
+    parser = argparse.ArgumentParser(description="UTM Phase 5 – publish reports from the v3 export")
+    parser.add_argument("--input", default=None, metavar="TAGGED_FILE",
+                        help="v3 tagged JSON or binary .utmtag corpus (default: tagged_output_v3.json, "
+                             "else ../exports/v3/binary/tagged_output_v3.utmtag)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print wall/CPU time, items and peak memory per stage and sink")
+    parser.add_argument("--profile-stage", default=None,
+                        help="Also run this stage under cProfile (e.g. publish, sink:report)")
+    parser.add_argument("--profile-output", default=None,
+                        help="cProfile dump path (default: profile_<stage>.prof)")
+    args = parser.parse_args()
+
+    profiler = StageProfiler(args.profile, args.profile_stage, args.profile_output)
     base = Path(__file__).resolve().parent
 
-    v3_file = base / "tagged_output_v3.json"   # generated in Phase 3–4
-    tagged = process_v3_export(v3_file)
+    v3_file = Path(args.input) if args.input else default_input(base)
+    if not v3_file.exists():
+        print(f"[ERROR] Tagged input not found: {v3_file}")
+        raise SystemExit(1)
+
+    with profiler.stage("load"):
+        tagged = process_v3_export(v3_file)
+    profiler.add_items("load", len(tagged))
 
-    export_markdown_report(tagged, base / "tagged_output_v5.md")
-    export_slide_outline(tagged, base / "slides_v5.json", base / "slides_v5.md")
-    export_social_snippets(tagged, base / "social_snippets_v5.md")
+    sinks = {name: cls(*(base / output for output in outputs)) for name, (cls, outputs) in SINKS.items()}
+    # every hook of a sink is accumulated into one "sink:<name>" stage
+    for name, sink in sinks.items():
+        for hook in ("start", "entry", "begin_groups", "theme", "finish"):
+            profiler.instrument(sink, hook, f"sink:{name}")
+
+    try:
+        with profiler.stage("publish", items=len(tagged)):
+            publish(tagged, list(sinks.values()))
+    finally:
+        # a binary corpus is a TaggedCorpus holding the file's mmap
+        if hasattr(tagged, "close"):
+            tagged.close()
 
     print("✔ PHASE 5 complete.")
     print("Generated outputs:")
-    print("- Markdown Report: tagged_output_v5.md")
-    print("- Slide JSON:      slides_v5.json")
-    print("- Slide MD:        slides_v5.md")
-    print("- Social Posts:    social_snippets_v5.md")
+    for name, (_, outputs) in SINKS.items():
+        print(f"- {name + ':':<8} {', '.join(outputs)}")
+    profiler.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+UTM Stage Profiler
+Opt-in per-stage timing for the generator CLIs (--profile).
+
+Two kinds of stages are recorded:
+
+- block stages:   `with profiler.stage("load", items=n): ...`
+                  wall time, CPU time, item count, peak traced memory
+- call stages:    `profiler.instrument(module, "score_themes")`
+                  wraps a function and accumulates wall/CPU time and call
+                  count across every call (for work interleaved per verse)
+
+One stage can also be run under cProfile and dumped to a .prof file.
+A disabled profiler makes every hook a no-op, so callers never branch.
+"""
+
+from __future__ import annotations
+
+import functools
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class StageProfiler:
+    def __init__(self, enabled: bool = False, cprofile_stage: str | None = None,
+                 cprofile_output: str | None = None):
+        self.enabled = enabled
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_output = cprofile_output or (
+            f"profile_{cprofile_stage}.prof" if cprofile_stage else None
+        )
+        self.stages: Dict[str, Dict] = {}
+        self._patches = []
+        self._cprofile = None
+        self._started_tracing = False
+
+        # imported only when enabled: a disabled profiler must not slow CLI startup
+        if enabled:
+            import tracemalloc
+
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if cprofile_stage:
+                import cProfile
+
+                self._cprofile = cProfile.Profile()
+
+    def _record(self, name: str) -> Dict:
+        if name not in self.stages:
+            self.stages[name] = {"stage": name, "wall_s": 0.0, "cpu_s": 0.0,
+                                 "items": 0, "calls": 0, "peak_mem_bytes": None}
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str, items: int | None = None):
+        if not self.enabled:
+            yield
+            return
+
+        profiling = self._cprofile is not None and name == self.cprofile_stage
+        tracemalloc = self._tracemalloc
+        tracemalloc.reset_peak()
+        mem_before = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiling:
+            self._cprofile.enable()
+
+        try:
+            yield
+        finally:
+            if profiling:
+                self._cprofile.disable()
+            rec = self._record(name)
+            rec["wall_s"] += time.perf_counter() - wall
+            rec["cpu_s"] += time.process_time() - cpu
+            rec["calls"] += 1
+            if items is not None:
+                rec["items"] += items
+            peak = tracemalloc.get_traced_memory()[1] - mem_before
+            rec["peak_mem_bytes"] = max(rec["peak_mem_bytes"] or 0, peak)
+
+    def add_items(self, name: str, items: int) -> None:
+        if self.enabled:
+            self._record(name)["items"] += items
+
+    def wrap(self, name: str, fn):
+        """Return fn wrapped so each call is accumulated into stage `name`."""
+        if not self.enabled:
+            return fn
+
+        rec = self._record(name)
+        profiling = self._cprofile is not None and name == self.cprofile_stage
+        cprof = self._cprofile
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            if profiling:
+                cprof.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profiling:
+                    cprof.disable()
+                rec["wall_s"] += time.perf_counter() - wall
+                rec["cpu_s"] += time.process_time() - cpu
+                rec["calls"] += 1
+                rec["items"] += 1
+
+        return wrapper
+
+    def instrument(self, owner, attr: str, name: str | None = None) -> None:
+        """Replace owner.attr (module function or bound method) with a timed wrapper."""
+        if not self.enabled:
+            return
+        original = getattr(owner, attr)
+        self._patches.append((owner, attr, original))
+        setattr(owner, attr, self.wrap(name or attr, original))
+
+    def restore(self) -> None:
+        """Undo every instrument() patch."""
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches = []
+
+    def summary(self) -> List[Dict]:
+        rows = []
+        for rec in self.stages.values():
+            row = dict(rec)
+            row["wall_s"] = round(row["wall_s"], 6)
+            row["cpu_s"] = round(row["cpu_s"], 6)
+            rows.append(row)
+        return rows
+
+    def finish(self) -> None:
+        """
+        Restore patches, stop tracemalloc (if this profiler started it), dump
+        the cProfile stage (if any) and print the summary table.
+        """
+        if not self.enabled:
+            return
+
+        self.restore()
+        if self._started_tracing:
+            # tracing slows every allocation; do not leave it on behind the caller
+            self._tracemalloc.stop()
+            self._started_tracing = False
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(self.cprofile_output)
+
+        print("\nProfile (wall / CPU / items / peak memory per stage):")
+        print(f"  {'Stage':<28} {'Wall s':>9} {'CPU s':>9} {'Items':>10} {'Peak MB':>9}")
+        print(f"  {'-' * 28} {'-' * 9} {'-' * 9} {'-' * 10} {'-' * 9}")
+        for row in self.summary():
+            peak = row["peak_mem_bytes"]
+            peak_text = f"{peak / 1e6:>9.2f}" if peak is not None else f"{'-':>9}"
+            print(f"  {row['stage']:<28} {row['wall_s']:>9.3f} {row['cpu_s']:>9.3f} "
+                  f"{row['items']:>10} {peak_text}")
+
+        if self._cprofile is not None:
+            print(f"  cProfile for stage '{self.cprofile_stage}': {self.cprofile_output}")
@@ -11,6 +11,22 @@ Usage example:
         --max-per-theme 5 \
         --title "Identity & Covenant Study Session"
 
+    python3 study_pack_builder.py --query "identity AND NOT warning"
+
+    # restrict to passages (canonical verse-id range scans, see scripture_refs.py)
+    python3 study_pack_builder.py --themes warning --range "Deut 28:15-68; Lev 26"
+
+    # related verses (TF-IDF cosine, see verse_similarity.py; needs NumPy)
+    python3 study_pack_builder.py --themes covenant --related 3
+
+    # many packs + INDEX.md from one corpus load
+    python3 study_pack_builder.py --manifest study_packs_manifest.json --jobs 4
+
+    # per-stage timings (index, select, load_source, related, export)
+    python3 study_pack_builder.py --themes identity --profile
+
+Theme lookups go through a persistent inverted index saved next to the
+source JSON (see theme_index.py); it is rebuilt when the source changes.
 """
 
 
@@ -21,19 +37,31 @@ import json
 from pathlib import Path
 from typing import List, Dict, Set
 
+from stage_profiler import StageProfiler
+from tagged_verse import TaggedVerse, theme_bit
+
+
+def load_tagged_verses(source: Path) -> List[TaggedVerse]:
+    """
+    Load tagged verses from a JSON file as TaggedVerse records. Binary
+    .utmtag corpora (see tagged_binary.py) are memory-mapped instead and
+    behave like the list.
+    """
+    from tagged_binary import TaggedCorpus, is_tagged_binary
 
-def load_tagged_verses(source: Path) -> List[Dict]:
-    """Load tagged verse data from a JSON file."""
     if not source.exists():
         raise FileNotFoundError(f"Source JSON not found: {source}")
 
+    if is_tagged_binary(source):
+        return TaggedCorpus(source)
+
     with source.open("r", encoding="utf-8") as f:
         data = json.load(f)
 
     if not isinstance(data, list):
         raise ValueError("Expected list of verse entries in JSON.")
 
-    return data
+    return [TaggedVerse.from_dict(entry) for entry in data]
 
 
 def list_themes(tagged_data: List[Dict]) -> Set[str]:
@@ -62,15 +90,20 @@ def filter_by_themes(
     if not normalized_targets:
         return []
 
+    # theme membership is a bit test on each verse's mask
+    bits = {t: theme_bit(t) for t in normalized_targets}
+    any_target = 0
+    for bit in bits.values():
+        any_target |= bit
+
     per_theme_count = {t: 0 for t in normalized_targets}
     results: List[Dict] = []
 
     for entry in tagged_data:
-        entry_themes = [str(t).lower() for t in entry.get("themes", [])]
-        matched = [t for t in normalized_targets if t in entry_themes]
-
-        if not matched:
+        mask = TaggedVerse.of(entry).mask
+        if not mask & any_target:
             continue
+        matched = [t for t in normalized_targets if mask & bits[t]]
 
         # Respect max_per_theme if set
         for theme in matched:
@@ -90,20 +123,30 @@ def export_study_pack_markdown(
     title: str,
     session_notes: str | None = None,
     themes_used: List[str] | None = None,
+    passages: str | None = None,
+    related: List[List[Dict]] | None = None,
+    pack_related: List[Dict] | None = None,
 ) -> None:
-    """Write a markdown study pack file from selected verses."""
+    """
+    Write a markdown study pack file from selected verses. `related` holds
+    each verse's most similar verses (listed under it); `pack_related`
+    the verses closest to the pack as a whole (a closing section).
+    """
     with output_file.open("w", encoding="utf-8") as f:
         f.write(f"# {title}\n\n")
 
         if themes_used:
             f.write(f"**Themes:** {', '.join(themes_used)}\n\n")
 
+        if passages:
+            f.write(f"**Passages:** {passages}\n\n")
+
         if session_notes:
             f.write(f"> {session_notes}\n\n")
 
         f.write("---\n\n")
 
-        for entry in verses:
+        for i, entry in enumerate(verses):
             ref = entry.get("reference", "Unknown reference")
             text = entry.get("text", "").strip()
             themes = entry.get("themes", [])
@@ -112,8 +155,231 @@ def export_study_pack_markdown(
             f.write(f"{text}\n\n")
             if themes:
                 f.write(f"_Tags:_ {', '.join(themes)}\n\n")
+            if related and related[i]:
+                refs = [r.get("reference", "Unknown reference") for r in related[i]]
+                f.write(f"_Related:_ {', '.join(refs)}\n\n")
             f.write("---\n\n")
 
+        if pack_related:
+            f.write("## Related Verses\n\n")
+            for entry in pack_related:
+                ref = entry.get("reference", "Unknown reference")
+                text = entry.get("text", "").strip()
+                f.write(f"- **{ref}** – {text}\n")
+            f.write("\n")
+
+
+def select_verse_ids(
+    index,
+    themes: List[str],
+    query: str = "",
+    passages: str = "",
+    max_per_theme: int | None = None,
+) -> tuple:
+    """
+    Resolve a pack's selection against the theme index. Returns
+    (verse_ids, themes_used); raises ValueError for a bad query or reference.
+    With only `passages`, every tagged verse in the range is selected.
+    """
+    within = set(index.in_range(passages)) if passages else None
+
+    if query:
+        verse_ids = index.query(query)
+        if within is not None:
+            verse_ids = [i for i in verse_ids if i in within]
+        return verse_ids, [query]
+
+    if themes:
+        return index.select(themes, max_per_theme=max_per_theme, within=within), themes
+
+    return sorted(within or ()), []
+
+
+def load_similarity(source_path: Path, tagged_data: List[Dict]):
+    """
+    The TF-IDF similarity matrix for the source (cached next to it, see
+    verse_similarity.py). Raises ValueError when NumPy is not installed.
+    """
+    try:
+        from verse_similarity import load_or_build_similarity
+    except ImportError:
+        raise ValueError("Related verses require NumPy (pip install numpy).")
+
+    return load_or_build_similarity(source_path, tagged_data)
+
+
+def find_related(similarity, tagged_data: List[Dict], verse_ids: List[int], k: int) -> tuple:
+    """
+    (per-verse related entries, related entries for the whole pack), k of
+    each, most similar first.
+    """
+    per_verse = [
+        [tagged_data[i] for i, _ in hits]
+        for hits in similarity.most_similar(verse_ids, k)
+    ]
+    pack = [tagged_data[i] for i, _ in similarity.related_to(verse_ids, k)]
+    return per_verse, pack
+
+
+def load_manifest(manifest_path: Path) -> Dict:
+    """
+    Load a batch manifest (JSON, or YAML when PyYAML is installed):
+
+        {
+          "source": "tagged_output_v3.json",
+          "output_dir": "study_packs",
+          "packs": [
+            {"output": "study_identity.md", "title": "...", "themes": ["identity"],
+             "max_per_theme": 5, "notes": "...", "related": 3},
+            {"output": "study_remnant.md", "title": "...", "query": "identity AND NOT warning"},
+            {"output": "study_curses.md", "title": "...", "range": "Deut 28:15-68"}
+          ]
+        }
+
+    Relative paths are resolved against the manifest's folder.
+    """
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Manifest not found: {manifest_path}")
+
+    with manifest_path.open("r", encoding="utf-8") as f:
+        if manifest_path.suffix.lower() in (".yml", ".yaml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML manifests require PyYAML (pip install pyyaml); use JSON instead.")
+            manifest = yaml.safe_load(f)
+        else:
+            try:
+                manifest = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON in {manifest_path}: {e}")
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("packs"), list):
+        raise ValueError("Expected a manifest object with a 'packs' list.")
+
+    for pack in manifest["packs"]:
+        if not pack.get("output"):
+            raise ValueError("Every manifest pack needs an 'output' file name.")
+        if not pack.get("themes") and not pack.get("query") and not pack.get("range"):
+            raise ValueError(f"Pack {pack['output']} needs 'themes', 'query' or 'range'.")
+
+    return manifest
+
+
+def export_pack_index(
+    packs: List[Dict],
+    output_file: Path,
+    source_name: str,
+    total_verses: int,
+    theme_counts: Dict[str, int],
+) -> None:
+    """Write INDEX.md for a batch of generated study packs."""
+    with output_file.open("w", encoding="utf-8") as f:
+        f.write("# UTM Study Packs Index (Phase 6)\n\n")
+        f.write(f"- Source JSON: `{source_name}`\n")
+        f.write(f"- Total verses (all themes): {total_verses}\n\n")
+
+        f.write("## Packs\n\n")
+        for pack in packs:
+            f.write(f"- [{pack['title']}]({pack['output']}) – {pack['count']} verse(s)")
+            scope = list(pack["themes_used"])
+            if pack.get("passages"):
+                scope.append(pack["passages"])
+            f.write(f" – {', '.join(scope)}\n")
+
+        f.write("\n## Theme Breakdown\n\n")
+        for theme, count in sorted(theme_counts.items()):
+            f.write(f"- **{theme.title()}** – {count} verse(s)\n")
+
+        f.write("\n---\n\nGenerated by Phase 6 study pack builder (batch mode).\n")
+
+
+def build_packs_from_manifest(manifest_path: Path, jobs: int = 1,
+                              profiler: StageProfiler | None = None) -> List[Path]:
+    """
+    Build every pack in a manifest from a single corpus load: selections
+    come from the theme index, then the files are written (optionally on
+    a thread pool) followed by INDEX.md. Returns the files written.
+    """
+    from theme_index import load_or_build_index
+
+    profiler = profiler or StageProfiler()
+    manifest = load_manifest(manifest_path)
+    manifest_dir = manifest_path.parent
+
+    source_path = (manifest_dir / manifest.get("source", "tagged_output_v3.json")).resolve()
+    output_dir = (manifest_dir / manifest.get("output_dir", "study_packs")).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with profiler.stage("index"):
+        index, tagged_data = load_or_build_index(source_path, load_tagged_verses)
+    if tagged_data is None:
+        with profiler.stage("load_source", items=index.total):
+            tagged_data = load_tagged_verses(source_path)
+
+    planned = []
+    similarity = None
+    with profiler.stage("select", items=len(manifest["packs"])):
+        for pack in manifest["packs"]:
+            themes = pack.get("themes") or []
+            if isinstance(themes, str):
+                themes = themes.split(",")
+            verse_ids, themes_used = select_verse_ids(
+                index,
+                [t.strip() for t in themes if t.strip()],
+                query=pack.get("query", ""),
+                passages=pack.get("range", ""),
+                max_per_theme=pack.get("max_per_theme"),
+            )
+
+            planned.append({
+                "output": pack["output"],
+                "title": pack.get("title") or "UTM Study Pack",
+                "notes": (pack.get("notes") or "").strip() or None,
+                "themes_used": themes_used,
+                "passages": pack.get("range") or None,
+                "verses": [tagged_data[i] for i in verse_ids],
+                "count": len(verse_ids),
+                "related": None,
+                "pack_related": None,
+            })
+
+            if pack.get("related") and verse_ids:
+                if similarity is None:
+                    similarity = load_similarity(source_path, tagged_data)
+                planned[-1]["related"], planned[-1]["pack_related"] = find_related(
+                    similarity, tagged_data, verse_ids, int(pack["related"])
+                )
+
+    def write_pack(pack: Dict) -> Path:
+        output_file = output_dir / pack["output"]
+        export_study_pack_markdown(
+            verses=pack["verses"],
+            output_file=output_file,
+            title=pack["title"],
+            session_notes=pack["notes"],
+            themes_used=pack["themes_used"],
+            passages=pack["passages"],
+            related=pack["related"],
+            pack_related=pack["pack_related"],
+        )
+        return output_file
+
+    with profiler.stage("export", items=len(planned)):
+        if jobs > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                written = list(pool.map(write_pack, planned))
+        else:
+            written = [write_pack(pack) for pack in planned]
+
+        index_file = output_dir / "INDEX.md"
+        export_pack_index(planned, index_file, source_path.name, index.total, index.counts())
+    written.append(index_file)
+
+    return written
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -155,6 +421,61 @@ def parse_args() -> argparse.Namespace:
         help="Short session notes or purpose statement for the pack.",
     )
 
+    parser.add_argument(
+        "--query",
+        type=str,
+        default="",
+        help="Boolean theme query instead of --themes, e.g. \"identity AND (covenant OR truth) AND NOT warning\".",
+    )
+
+    parser.add_argument(
+        "--range",
+        type=str,
+        default="",
+        help="Only verses inside these references, e.g. \"Deut 28:15-68; Lev 26\" (alone: every tagged verse in range).",
+    )
+
+    parser.add_argument(
+        "--related",
+        type=int,
+        default=0,
+        help="List the K most similar verses (TF-IDF) under each verse and for the whole pack.",
+    )
+
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default="",
+        help="JSON/YAML manifest describing many packs to build in one run (writes INDEX.md too).",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Threads used to write packs in --manifest mode (default: 1).",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print wall/CPU time, items and peak memory per stage.",
+    )
+
+    parser.add_argument(
+        "--profile-stage",
+        type=str,
+        default=None,
+        help="Also run this stage under cProfile (index, select, load_source, related or export).",
+    )
+
+    parser.add_argument(
+        "--profile-output",
+        type=str,
+        default=None,
+        help="cProfile dump path (default: profile_<stage>.prof).",
+    )
+
     parser.add_argument(
         "--list-themes",
         action="store_true",
@@ -168,43 +489,101 @@ def main() -> None:
     args = parse_args()
 
     base_dir = Path(__file__).resolve().parent
+    profiler = StageProfiler(args.profile, args.profile_stage, args.profile_output)
+
+    try:
+        run(args, base_dir, profiler)
+    finally:
+        profiler.finish()
+
+
+def run(args: argparse.Namespace, base_dir: Path, profiler: StageProfiler) -> None:
+    if args.manifest:
+        try:
+            written = build_packs_from_manifest((base_dir / args.manifest).resolve(), jobs=args.jobs,
+                                                profiler=profiler)
+        except (ValueError, FileNotFoundError) as e:
+            # bad manifest entry, bad query or range, missing source
+            print(f"[ERROR] {e}")
+            return
+        print(f"✔ {len(written) - 1} study pack(s) generated.")
+        for path in written:
+            print("File:", path)
+        return
+
+    # imported here so --help does not pay for the index (and scripture_refs)
+    from theme_index import load_or_build_index
+
     source_path = (base_dir / args.source).resolve()
 
-    tagged_data = load_tagged_verses(source_path)
+    # tagged_data is only loaded here when the index had to be (re)built
+    with profiler.stage("index"):
+        try:
+            index, tagged_data = load_or_build_index(source_path, load_tagged_verses)
+        except (ValueError, FileNotFoundError) as e:
+            print(f"[ERROR] {e}")
+            return
 
     if args.list_themes:
-        themes = list_themes(tagged_data)
+        themes = index.list_themes()
         print("Available themes:")
         for t in sorted(themes):
             print(f" - {t}")
         return
 
     raw_themes = [t.strip() for t in args.themes.split(",") if t.strip()]
-    if not raw_themes:
-        print("No themes specified. Use --themes or --list-themes to inspect options.")
-        return
+    query = args.query.strip()
+    passages = args.range.strip()
 
-    filtered = filter_by_themes(
-        tagged_data=tagged_data,
-        target_themes=raw_themes,
-        max_per_theme=args.max_per_theme,
-    )
+    if not query and not raw_themes and not passages:
+        print("No themes specified. Use --themes, --query, --range or --list-themes to inspect options.")
+        return
 
-    if not filtered:
+    with profiler.stage("select"):
+        try:
+            verse_ids, raw_themes = select_verse_ids(
+                index, raw_themes, query, passages, max_per_theme=args.max_per_theme
+            )
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return
+    profiler.add_items("select", len(verse_ids))
+
+    if not verse_ids:
         print("No verses matched the requested themes.")
         return
 
+    if tagged_data is None:
+        with profiler.stage("load_source", items=index.total):
+            tagged_data = load_tagged_verses(source_path)
+
+    filtered = [tagged_data[i] for i in verse_ids]
+
+    related = pack_related = None
+    if args.related > 0:
+        with profiler.stage("related", items=len(verse_ids)):
+            try:
+                similarity = load_similarity(source_path, tagged_data)
+                related, pack_related = find_related(similarity, tagged_data, verse_ids, args.related)
+            except ValueError as e:
+                print(f"[ERROR] {e}")
+                return
+
     output_file = base_dir / "study_pack_phase6.md"
 
     session_notes = args.notes.strip() or None
 
-    export_study_pack_markdown(
-        verses=filtered,
-        output_file=output_file,
-        title=args.title,
-        session_notes=session_notes,
-        themes_used=raw_themes,
-    )
+    with profiler.stage("export", items=len(filtered)):
+        export_study_pack_markdown(
+            verses=filtered,
+            output_file=output_file,
+            title=args.title,
+            session_notes=session_notes,
+            themes_used=raw_themes,
+            passages=passages or None,
+            related=related,
+            pack_related=pack_related,
+        )
 
     print("✔ Study pack generated.")
     print("File:", output_file)
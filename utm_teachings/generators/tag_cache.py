@@ -0,0 +1,150 @@
+"""
+UTM Tagging Cache
+Persistent SQLite cache of tagged verses so re-runs only tag what changed.
+
+Entries are keyed by a hash of the rules fingerprint, the reference and the
+verse text. The fingerprint of the rules that filled the cache is stored
+alongside it; when the theme rules (theme_rules.json) or the scoring mode
+change, the whole cache is dropped on open. A long-running process that
+reloads the rules should reopen its cache when config_fingerprint() changes.
+
+Verses are looked up BATCH_SIZE keys per SELECT, and entries are stored as
+a marshalled tuple of the TaggedVerse fields, which loads several times
+faster than JSON. The keys a cache used are collected in `seen` (a parallel
+run adds the keys its workers used); after a complete run prune() deletes
+every other entry, i.e. those of verses edited or removed since.
+"""
+
+import hashlib
+import marshal
+import sqlite3
+from pathlib import Path
+
+from tagged_verse import FIELDS, TaggedVerse
+
+# Bump when the stored entry layout changes; older caches are dropped on open
+CACHE_FORMAT = 2
+
+# Keys looked up per SELECT (well under SQLite's bound-parameter limit)
+BATCH_SIZE = 500
+
+# Commit pending writes every this many new entries
+FLUSH_EVERY = 5000
+
+
+class TagCache:
+    def __init__(self, path: Path, fingerprint: str):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.seen = set()  # keys used through this cache
+        self._pending = []
+
+        self.conn = sqlite3.connect(str(self.path), timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # a lost tail of a cache after a power cut only means re-tagging
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        if meta.get("format") != str(CACHE_FORMAT) or meta.get("fingerprint") != fingerprint:
+            # rules or layout changed: nothing in the cache can be trusted
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS verses")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("format", str(CACHE_FORMAT)), ("fingerprint", fingerprint)],
+                )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS verses (key BLOB PRIMARY KEY, entry BLOB) WITHOUT ROWID")
+
+    def _key(self, reference: str, text: str) -> bytes:
+        h = hashlib.sha256()
+        for part in (self.fingerprint, reference, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.digest()[:16]
+
+    # ---------------------------
+    # LOOKUP
+    # ---------------------------
+
+    def tag_all(self, verses, tag_fn):
+        """
+        Tagged entries for (reference, text) pairs, in order: cached ones
+        loaded a batch at a time, the rest tagged with tag_fn and stored.
+        """
+        batch = []
+        for verse in verses:
+            batch.append(verse)
+            if len(batch) >= BATCH_SIZE:
+                yield from self._tag_batch(batch, tag_fn)
+                batch = []
+        if batch:
+            yield from self._tag_batch(batch, tag_fn)
+
+    def _tag_batch(self, batch, tag_fn):
+        keys = [self._key(ref, text) for ref, text in batch]
+        marks = ",".join("?" * len(keys))
+        found = dict(self.conn.execute(f"SELECT key, entry FROM verses WHERE key IN ({marks})", keys))
+        self.seen.update(keys)
+
+        for key, (ref, text) in zip(keys, batch):
+            entry = found.get(key)
+            if entry is not None:
+                self.hits += 1
+                fields, extra = marshal.loads(entry)
+                yield TaggedVerse(*fields, extra=extra)
+                continue
+
+            self.misses += 1
+            entry = TaggedVerse.of(tag_fn(ref, text))
+            # same key twice in a batch (a repeated verse) is only tagged once
+            found[key] = self._dump(entry)
+            self._pending.append((key, found[key]))
+            yield entry
+
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    @staticmethod
+    def _dump(entry: TaggedVerse) -> bytes:
+        return marshal.dumps((tuple(getattr(entry, name) for name in FIELDS), entry.extra))
+
+    # ---------------------------
+    # MAINTENANCE
+    # ---------------------------
+
+    def prune(self) -> int:
+        """
+        Delete every entry whose key is not in `seen`; call it only after a
+        complete run. Returns the number removed.
+        """
+        self.flush()
+        (stored,) = self.conn.execute("SELECT COUNT(*) FROM verses").fetchone()
+        if stored <= len(self.seen):
+            return 0  # every stored entry was used (the usual re-run)
+
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS used (key BLOB PRIMARY KEY) WITHOUT ROWID")
+            self.conn.execute("DELETE FROM used")
+            self.conn.executemany("INSERT INTO used (key) VALUES (?)", ((key,) for key in self.seen))
+            removed = self.conn.execute("DELETE FROM verses WHERE key NOT IN (SELECT key FROM used)").rowcount
+            self.conn.execute("DELETE FROM used")
+        return removed
+
+    def flush(self) -> None:
+        if self._pending:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO verses (key, entry) VALUES (?, ?)", self._pending)
+            self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
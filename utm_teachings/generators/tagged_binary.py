@@ -0,0 +1,318 @@
+"""
+UTM Tagged Verse Binary Format
+Compact, memory-mappable alternative to the indent=4 tagged_output_v3.json.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    b"UTMTAGB1" | uint32 header length | JSON header | sections...
+
+The header holds the verse count, the interned theme and cross-reference
+string tables and the (offset, length, typecode) of each column:
+
+    str_offsets     Q  2n+1  reference i = blob[2i], text i = blob[2i+1]
+    strings         B        UTF-8 text blob
+    theme_offsets   I  n+1   themes of verse i = theme_ids[off[i]:off[i+1]]
+    theme_ids       H
+    primary         H  n
+    sec_offsets     I  n+1
+    sec_ids         H
+    scores          d  n
+    xref_offsets    I  n+1
+    xref_ids        H
+
+Typecodes are struct codes with standard sizes (Q 8, I 4, H 2, d 8
+bytes), so the theme and cross-reference tables hold at most 65536 names
+each. The writer packs each column with an explicit "<" format and spills
+it to a temporary file as entries are added, so its memory does not grow
+with the corpus (only the theme / cross-reference tables are kept).
+Only v3 entries can be stored; v2 entries have no primary theme or score.
+
+TaggedCorpus maps the file and casts memoryviews over the columns, so
+opening a corpus costs almost nothing; TaggedVerse records are only built
+when an entry is accessed.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+
+from tagged_verse import TaggedVerse
+
+MAGIC = b"UTMTAGB1"
+FORMAT_VERSION = 1
+
+COLUMNS = [
+    ("str_offsets", "Q"),
+    ("strings", "B"),
+    ("theme_offsets", "I"),
+    ("theme_ids", "H"),
+    ("primary", "H"),
+    ("sec_offsets", "I"),
+    ("sec_ids", "H"),
+    ("scores", "d"),
+    ("xref_offsets", "I"),
+    ("xref_ids", "H"),
+]
+
+
+# Values buffered per column before they are packed and spilled
+SPILL_VALUES = 1 << 16
+
+# Theme and cross-reference ids are stored as uint16 ("H")
+MAX_TABLE_NAMES = 1 << 16
+
+
+def _pad(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def is_tagged_binary(path: Path) -> bool:
+    """True when the file starts with the binary format magic."""
+    with Path(path).open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class _Interner:
+    def __init__(self, what: str):
+        self.what = what
+        self.ids = {}
+        self.names = []
+
+    def __call__(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            if len(self.names) >= MAX_TABLE_NAMES:
+                raise ValueError(f"Too many distinct {self.what} for the binary format "
+                                 f"(at most {MAX_TABLE_NAMES}, stored as uint16 ids)")
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+
+class _Column:
+    """One section, written to a temporary file as it grows."""
+
+    def __init__(self, code: str):
+        self.code = code
+        self.itemsize = struct.calcsize("<" + code)
+        self.values = []
+        self.size = 0  # bytes, spilled or buffered
+        self.file = tempfile.TemporaryFile(buffering=1 << 16)
+
+    def __len__(self) -> int:
+        return self.size // self.itemsize
+
+    def append(self, value) -> None:
+        self.values.append(value)
+        self.size += self.itemsize
+        if len(self.values) >= SPILL_VALUES:
+            self.spill()
+
+    def extend(self, values) -> None:
+        for value in values:
+            self.append(value)
+
+    def write(self, raw: bytes) -> None:
+        """Raw bytes ("B" sections only)."""
+        self.file.write(raw)
+        self.size += len(raw)
+
+    def spill(self) -> None:
+        if self.values:
+            self.file.write(struct.pack(f"<{len(self.values)}{self.code}", *self.values))
+            self.values = []
+
+
+class TaggedBinaryWriter:
+    """Streams v3 tagged entries into spilled columns; close() assembles the file."""
+
+    def __init__(self, output_path: Path):
+        self.output_path = Path(output_path)
+        self.count = 0
+        self.themes = _Interner("theme names")
+        self.xrefs = _Interner("cross-references")
+
+        self.cols = {name: _Column(code) for name, code in COLUMNS}
+        for name in ("str_offsets", "theme_offsets", "sec_offsets", "xref_offsets"):
+            self.cols[name].append(0)
+
+    def _add_list(self, offsets: str, ids: str, values, interner) -> None:
+        self.cols[ids].extend(interner(v) for v in values)
+        self.cols[offsets].append(len(self.cols[ids]))
+
+    def add(self, entry) -> None:
+        if entry.get("primary_theme") is None or entry.get("score") is None:
+            raise ValueError(f"{entry.get('reference')}: the binary format needs v3 tagged verses "
+                             "(primary_theme, secondary_themes, score, cross_references)")
+
+        strings = self.cols["strings"]
+        for s in (entry["reference"], entry["text"]):
+            strings.write(s.encode("utf-8"))
+            self.cols["str_offsets"].append(strings.size)
+
+        self._add_list("theme_offsets", "theme_ids", entry["themes"], self.themes)
+        self.cols["primary"].append(self.themes(entry["primary_theme"]))
+        self._add_list("sec_offsets", "sec_ids", entry.get("secondary_themes") or (), self.themes)
+        self.cols["scores"].append(float(entry["score"]))
+        self._add_list("xref_offsets", "xref_ids", entry.get("cross_references") or (), self.xrefs)
+        self.count += 1
+
+    def close(self) -> None:
+        # written under a temporary name, so a failed write never leaves a
+        # truncated corpus under the real one
+        temp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        try:
+            self._write(temp_path)
+            os.replace(temp_path, self.output_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            self.discard()
+
+    def _write(self, path: Path) -> None:
+        # section offsets are relative to the (aligned) end of the header
+        sections = {}
+        pos = 0
+        for name, code in COLUMNS:
+            col = self.cols[name]
+            col.spill()
+            sections[name] = [pos, col.size, code]
+            pos += col.size + _pad(col.size)
+
+        header = {
+            "version": FORMAT_VERSION,
+            "count": self.count,
+            "themes": self.themes.names,
+            "cross_references": self.xrefs.names,
+            "sections": sections,
+        }
+        header_raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = len(MAGIC) + 4 + len(header_raw)
+        data_start += _pad(data_start)
+
+        with path.open("wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header_raw)))
+            f.write(header_raw)
+            f.write(b"\0" * (data_start - f.tell()))
+            for name, _ in COLUMNS:
+                col = self.cols[name]
+                col.file.seek(0)
+                shutil.copyfileobj(col.file, f, 1 << 20)
+                f.write(b"\0" * _pad(col.size))
+
+    def discard(self) -> None:
+        """Drop the spilled columns without writing the file."""
+        for col in self.cols.values():
+            col.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_tagged_binary(tagged, output_path: Path) -> int:
+    """Write an iterable of v3 tagged entries; returns the verse count."""
+    with TaggedBinaryWriter(output_path) as writer:
+        for entry in tagged:
+            writer.add(entry)
+    return writer.count
+
+
+class TaggedCorpus(Sequence):
+    """
+    Read-only, memory-mapped view of a binary tagged corpus. Behaves like
+    the list of TaggedVerse records loaded from the v3 JSON.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mm)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            buf.release()
+            self._mm.close()
+            raise ValueError(f"Not a UTM tagged binary file: {self.path}")
+
+        (header_len,) = struct.unpack_from("<I", buf, len(MAGIC))
+        header_end = len(MAGIC) + 4 + header_len
+        header = json.loads(bytes(buf[len(MAGIC) + 4:header_end]).decode("utf-8"))
+        if header["version"] != FORMAT_VERSION:
+            buf.release()
+            self._mm.close()
+            raise ValueError(f"Unsupported tagged binary version in {self.path}")
+
+        data_start = header_end + _pad(header_end)
+        self._count = header["count"]
+        self.theme_names = header["themes"]
+        self.xref_names = header["cross_references"]
+
+        self._views = [buf]
+        for name, (offset, length, code) in header["sections"].items():
+            raw = buf[data_start + offset:data_start + offset + length]
+            if code == "B" or (sys.byteorder == "little" and struct.calcsize(code) == struct.calcsize("<" + code)):
+                col = raw.cast(code)
+                self._views.extend((raw, col))
+            else:
+                # native layout differs from the file's: decode the column once
+                col = [v for (v,) in struct.iter_unpack("<" + code, raw)]
+                raw.release()
+            setattr(self, name, col)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _text(self, k: int) -> str:
+        return str(self.strings[self.str_offsets[k]:self.str_offsets[k + 1]], "utf-8")
+
+    def theme_ids_of(self, i: int):
+        """Interned theme ids of verse i (index into theme_names)."""
+        return self.theme_ids[self.theme_offsets[i]:self.theme_offsets[i + 1]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("tagged verse index out of range")
+
+        themes = self.theme_names
+        sec = self.sec_ids[self.sec_offsets[i]:self.sec_offsets[i + 1]]
+        xref = self.xref_ids[self.xref_offsets[i]:self.xref_offsets[i + 1]]
+
+        return TaggedVerse(
+            self._text(2 * i),
+            self._text(2 * i + 1),
+            themes=[themes[t] for t in self.theme_ids_of(i)],
+            primary_theme=themes[self.primary[i]],
+            secondary_themes=[themes[t] for t in sec],
+            score=self.scores[i],
+            cross_references=[self.xref_names[x] for x in xref],
+        )
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,183 @@
+"""
+UTM Tagged Verse Record
+Compact replacement for the per-verse dicts passed between the taggers,
+the Phase 5 publisher and the Phase 6 pack builder.
+
+- __slots__ instead of a per-instance dict
+- theme names are interned, and identical theme / cross-reference lists
+  share one tuple across the whole corpus
+- `mask` has one bit per theme (case-insensitive), so membership tests are
+  `verse.mask & theme_mask(["covenant"])` instead of list scans. Bits are
+  assigned per process, so a pickled record (e.g. from a v4 worker) is
+  rebuilt from its fields and gets its mask recomputed on arrival
+
+A TaggedVerse reads like the dict it replaces (verse["themes"],
+verse.get("score"), "score" in verse; list fields come back as tuples),
+and to_dict() / from_dict() convert at the JSON boundaries, so every file
+format stays byte-identical. A field that was never given is absent (a
+Phase 2 verse has only reference, text and themes); one given as null in
+the dict stays present, with the value None.
+"""
+
+import sys
+from typing import Dict, Iterable, Tuple
+
+# JSON key order of a v3 tagged verse
+FIELDS = ("reference", "text", "themes", "primary_theme", "secondary_themes", "score", "cross_references")
+
+_LIST_FIELDS = ("themes", "secondary_themes", "cross_references")
+
+# lower-cased theme name -> bit; grows as new themes are seen (per process)
+_THEME_BITS: Dict[str, int] = {}
+
+# one shared tuple per distinct list of names
+_SHARED: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+# mask of each shared themes tuple
+_MASKS: Dict[Tuple[str, ...], int] = {}
+
+
+def theme_bit(theme: str) -> int:
+    """The mask bit of a theme (names differing only in case share a bit)."""
+    key = theme.lower()
+    bit = _THEME_BITS.get(key)
+    if bit is None:
+        bit = _THEME_BITS[key] = 1 << len(_THEME_BITS)
+    return bit
+
+
+def theme_mask(themes: Iterable[str]) -> int:
+    mask = 0
+    for theme in themes:
+        mask |= theme_bit(theme)
+    return mask
+
+
+def _themes_mask(themes: Tuple[str, ...]) -> int:
+    mask = _MASKS.get(themes)
+    if mask is None:
+        mask = _MASKS[themes] = theme_mask(themes)
+    return mask
+
+
+def _shared(names) -> Tuple[str, ...]:
+    key = tuple(names)
+    found = _SHARED.get(key)
+    if found is None:
+        found = _SHARED[key] = tuple(sys.intern(str(n)) for n in key)
+    return found
+
+
+class TaggedVerse:
+    __slots__ = FIELDS + ("mask", "extra")
+
+    def __init__(self, reference: str, text: str, themes=None, primary_theme=None,
+                 secondary_themes=None, score=None, cross_references=None, extra=None):
+        self.reference = reference
+        self.text = text
+        self.themes = _shared(themes) if themes is not None else None
+        self.primary_theme = sys.intern(primary_theme) if primary_theme is not None else None
+        self.secondary_themes = _shared(secondary_themes) if secondary_themes is not None else None
+        self.score = score
+        self.cross_references = _shared(cross_references) if cross_references is not None else None
+        self.mask = _themes_mask(self.themes) if self.themes else 0
+        self.extra = extra  # keys outside FIELDS, kept so to_dict() round-trips
+
+    # ---------------------------
+    # CONVERSION
+    # ---------------------------
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TaggedVerse":
+        # explicit nulls of FIELDS keys go to extra too, so they stay present
+        extra = {k: v for k, v in data.items() if k not in FIELDS or v is None} or None
+        return cls(data.get("reference"), data.get("text"), data.get("themes"), data.get("primary_theme"),
+                   data.get("secondary_themes"), data.get("score"), data.get("cross_references"), extra)
+
+    @classmethod
+    def of(cls, entry) -> "TaggedVerse":
+        """entry itself if it already is a TaggedVerse, otherwise converted from a dict."""
+        return entry if isinstance(entry, cls) else cls.from_dict(entry)
+
+    def _fields(self) -> Dict:
+        """The present keys in JSON order, list fields still as their shared tuples."""
+        extra = self.extra
+        values = (self.reference, self.text, self.themes, self.primary_theme,
+                  self.secondary_themes, self.score, self.cross_references)
+        data = {}
+        for key, value in zip(FIELDS, values):
+            if value is not None or (extra and key in extra):
+                data[key] = value
+        if extra:
+            data.update(extra)
+        return data
+
+    def to_dict(self) -> Dict:
+        """The JSON form: the v3 (or v2) dict, lists as lists, absent fields left out."""
+        data = self._fields()
+        for key in _LIST_FIELDS:
+            value = data.get(key)
+            if value is not None:
+                data[key] = list(value)
+        return data
+
+    # ---------------------------
+    # THEMES
+    # ---------------------------
+
+    def has_theme(self, theme: str) -> bool:
+        return bool(self.mask & theme_bit(theme))
+
+    def has_any(self, mask: int) -> bool:
+        return bool(self.mask & mask)
+
+    # ---------------------------
+    # MAPPING COMPATIBILITY
+    # ---------------------------
+
+    def __getitem__(self, key: str):
+        if key in FIELDS:
+            # list fields come back as their (shared) tuples; copy before mutating
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        if key in FIELDS and getattr(self, key) is not None:
+            return True
+        return bool(self.extra) and key in self.extra
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TaggedVerse):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # the mask is not pickled: bit numbers differ between processes
+        return (TaggedVerse, (self.reference, self.text, self.themes, self.primary_theme,
+                              self.secondary_themes, self.score, self.cross_references, self.extra))
+
+    def __repr__(self) -> str:
+        return f"TaggedVerse({self.reference!r}, themes={list(self.themes or ())})"
+
+
+def json_default(obj):
+    """json.dumps(default=...) hook: TaggedVerse objects serialize as their dict."""
+    if isinstance(obj, TaggedVerse):
+        # tuples encode exactly like lists, so the list copies are skipped
+        return obj._fields()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,253 @@
+"""
+UTM Theme Index – Phase 6 support
+Persistent inverted index over a tagged scripture JSON file.
+
+    theme -> sorted posting list of verse ids (positions in the source list)
+    canonical verse id -> position   (scripture_refs.VerseIndex, for ranges)
+
+The index is saved next to the source (tagged_output_v3.json.index.json) and
+rebuilt automatically when the source file changes. It answers theme
+listings, per-theme counts, capped theme selection, AND/OR/NOT queries and
+reference ranges ("Deut 28:15-68") without rescanning every entry.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from scripture_refs import VerseIndex
+
+INDEX_VERSION = 2
+
+
+def index_path_for(source: Path) -> Path:
+    return source.with_name(source.name + ".index.json")
+
+
+def _source_stamp(source: Path) -> Dict:
+    st = source.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class ThemeIndex:
+    def __init__(self, total: int, postings: Dict[str, List[int]], labels: List[str],
+                 stamp: Dict | None = None, verses: VerseIndex | None = None):
+        self.total = total
+        self.postings = postings  # lower-cased theme -> sorted verse ids
+        self.labels = labels      # theme names as written in the source
+        self.stamp = stamp
+        self.verses = verses or VerseIndex([], [])
+
+    # ---------------------------
+    # BUILD / PERSIST
+    # ---------------------------
+
+    @classmethod
+    def build(cls, tagged_data: Iterable[Dict], stamp: Dict | None = None) -> "ThemeIndex":
+        postings: Dict[str, List[int]] = {}
+        labels: Set[str] = set()
+        references: List[str] = []
+        total = 0
+
+        for verse_id, entry in enumerate(tagged_data):
+            total += 1
+            references.append(entry.get("reference", ""))
+            for t in entry.get("themes", []):
+                labels.add(str(t).strip())
+                ids = postings.setdefault(str(t).lower(), [])
+                if not ids or ids[-1] != verse_id:
+                    ids.append(verse_id)
+
+        return cls(total, postings, sorted(labels), stamp, VerseIndex.build(references))
+
+    def save(self, path: Path) -> None:
+        data = {
+            "version": INDEX_VERSION,
+            "source": self.stamp,
+            "total": self.total,
+            "labels": self.labels,
+            "postings": self.postings,
+            "verses": self.verses.to_dict(),
+        }
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> "ThemeIndex":
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported theme index version in {path}")
+
+        return cls(data["total"], data["postings"], data["labels"], data.get("source"),
+                   VerseIndex.from_dict(data["verses"]))
+
+    # ---------------------------
+    # QUERIES
+    # ---------------------------
+
+    def counts(self) -> Dict[str, int]:
+        """Number of verses per (lower-cased) theme."""
+        return {theme: len(ids) for theme, ids in self.postings.items()}
+
+    def list_themes(self) -> Set[str]:
+        return set(self.labels)
+
+    def in_range(self, references: str) -> List[int]:
+        """
+        Verse ids (source positions, in source order) inside ';'-separated
+        scripture references such as "Deut 28:15-68; Lev 26".
+        Raises ValueError for a reference that cannot be parsed.
+        """
+        return self.verses.lookup(references)
+
+    def select(self, target_themes: List[str], max_per_theme: int | None = None,
+               within: Set[int] | None = None) -> List[int]:
+        """
+        Verse ids matching any of the themes, in source order — the same
+        selection (and per-theme caps) as filter_by_themes. `within`
+        restricts the candidates (e.g. to a reference range) before caps apply.
+        """
+        targets = [t.strip().lower() for t in target_themes if t.strip()]
+        if not targets:
+            return []
+
+        lists = [self.postings.get(t, []) for t in dict.fromkeys(targets)]
+        merged = heapq.merge(*lists)
+        if within is not None:
+            merged = (verse_id for verse_id in merged if verse_id in within)
+
+        if max_per_theme is None:
+            ids: List[int] = []
+            for verse_id in merged:
+                if not ids or ids[-1] != verse_id:
+                    ids.append(verse_id)
+            return ids
+
+        members = {t: set(self.postings.get(t, [])) for t in targets}
+        per_theme_count = {t: 0 for t in targets}
+        results: List[int] = []
+        last = None
+
+        for verse_id in merged:
+            if verse_id == last:
+                continue
+            last = verse_id
+
+            for theme in targets:
+                if verse_id not in members[theme]:
+                    continue
+                if per_theme_count[theme] >= max_per_theme:
+                    continue
+                per_theme_count[theme] += 1
+                results.append(verse_id)
+                break
+
+            if all(n >= max_per_theme for n in per_theme_count.values()):
+                break
+
+        return results
+
+    def query(self, expression: str) -> List[int]:
+        """
+        Evaluate a boolean theme query, e.g.
+            identity AND (covenant OR truth) AND NOT warning
+        NOT binds tighter than AND, which binds tighter than OR.
+        """
+        ids = _QueryParser(expression, self).parse()
+        return sorted(ids)
+
+    def _theme_set(self, theme: str) -> Set[int]:
+        return set(self.postings.get(theme.lower(), []))
+
+    def _universe(self) -> Set[int]:
+        return set(range(self.total))
+
+
+class _QueryParser:
+    TOKEN_RE = re.compile(r"\(|\)|[^\s()]+")
+
+    def __init__(self, expression: str, index: ThemeIndex):
+        self.tokens = self.TOKEN_RE.findall(expression)
+        self.pos = 0
+        self.index = index
+
+    def parse(self) -> Set[int]:
+        if not self.tokens:
+            raise ValueError("Empty theme query.")
+        result = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected token in theme query: {self.tokens[self.pos]!r}")
+        return result
+
+    def _peek(self) -> str | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Theme query ended unexpectedly.")
+        self.pos += 1
+        return token
+
+    def _or(self) -> Set[int]:
+        result = self._and()
+        while (self._peek() or "").upper() == "OR":
+            self._take()
+            result = result | self._and()
+        return result
+
+    def _and(self) -> Set[int]:
+        result = self._not()
+        while (self._peek() or "").upper() == "AND":
+            self._take()
+            result = result & self._not()
+        return result
+
+    def _not(self) -> Set[int]:
+        if (self._peek() or "").upper() == "NOT":
+            self._take()
+            return self.index._universe() - self._not()
+        return self._atom()
+
+    def _atom(self) -> Set[int]:
+        token = self._take()
+        if token == "(":
+            result = self._or()
+            if self._take() != ")":
+                raise ValueError("Missing ')' in theme query.")
+            return result
+        if token == ")" or token.upper() in ("AND", "OR", "NOT"):
+            raise ValueError(f"Expected a theme name in query, got {token!r}")
+        return self.index._theme_set(token)
+
+
+def load_or_build_index(source: Path, load_source) -> tuple:
+    """
+    Return (index, tagged_data). The index is read from disk when it is
+    still current; otherwise the source is loaded with `load_source`, the
+    index rebuilt and saved. tagged_data is None when it was not needed.
+    """
+    if not source.exists():
+        raise FileNotFoundError(f"Source JSON not found: {source}")
+
+    path = index_path_for(source)
+    stamp = _source_stamp(source)
+
+    if path.exists():
+        try:
+            index = ThemeIndex.load(path)
+            if index.stamp == stamp:
+                return index, None
+        except (ValueError, KeyError, json.JSONDecodeError):
+            pass  # unreadable or old index: rebuild below
+
+    tagged_data = load_source(source)
+    index = ThemeIndex.build(tagged_data, stamp)
+    index.save(path)
+    return index, tagged_data
@@ -0,0 +1,186 @@
+"""
+UTM Theme Rules
+Theme keywords, weights and cross-references, loaded from a versioned
+rules file (theme_rules.json next to this module by default, or any
+.json / .toml file) and shared by every tagger version.
+
+    {
+        "version": 1,
+        "themes": {
+            "identity": {"keywords": ["chosen", ...], "weight": 1.0,
+                         "cross_references": ["Deut 7:6", ...]},
+            ...
+        }
+    }
+
+or in TOML:
+
+    version = 1
+    [themes.identity]
+    keywords = ["chosen", "people"]
+    weight = 1.0
+    cross_references = ["Deut 7:6"]
+
+Theme order in the file is the order themes are reported in. A RuleSet
+compiles its matchers (KeywordMatcher, TokenScorer) on first use and
+carries a fingerprint of the rules.
+
+active() returns the rule set in use, loaded once. A long-running process
+calls reload_if_changed() between jobs to pick up edits to the file; a
+file that fails to load is reported, the previous rules stay in effect
+and the next call tries again.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List
+
+RULES_VERSION = 1
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().with_name("theme_rules.json")
+
+
+class RuleSet:
+    def __init__(self, keywords: Dict[str, List[str]], weights: Dict[str, float],
+                 cross_references: Dict[str, List[str]], source: Path | None = None):
+        self.keywords = keywords                  # theme -> keywords, in theme order
+        self.weights = weights                    # theme -> weight per occurrence
+        self.cross_references = cross_references  # theme -> references
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: Path | None = None) -> "RuleSet":
+        """Validate a parsed rules file; raises ValueError describing the first problem."""
+        where = f" in {source}" if source else ""
+
+        if not isinstance(data, dict) or data.get("version") != RULES_VERSION:
+            raise ValueError(f"Unsupported theme rules version{where} (expected {RULES_VERSION})")
+
+        themes = data.get("themes")
+        if not isinstance(themes, dict) or not themes:
+            raise ValueError(f"Theme rules{where} need a non-empty 'themes' table")
+
+        keywords, weights, cross_references = {}, {}, {}
+        for theme, rule in themes.items():
+            if not isinstance(rule, dict):
+                raise ValueError(f"Theme {theme!r}{where} must be a table")
+
+            kws = rule.get("keywords", [])
+            if not isinstance(kws, list) or not all(isinstance(k, str) and k for k in kws):
+                raise ValueError(f"Theme {theme!r}{where}: 'keywords' must be a list of strings")
+
+            weight = rule.get("weight", 1.0)
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+                raise ValueError(f"Theme {theme!r}{where}: 'weight' must be a number")
+
+            refs = rule.get("cross_references", [])
+            if not isinstance(refs, list) or not all(isinstance(r, str) for r in refs):
+                raise ValueError(f"Theme {theme!r}{where}: 'cross_references' must be a list of strings")
+
+            keywords[theme] = [k.lower() for k in kws]
+            weights[theme] = float(weight)
+            cross_references[theme] = refs
+
+        return cls(keywords, weights, cross_references, source)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Hash of the rules themselves (not of the file's formatting)."""
+        import hashlib
+
+        rules = [self.keywords, self.weights, self.cross_references]
+        return hashlib.sha256(json.dumps(rules, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @cached_property
+    def matcher(self):
+        """Substring matcher (keyword_matcher.KeywordMatcher), compiled on first use."""
+        from keyword_matcher import KeywordMatcher
+
+        return KeywordMatcher(self.keywords)
+
+    @cached_property
+    def token_scorer(self):
+        """Whole-word scorer (theme_scorer.TokenScorer), compiled on first use."""
+        from theme_scorer import TokenScorer
+
+        return TokenScorer(self.keywords, self.weights)
+
+
+def load_rules(path: Path) -> RuleSet:
+    """Read and validate a .json or .toml rules file."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Theme rules not found: {path}")
+
+    if path.suffix.lower() == ".toml":
+        import tomllib
+
+        with path.open("rb") as f:
+            try:
+                data = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"Invalid TOML in {path}: {e}")
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON in {path}: {e}")
+
+    return RuleSet.from_dict(data, path)
+
+
+# ---------------------------
+# ACTIVE RULE SET
+# ---------------------------
+
+_active: RuleSet | None = None
+_path: Path = DEFAULT_RULES_PATH
+_stamp = None
+
+
+def _file_stamp(path: Path):
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def use_rules(path: Path | None = None) -> RuleSet:
+    """Load a rules file (default: theme_rules.json) and make it the active rule set."""
+    global _active, _path, _stamp
+
+    path = Path(path) if path is not None else DEFAULT_RULES_PATH
+    stamp = _file_stamp(path) if path.exists() else None
+    rules = load_rules(path)
+    _active, _path, _stamp = rules, path, stamp
+    return rules
+
+
+def reload_if_changed() -> bool:
+    """Reload the active rules file if it changed on disk; True when new rules took effect."""
+    global _active, _stamp
+
+    try:
+        stamp = _file_stamp(_path)
+    except OSError:
+        return False
+    if stamp == _stamp:
+        return False
+
+    try:
+        _active = load_rules(_path)
+    except (ValueError, OSError) as e:
+        # _stamp is left alone, so the next call retries the file
+        print(f"[WARN] Keeping previous theme rules: {e}")
+        return False
+    _stamp = stamp
+    return True
+
+
+def active() -> RuleSet:
+    """The rule set in use, loading the default file on first call."""
+    if _active is None:
+        return use_rules(_path)
+    return _active
@@ -0,0 +1,110 @@
+"""
+UTM Token Scorer
+Whole-word theme scoring. THEME_KEYWORDS is compiled once into a table
+
+    phrase -> ((theme index, weight), ...)
+
+where a phrase is one token ("light") or an n-gram ("take heed"). A verse
+is lower-cased and tokenized once; every token, and every n-gram that
+starts with a known first word, is a single dict lookup. So:
+
+- "yah" no longer fires inside "Yahuah", nor "word" inside "sword"
+- a keyword counts every time it occurs, not once per verse
+- the cost per verse is one pass over its tokens, independent of how
+  many keywords are configured
+"""
+
+import string
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Punctuation (ASCII and the typographic marks found in Bible texts) splits
+# words; str.translate + split is about twice as fast as a \w+ regex
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation + "“”‘’—–…«»¶"})
+
+
+def tokenize(text: str) -> List[str]:
+    return text.lower().translate(_PUNCTUATION).split()
+
+
+class TokenScorer:
+    def __init__(self, theme_keywords: Dict[str, List[str]], theme_weights: Dict[str, float]):
+        self.themes = list(theme_keywords)
+        self.table: Dict[str, Tuple[Tuple[int, float], ...]] = {}
+
+        # first word of a multi-word phrase -> phrase lengths to try
+        self._phrase_lengths: Dict[str, Tuple[int, ...]] = {}
+
+        for theme_index, (theme, keywords) in enumerate(theme_keywords.items()):
+            weight = theme_weights.get(theme, 1.0)
+            for keyword in keywords:
+                tokens = tokenize(keyword)
+                if not tokens:
+                    continue
+                phrase = " ".join(tokens)
+                # a keyword listed under two themes scores for both
+                self.table[phrase] = self.table.get(phrase, ()) + ((theme_index, weight),)
+                if len(tokens) > 1:
+                    lengths = set(self._phrase_lengths.get(tokens[0], ())) | {len(tokens)}
+                    self._phrase_lengths[tokens[0]] = tuple(sorted(lengths))
+
+        # every token that can start a hit; verses without one are skipped early
+        self._vocab = frozenset(t for t in self.table if " " not in t) | frozenset(self._phrase_lengths)
+
+    def _scan(self, text: str) -> Tuple[List[int], float]:
+        per_theme = [0] * len(self.themes)
+        score = 0.0
+        tokens = tokenize(text)
+
+        present = self._vocab.intersection(tokens)
+        if not present:
+            return per_theme, score
+
+        # set/list.count/list.index keep the per-token work in C; Python
+        # only loops over the distinct keyword tokens that actually occur
+        table = self.table
+
+        for token in present:
+            hits = table.get(token)
+            if hits:
+                n = tokens.count(token)
+                for theme_index, weight in hits:
+                    per_theme[theme_index] += n
+                    score += n * weight
+
+            lengths = self._phrase_lengths.get(token)
+            if not lengths:
+                continue
+            i = tokens.index(token)
+            while True:
+                for n in lengths:
+                    if i + n > len(tokens):
+                        break
+                    for theme_index, weight in table.get(" ".join(tokens[i:i + n]), ()):
+                        per_theme[theme_index] += 1
+                        score += weight
+                try:
+                    i = tokens.index(token, i + 1)
+                except ValueError:
+                    break
+
+        return per_theme, score
+
+    def _counter(self, per_theme: List[int]) -> Counter:
+        theme_counter = Counter()
+        for theme_index, count in enumerate(per_theme):
+            if count:
+                theme_counter[self.themes[theme_index]] = count
+        return theme_counter
+
+    def count_themes(self, text: str) -> Counter:
+        """
+        Per-theme occurrence counts for a verse, in THEME_KEYWORDS order
+        (a drop-in for KeywordMatcher.count_themes, with true frequencies).
+        """
+        return self._counter(self._scan(text)[0])
+
+    def score(self, text: str) -> Tuple[Counter, float]:
+        """(per-theme counts, frequency-weighted score) for a verse."""
+        per_theme, score = self._scan(text)
+        return self._counter(per_theme), score
@@ -0,0 +1,275 @@
+"""
+UTM Verse Similarity
+"Related verses" for study packs: every tagged verse becomes a sparse,
+L2-normalized TF-IDF vector over its words (theme_scorer.tokenize), so the
+cosine similarity of two verses is a dot product.
+
+The corpus is held as a CSR matrix (indptr / indices / data NumPy arrays,
+one row per verse in source order) plus its transpose (CSC) for scoring.
+A batch of queries, each a set of rows such as one verse or a whole pack,
+is scored against all verses at once, in two parts:
+
+- the most common terms ("the", "and", ...) are kept as a small dense
+  (terms x verses) block and scored with one matrix product
+- every other term's posting list is gathered and summed with np.bincount
+
+Batches are sized so that both the (queries x verses) score block and the
+postings gathered for it stay under fixed limits. There is no pairwise
+Python loop, so top-k over a 31k-verse corpus stays interactive.
+
+The matrix is saved next to the source (tagged_output_v3.json.tfidf.npz)
+and rebuilt when the source changes, like the theme index.
+
+Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from theme_scorer import tokenize
+
+SIMILARITY_VERSION = 1
+
+# per batch: cells of the (queries x verses) score block
+_BATCH_CELLS = 1 << 22
+# per batch: posting entries gathered for the sparse part (a single query
+# that needs more still runs, alone)
+_BATCH_POSTINGS = 1 << 21
+
+# terms in at least 1/_DENSE_SHARE of the verses are scored densely, at
+# most _DENSE_TERMS of them and _DENSE_CELLS (terms x verses) in all
+_DENSE_SHARE = 32
+_DENSE_TERMS = 256
+_DENSE_CELLS = 1 << 23
+
+
+def similarity_path_for(source: Path) -> Path:
+    return source.with_name(source.name + ".tfidf.npz")
+
+
+def _source_stamp(source: Path) -> List[int]:
+    st = source.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _concat_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) without the loop."""
+    lengths = ends - starts
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return shifts + np.arange(int(lengths.sum()), dtype=np.int64)
+
+
+class VerseSimilarity:
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                 stamp: List[int] | None = None):
+        self.indptr = indptr    # CSR row pointers, one row per verse
+        self.indices = indices  # term column of each non-zero
+        self.data = data        # normalized TF-IDF weight of each non-zero
+        self.stamp = stamp
+        self.total = len(indptr) - 1
+
+        # CSC copy (term -> verses), the side the product walks
+        terms = int(indices.max()) + 1 if len(indices) else 0
+        rows = np.repeat(np.arange(self.total, dtype=np.int64), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        self._col_ptr = np.zeros(terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=terms), out=self._col_ptr[1:])
+        self._col_rows = rows[order]
+        self._col_data = data[order]
+
+        # the most common terms as dense rows: slot of each term (-1: sparse)
+        df = np.diff(self._col_ptr)
+        limit = min(_DENSE_TERMS, _DENSE_CELLS // max(self.total, 1))
+        common = np.argsort(-df, kind="stable")[:limit]
+        common = np.sort(common[df[common] >= max(2, self.total // _DENSE_SHARE)])
+        self._dense_slot = np.full(terms, -1, dtype=np.int64)
+        self._dense_slot[common] = np.arange(len(common))
+        self._dense = np.zeros((len(common), self.total), dtype=np.float32)
+        hits = _concat_ranges(self._col_ptr[common], self._col_ptr[common + 1])
+        self._dense[np.repeat(np.arange(len(common)), df[common]), self._col_rows[hits]] = self._col_data[hits]
+
+        # postings each row's sparse terms gather when it is a query
+        sparse_df = np.where(self._dense_slot < 0, df, 0)
+        self._row_postings = np.bincount(rows, weights=sparse_df[indices], minlength=self.total).astype(np.int64)
+
+    # ---------------------------
+    # BUILD / PERSIST
+    # ---------------------------
+
+    @classmethod
+    def build(cls, tagged_data: Iterable[Dict], stamp: List[int] | None = None) -> "VerseSimilarity":
+        vocab: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[float] = []
+
+        for entry in tagged_data:
+            tf: Dict[int, int] = {}
+            for token in tokenize(entry.get("text", "")):
+                term = vocab.setdefault(token, len(vocab))
+                tf[term] = tf.get(term, 0) + 1
+            for term in sorted(tf):
+                indices.append(term)
+                # sublinear tf: "the" x5 should not outweigh one rare word
+                counts.append(1.0 + math.log(tf[term]))
+            indptr.append(len(indices))
+
+        indptr_a = np.asarray(indptr, dtype=np.int64)
+        indices_a = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(counts, dtype=np.float32)
+        total = len(indptr) - 1
+
+        # smoothed idf, as in scikit-learn's TfidfVectorizer
+        df = np.bincount(indices_a, minlength=len(vocab))
+        idf = (np.log((1 + total) / (1 + df)) + 1).astype(np.float32)
+        data *= idf[indices_a]
+
+        rows = np.repeat(np.arange(total), np.diff(indptr_a))
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=total)).astype(np.float32)
+        data /= norms[rows]
+
+        return cls(indptr_a, indices_a, data, stamp)
+
+    def save(self, path: Path) -> None:
+        # np.savez appends .npz unless the name already ends with it
+        with path.open("wb") as f:
+            np.savez(f, version=np.int64(SIMILARITY_VERSION), stamp=np.asarray(self.stamp or [], dtype=np.int64),
+                     indptr=self.indptr, indices=self.indices, data=self.data)
+
+    @classmethod
+    def load(cls, path: Path) -> "VerseSimilarity":
+        with np.load(path) as npz:
+            if int(npz["version"]) != SIMILARITY_VERSION:
+                raise ValueError(f"Unsupported similarity index version in {path}")
+            return cls(npz["indptr"], npz["indices"], npz["data"], npz["stamp"].tolist() or None)
+
+    # ---------------------------
+    # QUERIES
+    # ---------------------------
+
+    def _score_batch(self, groups: Sequence[Sequence[int]]) -> np.ndarray:
+        """
+        (len(groups), total) cosine scores; each group of rows is summed
+        into one query vector (a single verse, or a pack's centroid).
+        """
+        starts, ends, owners = [], [], []
+        for owner, rows in enumerate(groups):
+            rows = np.asarray(rows, dtype=np.int64)
+            starts.append(self.indptr[rows])
+            ends.append(self.indptr[rows + 1])
+            owners.append(np.full(len(rows), owner, dtype=np.int64))
+        if not starts:
+            return np.zeros((0, self.total), dtype=np.float64)
+
+        starts, ends, owners = np.concatenate(starts), np.concatenate(ends), np.concatenate(owners)
+
+        # query non-zeros: (owner, term, weight), summed per (owner, term) so a
+        # word shared by many verses of a pack walks its posting list once
+        nz = _concat_ranges(starts, ends)
+        terms = len(self._col_ptr) - 1
+        keys, inverse = np.unique(np.repeat(owners, ends - starts) * terms + self.indices[nz],
+                                  return_inverse=True)
+        q_owner, q_terms = np.divmod(keys, terms)
+        q_weight = np.bincount(inverse, weights=self.data[nz])
+        # unit-length queries, so a pack centroid also scores as a cosine
+        q_norm = np.sqrt(np.bincount(q_owner, weights=q_weight * q_weight, minlength=len(groups)))
+        q_weight /= np.where(q_norm > 0, q_norm, 1.0)[q_owner]
+
+        slots = self._dense_slot[q_terms]
+        dense = slots >= 0
+
+        # rare terms: every verse in their posting lists
+        sparse = ~dense
+        col_start = self._col_ptr[q_terms[sparse]]
+        col_end = self._col_ptr[q_terms[sparse] + 1]
+        hits = _concat_ranges(col_start, col_end)
+        lengths = col_end - col_start
+
+        cells = np.repeat(q_owner[sparse], lengths) * self.total + self._col_rows[hits]
+        weights = np.repeat(q_weight[sparse], lengths) * self._col_data[hits]
+        scores = np.bincount(cells, weights=weights, minlength=len(groups) * self.total)
+        # (bincount of no cells at all comes back as int64)
+        scores = scores.astype(np.float64, copy=False).reshape(len(groups), self.total)
+        del hits, cells, weights
+
+        # common terms: one (queries x common terms) @ (common terms x verses) product
+        if dense.any():
+            q_dense = np.zeros((len(groups), len(self._dense)), dtype=np.float32)
+            q_dense[q_owner[dense], slots[dense]] = q_weight[dense]
+            scores += q_dense @ self._dense
+        return scores
+
+    def _batches(self, groups: Sequence[Sequence[int]]):
+        """
+        Consecutive slices of groups, each within _BATCH_CELLS score cells
+        and (by an upper bound: a pack's shared words are counted per
+        verse) _BATCH_POSTINGS gathered postings.
+        """
+        max_groups = max(1, _BATCH_CELLS // max(self.total, 1))
+        costs = [int(self._row_postings[np.asarray(rows, dtype=np.int64)].sum()) for rows in groups]
+
+        lo = postings = 0
+        for i, cost in enumerate(costs):
+            if i > lo and (i - lo == max_groups or postings + cost > _BATCH_POSTINGS):
+                yield groups[lo:i]
+                lo, postings = i, 0
+            postings += cost
+        if lo < len(groups):
+            yield groups[lo:]
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int, exclude: Iterable[int]) -> List[Tuple[int, float]]:
+        scores = scores.copy()
+        scores[list(exclude)] = -np.inf
+        k = min(k, int(np.count_nonzero(scores > 0)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        # best first; ties keep source order
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def most_similar(self, verse_ids: Sequence[int], k: int = 5) -> List[List[Tuple[int, float]]]:
+        """Top-k (verse id, cosine) for each verse, excluding the verse itself."""
+        results: List[List[Tuple[int, float]]] = []
+        for batch in self._batches([[v] for v in verse_ids]):
+            scores = self._score_batch(batch)
+            for row, (verse_id,) in enumerate(batch):
+                results.append(self._top_k(scores[row], k, [verse_id]))
+        return results
+
+    def related_to(self, verse_ids: Sequence[int], k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (verse id, cosine) closest to a set of verses taken together, excluding them."""
+        if not verse_ids:
+            return []
+        scores = self._score_batch([verse_ids])[0]
+        return self._top_k(scores, k, verse_ids)
+
+
+def load_or_build_similarity(source: Path, tagged_data) -> VerseSimilarity:
+    """
+    The similarity matrix for `source`: read from disk when it is still
+    current, otherwise built from `tagged_data` (a list, or a callable that
+    loads it) and saved.
+    """
+    path = similarity_path_for(source)
+    stamp = _source_stamp(source)
+
+    if path.exists():
+        try:
+            similarity = VerseSimilarity.load(path)
+            if similarity.stamp == stamp:
+                return similarity
+        except (ValueError, KeyError, OSError):
+            pass  # unreadable or old matrix: rebuild below
+
+    if callable(tagged_data):
+        tagged_data = tagged_data(source)
+    similarity = VerseSimilarity.build(tagged_data, stamp)
+    similarity.save(path)
+    return similarity
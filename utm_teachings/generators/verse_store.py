@@ -0,0 +1,231 @@
+"""
+UTM Verse Store
+Random access to a full Bible text file (`Book C:V | text` per line, or
+`Book C:V<TAB>text`) without loading it.
+
+The first open scans the file once and writes an offset table next to it
+(kjv.txt -> kjv.txt.vsidx):
+
+    b"UTMVIDX1" | uint32 header length | JSON header | ids I | offsets Q | lengths I
+
+ids are canonical verse ids (scripture_refs: book << 16 | chapter << 8 |
+verse) in sorted order; offsets/lengths locate each verse's text in the
+source. The source itself is memory-mapped, so a lookup is a bisection
+plus one small decode, and only the pages actually read are touched.
+The table is rebuilt when the source's size or mtime changes.
+
+    with VerseStore("kjv.txt") as kjv:
+        kjv.text_for("Deut 7:6")
+        kjv.range(*parse_reference("Deut 28:15-68").id_range())
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from scripture_refs import parse_reference, single_verse_id
+
+MAGIC = b"UTMVIDX1"
+INDEX_VERSION = 1
+
+_SEPARATORS = (b"|", b"\t")
+
+
+def store_index_path(source: Path) -> Path:
+    return source.with_name(source.name + ".vsidx")
+
+
+def _source_stamp(source: Path) -> Dict:
+    st = source.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _scan_source(source: Path) -> Tuple[array, array, array, int]:
+    """One pass over the raw bytes: (ids, offsets, lengths, skipped lines)."""
+    entries = {}
+    skipped = 0
+    offset = 0
+
+    with source.open("rb") as f:
+        for line in f:
+            start = offset
+            offset += len(line)
+
+            for sep in _SEPARATORS:
+                cut = line.find(sep)
+                if cut != -1:
+                    break
+            else:
+                continue
+
+            try:
+                vid = single_verse_id(line[:cut].decode("utf-8"))
+            except (UnicodeDecodeError, ValueError):
+                vid = None
+            if vid is None:
+                skipped += 1
+                continue
+
+            text = line[cut + 1:]
+            lead = len(text) - len(text.lstrip())
+            body = text.strip()
+            # the first occurrence of a verse wins
+            entries.setdefault(vid, (start + cut + 1 + lead, len(body)))
+
+    ids = array("I", sorted(entries))
+    offsets = array("Q", (entries[v][0] for v in ids))
+    lengths = array("I", (entries[v][1] for v in ids))
+    return ids, offsets, lengths, skipped
+
+
+def build_store_index(source: Path) -> Path:
+    """Scan the source and write its offset table; returns the index path."""
+    source = Path(source)
+    ids, offsets, lengths, skipped = _scan_source(source)
+
+    header = json.dumps({
+        "version": INDEX_VERSION,
+        "source": _source_stamp(source),
+        "count": len(ids),
+        "skipped": skipped,
+    }).encode("utf-8")
+
+    path = store_index_path(source)
+    with path.open("wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        for col in (ids, offsets, lengths):
+            if sys.byteorder != "little":
+                col = array(col.typecode, col)
+                col.byteswap()
+            f.write(col.tobytes())
+    return path
+
+
+def _read_store_index(path: Path):
+    """(header, ids, offsets, lengths), or None if the file is not a usable index."""
+    raw = path.read_bytes()
+    if raw[:len(MAGIC)] != MAGIC:
+        return None
+
+    header_end = len(MAGIC) + 4 + int.from_bytes(raw[len(MAGIC):len(MAGIC) + 4], "little")
+    header = json.loads(raw[len(MAGIC) + 4:header_end].decode("utf-8"))
+    if header.get("version") != INDEX_VERSION:
+        return None
+
+    cols = []
+    pos = header_end
+    for code in ("I", "Q", "I"):
+        col = array(code)
+        size = header["count"] * col.itemsize
+        col.frombytes(raw[pos:pos + size])
+        if sys.byteorder != "little":
+            col.byteswap()
+        cols.append(col)
+        pos += size
+
+    return (header, *cols)
+
+
+class VerseStore:
+    """Memory-mapped verse text lookup by reference or canonical verse id."""
+
+    def __init__(self, source, rebuild: bool = False):
+        self.source = Path(source)
+        if not self.source.exists():
+            raise FileNotFoundError(f"Verse store source not found: {self.source}")
+
+        index_path = store_index_path(self.source)
+        loaded = None
+        if not rebuild and index_path.exists():
+            try:
+                loaded = _read_store_index(index_path)
+            except (ValueError, KeyError):
+                loaded = None
+            if loaded is not None and loaded[0].get("source") != _source_stamp(self.source):
+                loaded = None
+
+        if loaded is None:
+            build_store_index(self.source)
+            loaded = _read_store_index(index_path)
+
+        header, self.ids, self.offsets, self.lengths = loaded
+        self.skipped = header.get("skipped", 0)
+
+        with self.source.open("rb") as f:
+            # mmap rejects empty files
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if header["count"] else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _text_at(self, i: int) -> str:
+        start = self.offsets[i]
+        return self._mm[start:start + self.lengths[i]].decode("utf-8")
+
+    def _position(self, vid: int) -> int | None:
+        i = bisect_left(self.ids, vid)
+        if i < len(self.ids) and self.ids[i] == vid:
+            return i
+        return None
+
+    def __contains__(self, vid: int) -> bool:
+        return self._position(vid) is not None
+
+    def text_for(self, reference) -> str | None:
+        """
+        Text of one verse, by reference string or verse id. For a range
+        reference the verses are joined with spaces. None when absent.
+        """
+        if isinstance(reference, int):
+            i = self._position(reference)
+            return self._text_at(i) if i is not None else None
+
+        verses = self.verses(reference)
+        if not verses:
+            return None
+        return " ".join(text for _, text in verses)
+
+    def ids_between(self, first: int, last: int) -> range:
+        """Positions (in the store) of verses with first <= id <= last."""
+        lo = bisect_left(self.ids, first)
+        return range(lo, bisect_right(self.ids, last, lo))
+
+    def range(self, first: int, last: int) -> List[Tuple[int, str]]:
+        """(verse id, text) for every stored verse with first <= id <= last."""
+        return [(self.ids[i], self._text_at(i)) for i in self.ids_between(first, last)]
+
+    def verse_ids(self, reference: str) -> List[int]:
+        """Stored verse ids covered by a reference (ValueError if it does not parse)."""
+        vid = single_verse_id(reference)
+        if vid is not None:
+            return [vid] if vid in self else []
+        first, last = parse_reference(reference).id_range()
+        return [self.ids[i] for i in self.ids_between(first, last)]
+
+    def verses(self, reference: str) -> List[Tuple[int, str]]:
+        """(verse id, text) for a reference; ranges expand to each stored verse."""
+        vid = single_verse_id(reference)
+        if vid is not None:
+            i = self._position(vid)
+            return [(vid, self._text_at(i))] if i is not None else []
+        return self.range(*parse_reference(reference).id_range())
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
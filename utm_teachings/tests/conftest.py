@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the generators are plain scripts that import each other by module name
+GENERATORS = Path(__file__).resolve().parent.parent / "generators"
+sys.path.insert(0, str(GENERATORS))
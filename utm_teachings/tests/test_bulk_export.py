@@ -0,0 +1,74 @@
+import gzip
+import tracemalloc
+
+import pytest
+
+import scripture_tagger_v3
+import scripture_tagger_v4
+from bulk_export import open_export
+from stage_profiler import StageProfiler
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_file_appears_only_when_closed(tmp_path, background):
+    path = tmp_path / "out.txt"
+    with open_export(path, background=background) as f:
+        f.write("verse\n")
+        assert not path.exists()
+    assert path.read_text(encoding="utf-8") == "verse\n"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_failed_export_leaves_nothing(tmp_path):
+    with pytest.raises(RuntimeError):
+        with open_export(tmp_path / "out.txt", compress="gzip", background=True) as f:
+            f.write("partial\n")
+            raise RuntimeError("tagging failed")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_gzip_records_the_final_name(tmp_path):
+    with open_export(tmp_path / "out.json", compress="gzip") as f:
+        f.write("{}")
+    raw = (tmp_path / "out.json.gz").read_bytes()
+    assert raw[10:raw.index(b"\0", 10)] == b"out.json"  # FNAME field
+    assert gzip.decompress(raw) == b"{}"
+
+
+@pytest.mark.parametrize("profile", [False, True])
+def test_failed_run_removes_every_sink_output(tmp_path, profile):
+    def verses():
+        yield scripture_tagger_v3.tag_verse("Gen 17:7", "my covenant")
+        raise RuntimeError("input vanished")
+
+    meta = {"version": "3.0", "timestamp": "now", "total": 2}
+    sinks = [
+        scripture_tagger_v4.json_sink(tmp_path / "out.json", meta, background=True),
+        scripture_tagger_v4.markdown_sink(tmp_path / "out.md", meta),
+        scripture_tagger_v4.csv_sink(tmp_path / "out.csv", compress="gzip"),
+        scripture_tagger_v4.binary_sink(tmp_path / "out.utmtag"),
+    ]
+    profiler = StageProfiler(profile)
+    if profile:
+        sinks = [scripture_tagger_v4.profiled_sink(sink, profiler, "write") for sink in sinks]
+
+    try:
+        with pytest.raises(RuntimeError, match="input vanished"):
+            scripture_tagger_v4.stream_to_sinks(verses(), sinks)
+    finally:
+        profiler.finish()
+    assert list(tmp_path.iterdir()) == []
+    assert not tracemalloc.is_tracing()  # finish() stops the tracing the profiler started
+
+
+def test_sink_that_fails_to_open_cleans_up_the_started_ones(tmp_path):
+    meta = {"version": "3.0", "timestamp": "now", "total": 1}
+    sinks = [
+        scripture_tagger_v4.json_sink(tmp_path / "out.json", meta, background=True),
+        scripture_tagger_v4.markdown_sink(tmp_path / "missing" / "out.md", meta),
+        scripture_tagger_v4.csv_sink(tmp_path / "out.csv"),
+    ]
+
+    with pytest.raises(FileNotFoundError):
+        scripture_tagger_v4.stream_to_sinks([scripture_tagger_v3.tag_verse("Gen 17:7", "my covenant")], sinks)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,40 @@
+import io
+import json
+
+import scripture_tagger_v3
+from json_stream import JsonArrayWriter, dumps_indented, write_json_array
+
+ITEMS = [
+    scripture_tagger_v3.tag_verse("Deut 7:6", "For thou art an holy people — chosen"),
+    {"reference": "Ps 1:1", "score": float("nan"), "nested": {"list": [1, 2.5, [], {}], "empty": ""}},
+    [],
+    "Elohim א",
+]
+
+
+def expected(items):
+    return json.dumps([getattr(i, "to_dict", lambda: i)() for i in items], indent=4, ensure_ascii=False)
+
+
+def test_streamed_array_matches_json_dump():
+    for items in (ITEMS, ITEMS[:1], []):
+        out = io.StringIO()
+        assert write_json_array(iter(items), out) == len(items)
+        assert out.getvalue() == expected(items)
+
+        listed = io.StringIO()
+        write_json_array(list(items), listed)
+        assert listed.getvalue() == out.getvalue()
+
+
+def test_nested_array_matches_json_dump():
+    out = io.StringIO()
+    out.write('{\n    "metadata": ' + dumps_indented({"total": 2, "tags": ["a"]}, 1) + ',\n    "verses": ')
+    writer = JsonArrayWriter(out, level=1)
+    for item in ITEMS:
+        writer.write(item)
+    writer.close()
+    out.write("\n}")
+
+    document = {"metadata": {"total": 2, "tags": ["a"]}, "verses": json.loads(expected(ITEMS))}
+    assert out.getvalue() == json.dumps(document, indent=4, ensure_ascii=False)
@@ -0,0 +1,99 @@
+import random
+from collections import Counter
+
+import pytest
+
+import keyword_matcher
+import theme_rules
+from keyword_matcher import KeywordMatcher
+
+
+def substring_scan(theme_keywords, text):
+    """The original score_themes loop: one `k in lower` test per keyword."""
+    lower = text.lower()
+    counts = Counter()
+    for theme, keywords in theme_keywords.items():
+        for k in keywords:
+            if k in lower:
+                counts[theme] += 1
+    return counts
+
+
+# overlapping keywords ("judge" / "judgment" / "men" / "amen"), keywords
+# inside other words ("yah" in "yahuah", "word" in "sword"), a keyword listed
+# under two themes and one listed twice under the same theme
+THEMES = {
+    "justice": ["judge", "judgment", "judgments", "right"],
+    "worship": ["amen", "men", "yah", "praise"],
+    "scripture": ["word", "sword", "written", "praise"],
+    "law": ["statute", "statutes", "law", "law"],
+}
+
+TEXTS = [
+    "The judgments of the LORD are true and righteous altogether.",
+    "Praise ye Yahuah. Amen, and amen.",
+    "The word of Elohim is sharper than any twoedged sword",
+    "Keep my statutes and my judgments: which if a man do, he shall live",
+    "Men of Israel, hear these words",
+    "nothing to see here",
+    "",
+]
+
+
+def rich_texts(count=300, seed=11):
+    rng = random.Random(seed)
+    pieces = [k for ks in THEMES.values() for k in ks] + ["the", "and", "lo", "s", "ment", "hu", " "]
+    return ["".join(rng.choice(pieces) + rng.choice(["", " ", ", "]) for _ in range(rng.randint(0, 25)))
+            for _ in range(count)]
+
+
+@pytest.fixture(params=["substring-scan", "automaton"])
+def matcher(request, monkeypatch):
+    monkeypatch.setattr(keyword_matcher, "SUBSTRING_SCAN_LIMIT", 1 << 30 if request.param == "substring-scan" else 0)
+    return KeywordMatcher(THEMES)
+
+
+def test_matches_the_substring_scan(matcher):
+    for text in TEXTS + rich_texts():
+        expected = substring_scan(THEMES, text)
+        counts = matcher.count_themes(text)
+        assert counts == expected, text
+        # same insertion order too: most_common() breaks ties by it
+        assert list(counts.items()) == list(expected.items()), text
+
+
+def test_keywords_inside_words_and_overlaps(matcher):
+    assert matcher.count_themes("Praise Yahuah, twoedged sword") == \
+        Counter({"worship": 2, "scripture": 3})  # yah, praise / word, sword, praise
+    # judgment, judgments / "men" inside judgMENts
+    assert matcher.count_themes("judgments") == Counter({"justice": 2, "worship": 1})
+    assert matcher.count_themes("the law") == Counter({"law": 2})  # listed twice, counted twice
+
+
+def test_empty_keyword_matches_every_verse(monkeypatch):
+    themes = {"all": [""], "none": ["zzz"]}
+    for limit in (1 << 30, 0):
+        monkeypatch.setattr(keyword_matcher, "SUBSTRING_SCAN_LIMIT", limit)
+        assert KeywordMatcher(themes).count_themes("anything") == Counter({"all": 1})
+
+
+def test_large_keyword_sets_use_the_automaton():
+    rng = random.Random(5)
+    words = sorted({"".join(rng.choice("abcdehilmnorst") for _ in range(rng.randint(2, 7))) for _ in range(600)})
+    themes = {f"theme{i}": words[i::7] for i in range(7)}
+    matcher = KeywordMatcher(themes)
+    assert len(matcher.keywords) >= keyword_matcher.SUBSTRING_SCAN_LIMIT
+
+    for _ in range(200):
+        text = " ".join(rng.choice(words) + rng.choice(["", "s", "ed"]) for _ in range(rng.randint(1, 30)))
+        assert list(matcher.count_themes(text).items()) == list(substring_scan(themes, text).items())
+
+
+def test_shipped_rules_match_the_substring_scan(monkeypatch):
+    keywords = theme_rules.active().keywords
+    texts = [" ".join(ks) for ks in keywords.values()] + TEXTS + [" ".join(k[1:] for ks in keywords.values() for k in ks)]
+    for limit in (1 << 30, 0):
+        monkeypatch.setattr(keyword_matcher, "SUBSTRING_SCAN_LIMIT", limit)
+        matcher = KeywordMatcher(keywords)
+        for text in texts:
+            assert list(matcher.count_themes(text).items()) == list(substring_scan(keywords, text).items())
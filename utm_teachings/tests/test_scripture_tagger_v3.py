@@ -0,0 +1,28 @@
+import pytest
+
+import scripture_tagger_v3
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_count_matches_parsed_verses(tmp_path, newline):
+    source = tmp_path / "verses.txt"
+    lines = ["Deut 7:6 | a chosen people", "", "Gen 17:7 | my covenant", "Ps 23:1 | my shepherd"]
+    source.write_bytes(newline.join(lines).encode("utf-8"))
+
+    assert scripture_tagger_v3.count_scripture_lines(source) == 3
+    assert len(scripture_tagger_v3.process_scripture_file(source)) == 3
+
+
+def test_rules_are_looked_up_once_per_run(tmp_path, monkeypatch):
+    import theme_rules
+
+    source = tmp_path / "verses.txt"
+    source.write_text("\n".join(f"Gen 1:{i} | my covenant with a chosen people" for i in range(1, 50)),
+                      encoding="utf-8")
+    rules = theme_rules.active()
+    calls = []
+    monkeypatch.setattr(theme_rules, "active", lambda: calls.append(1) or rules)
+
+    tagged = scripture_tagger_v3.process_scripture_file(source)
+    assert len(tagged) == 49 and tagged[0]["cross_references"]
+    assert len(calls) == 1
@@ -0,0 +1,85 @@
+import random
+import re
+import sys
+
+import pytest
+
+import scripture_tagger_v3
+import scripture_tagger_v4
+
+
+def write_corpus(path, verses, seed=7):
+    rng = random.Random(seed)
+    keywords = [k for ks in scripture_tagger_v3.THEME_KEYWORDS.values() for k in ks]
+    filler = ["and", "the", "unto", "them", "said", "of", "lord", "day", "Ελοχιμ", "“", "—"]
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(verses):
+            words = [rng.choice(keywords) if rng.random() < 0.15 else rng.choice(filler)
+                     for _ in range(rng.randint(6, 20))]
+            f.write(f"Genesis {i // 150 + 1}:{i % 150 + 1} | {' '.join(words)}\n")
+            if i % 500 == 0:
+                f.write("\n# not a verse\n")
+
+
+def run_cli(monkeypatch, base, *args):
+    """Run scripture_tagger_v4.main() as if the script lived in `base`; returns the export dir."""
+    base.mkdir(parents=True)
+    monkeypatch.setattr(scripture_tagger_v4, "__file__", str(base / "scripture_tagger_v4.py"))
+    monkeypatch.setattr(sys, "argv", ["scripture_tagger_v4.py", *args])
+    scripture_tagger_v4.main()
+    return base.parent / "exports/v3"
+
+
+def exported_files(export_dir):
+    files = {}
+    for path in sorted(export_dir.rglob("*")):
+        if path.is_file():
+            raw = path.read_bytes()
+            # the run timestamp is the only thing allowed to differ
+            raw = re.sub(rb'"timestamp": "[^"]*"|Generated: [^\n]*', b"<timestamp>", raw)
+            files[str(path.relative_to(export_dir))] = raw
+    return files
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["batch", "stream"])
+def test_workers_output_is_identical_to_serial(tmp_path, monkeypatch, stream):
+    corpus = tmp_path / "verses.txt"
+    write_corpus(corpus, verses=6000)
+    monkeypatch.setattr(scripture_tagger_v4, "MIN_CHUNK_BYTES", 16 << 10)
+    assert len(scripture_tagger_v4.chunk_byte_ranges(corpus, 3 * 4)) > 6
+
+    args = ["--all", "--input", str(corpus)] + (["--stream"] if stream else [])
+    serial = exported_files(run_cli(monkeypatch, tmp_path / "serial/generators", *args))
+    parallel = exported_files(run_cli(monkeypatch, tmp_path / "parallel/generators", *args, "--workers", "3"))
+
+    assert set(serial) == {"json/tagged_output_v3.json", "markdown/tagged_output_v3.md",
+                           "csv/tagged_output_v3.csv", "text/tagged_output_v3.txt",
+                           "binary/tagged_output_v3.utmtag"}
+    assert serial == parallel
+    assert serial["json/tagged_output_v3.json"].count(b'"reference"') == 6000
+
+
+def test_parallel_keeps_a_bounded_window(tmp_path, monkeypatch):
+    import concurrent.futures
+
+    corpus = tmp_path / "verses.txt"
+    write_corpus(corpus, verses=6000)
+    monkeypatch.setattr(scripture_tagger_v4, "MIN_CHUNK_BYTES", 1024)
+
+    submitted = []
+
+    class CountingPool(concurrent.futures.ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(args)
+            return super().submit(fn, *args)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", CountingPool)
+
+    chunks = len(scripture_tagger_v4.chunk_byte_ranges(corpus, 16))
+    assert chunks > 5
+
+    verses = scripture_tagger_v4.parallel_tagged_verses(corpus, workers=2, chunks_per_worker=8)
+    next(verses)
+    assert len(submitted) == 5  # the chunk being yielded + 2 x workers ahead
+    rest = list(verses)
+    assert len(submitted) == chunks and len(rest) == 5999
@@ -0,0 +1,46 @@
+import pytest
+
+import scripture_tagger_v5
+from scripture_tagger_v5 import PublishSink, publish
+
+
+class RecordingSink(PublishSink):
+    def __init__(self, log, name, fail_start=False):
+        self.log, self.name, self.fail_start = log, name, fail_start
+
+    def start(self):
+        if self.fail_start:
+            raise OSError(f"{self.name}: cannot open output")
+        self.log.append(("start", self.name))
+
+    def finish(self):
+        self.log.append(("finish", self.name))
+
+
+def test_only_started_sinks_are_finished():
+    log = []
+    sinks = [RecordingSink(log, "a"), RecordingSink(log, "b", fail_start=True), RecordingSink(log, "c")]
+    with pytest.raises(OSError):
+        publish([], sinks)
+    assert log == [("start", "a"), ("finish", "a")]
+
+
+def test_registry_lists_every_sink_with_its_outputs():
+    assert set(scripture_tagger_v5.SINKS) == {"report", "slides", "social"}
+    cls, outputs = scripture_tagger_v5.SINKS["slides"]
+    assert cls is scripture_tagger_v5.SlideOutlineSink
+    assert outputs == ("slides_v5.json", "slides_v5.md")
+
+
+def test_default_input_falls_back_to_the_binary_export(tmp_path):
+    base = tmp_path / "generators"
+    base.mkdir()
+    binary = tmp_path / "exports/v3/binary/tagged_output_v3.utmtag"
+    assert scripture_tagger_v5.default_input(base) == base / "tagged_output_v3.json"
+
+    binary.parent.mkdir(parents=True)
+    binary.write_bytes(b"")
+    assert scripture_tagger_v5.default_input(base).resolve() == binary
+
+    (base / "tagged_output_v3.json").write_text("[]", encoding="utf-8")
+    assert scripture_tagger_v5.default_input(base) == base / "tagged_output_v3.json"
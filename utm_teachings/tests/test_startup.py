@@ -0,0 +1,53 @@
+"""
+Startup budget for the generator CLIs (shell loops and Lambda call them
+hundreds of times). The module checks are exact; the timed check takes the
+best of several fresh interpreters and leaves ample headroom, so a busy
+machine does not fail it.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+GENERATORS = Path(__file__).resolve().parent.parent / "generators"
+
+# Loaded only by the code paths that need them, never for --help
+DEFERRED = {
+    "numpy", "sqlite3", "csv", "concurrent.futures", "multiprocessing",
+    "scripture_tagger_v3", "theme_rules", "keyword_matcher", "theme_scorer",
+    "theme_index", "scripture_refs", "verse_similarity", "tag_cache",
+    "tagged_binary", "bulk_export", "json_stream",
+}
+
+# ms to import v4 and tag a first verse (loads the rules, compiles the
+# matcher); ~60 ms measured, so well over 2x headroom
+TAGGING_BUDGET_MS = 150
+
+TAGGING_PATH = """
+import time
+start = time.perf_counter()
+import scripture_tagger_v4
+from scripture_tagger_v3 import tag_verse
+tag_verse("Deuteronomy 7:6", "thou art an holy people: chosen")
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def run_python(*args) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=GENERATORS, capture_output=True,
+                          text=True, check=True)
+
+
+@pytest.mark.parametrize("script", ["scripture_tagger_v4.py", "scripture_tagger_v5.py", "study_pack_builder.py"])
+def test_help_defers_heavy_imports(script):
+    trace = run_python("-X", "importtime", script, "--help").stderr
+    imported = {line.rsplit("|", 1)[-1].strip() for line in trace.splitlines() if "|" in line}
+    assert not imported & DEFERRED
+
+
+def test_tagging_import_path_within_budget():
+    run_python("-c", TAGGING_PATH)  # warm the bytecode cache
+    best = min(float(run_python("-c", TAGGING_PATH).stdout) for _ in range(5))
+    assert best < TAGGING_BUDGET_MS
@@ -0,0 +1,31 @@
+import json
+
+import scripture_tagger_v3
+from study_pack_builder import build_packs_from_manifest, load_manifest
+
+VERSES = [
+    ("Deuteronomy 7:6", "For thou art an holy people: thy Elohim hath chosen thee"),
+    ("Deuteronomy 28:15", "But it shall come to pass, if thou wilt not hearken, curses shall come"),
+    ("Genesis 17:7", "And I will establish my covenant between me and thee"),
+]
+
+
+def write_source(path):
+    tagged = [scripture_tagger_v3.tag_verse(ref, text) for ref, text in VERSES]
+    path.write_text(json.dumps([v.to_dict() for v in tagged]), encoding="utf-8")
+
+
+def test_range_only_pack(tmp_path):
+    write_source(tmp_path / "tagged.json")
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({
+        "source": "tagged.json",
+        "output_dir": "packs",
+        "packs": [{"output": "deut.md", "title": "Deuteronomy", "range": "Deut 7-28"}],
+    }), encoding="utf-8")
+
+    assert load_manifest(manifest)["packs"][0]["range"] == "Deut 7-28"
+    build_packs_from_manifest(manifest)
+    pack = (tmp_path / "packs" / "deut.md").read_text(encoding="utf-8")
+    assert "Deuteronomy 7:6" in pack and "Deuteronomy 28:15" in pack
+    assert "Genesis 17:7" not in pack
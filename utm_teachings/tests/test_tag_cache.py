@@ -0,0 +1,56 @@
+import scripture_tagger_v3
+from tag_cache import TagCache
+
+
+def write_verses(path, verses):
+    path.write_text("".join(f"{ref} | {text}\n" for ref, text in verses), encoding="utf-8")
+
+
+VERSES = [
+    ("Deut 7:6", "For thou art an holy people unto the LORD thy God: chosen"),
+    ("Gen 17:7", "I will establish my covenant between me and thee"),
+    ("Ps 23:1", "The LORD is my shepherd; I shall not want"),
+]
+
+
+def test_warm_cache_matches_uncached(tmp_path):
+    source = tmp_path / "verses.txt"
+    write_verses(source, VERSES)
+    expected = scripture_tagger_v3.process_scripture_file(source)
+    fingerprint = scripture_tagger_v3.config_fingerprint()
+
+    with TagCache(tmp_path / "cache.sqlite", fingerprint) as cache:
+        assert scripture_tagger_v3.process_scripture_file(source, cache) == expected
+        assert (cache.hits, cache.misses) == (0, 3)
+
+    with TagCache(tmp_path / "cache.sqlite", fingerprint) as cache:
+        warm = scripture_tagger_v3.process_scripture_file(source, cache)
+        assert (cache.hits, cache.misses) == (3, 0)
+    assert warm == expected
+    assert [v.mask for v in warm] == [v.mask for v in expected]
+
+
+def test_prune_drops_edited_and_removed_verses(tmp_path):
+    source = tmp_path / "verses.txt"
+    fingerprint = scripture_tagger_v3.config_fingerprint()
+    write_verses(source, VERSES)
+    with TagCache(tmp_path / "cache.sqlite", fingerprint) as cache:
+        scripture_tagger_v3.process_scripture_file(source, cache)
+        assert cache.prune() == 0
+
+    write_verses(source, [VERSES[0], ("Gen 17:7", "an everlasting covenant")])
+    with TagCache(tmp_path / "cache.sqlite", fingerprint) as cache:
+        scripture_tagger_v3.process_scripture_file(source, cache)
+        assert cache.prune() == 2
+        assert cache.conn.execute("SELECT COUNT(*) FROM verses").fetchone() == (2,)
+
+
+def test_fingerprint_change_drops_cache(tmp_path):
+    source = tmp_path / "verses.txt"
+    write_verses(source, VERSES)
+    with TagCache(tmp_path / "cache.sqlite", "old") as cache:
+        scripture_tagger_v3.process_scripture_file(source, cache)
+
+    with TagCache(tmp_path / "cache.sqlite", "new") as cache:
+        scripture_tagger_v3.process_scripture_file(source, cache)
+        assert cache.hits == 0
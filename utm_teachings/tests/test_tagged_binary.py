@@ -0,0 +1,65 @@
+import json
+import struct
+
+import pytest
+
+import scripture_tagger_v3
+import tagged_binary
+from tagged_binary import MAGIC, TaggedCorpus, write_tagged_binary
+
+VERSES = [
+    ("Deut 7:6", "For thou art an holy people: chosen"),
+    ("Gen 17:7", "I will establish my covenant"),
+    ("Ps 23:1", "The LORD is my shepherd; I shall not want"),
+    ("Isa 1:3", "The ox knoweth his owner — my people doth not know"),
+]
+
+
+def test_round_trip_with_spilled_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(tagged_binary, "SPILL_VALUES", 2)
+    tagged = [scripture_tagger_v3.tag_verse(ref, text) for ref, text in VERSES]
+    path = tmp_path / "corpus.utmtag"
+
+    assert write_tagged_binary(tagged, path) == len(tagged)
+    with TaggedCorpus(path) as corpus:
+        assert list(corpus) == tagged
+
+
+def test_layout_is_little_endian(tmp_path):
+    entry = scripture_tagger_v3.tag_verse(*VERSES[0])
+    path = tmp_path / "corpus.utmtag"
+    write_tagged_binary([entry], path)
+    raw = path.read_bytes()
+
+    assert raw.startswith(MAGIC)
+    (header_len,) = struct.unpack_from("<I", raw, len(MAGIC))
+    header_end = len(MAGIC) + 4 + header_len
+    header = json.loads(raw[len(MAGIC) + 4:header_end])
+    data_start = header_end + (8 - header_end % 8) % 8
+
+    def column(name):
+        offset, length, code = header["sections"][name]
+        return [v for (v,) in struct.iter_unpack("<" + code, raw[data_start + offset:data_start + offset + length])]
+
+    reference, text = entry["reference"].encode("utf-8"), entry["text"].encode("utf-8")
+    assert column("str_offsets") == [0, len(reference), len(reference) + len(text)]
+    assert column("theme_offsets") == [0, len(entry["themes"])]
+    assert column("scores") == [entry["score"]]
+    assert header["themes"][column("primary")[0]] == entry["primary_theme"]
+
+
+def test_too_many_theme_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(tagged_binary, "MAX_TABLE_NAMES", 2)
+    entries = [{"reference": f"Gen 1:{i}", "text": "x", "themes": [f"theme{i}"], "primary_theme": f"theme{i}",
+                "secondary_themes": [], "score": 1.0, "cross_references": []} for i in range(3)]
+    path = tmp_path / "corpus.utmtag"
+    with pytest.raises(ValueError, match="Too many distinct theme names"):
+        write_tagged_binary(entries, path)
+    assert not path.exists()
+
+
+def test_v2_entries_are_rejected(tmp_path):
+    path = tmp_path / "corpus.utmtag"
+    with pytest.raises(ValueError, match="v3 tagged verses"):
+        write_tagged_binary([{"reference": "Gen 1:1", "text": "In the beginning", "themes": ["creation"]}], path)
+    assert not path.exists()
@@ -0,0 +1,78 @@
+import pickle
+import random
+
+import scripture_tagger_v3
+import scripture_tagger_v4
+import tagged_verse
+from study_pack_builder import filter_by_themes
+from tagged_verse import TaggedVerse, theme_mask
+
+
+def write_corpus(path, verses=3000, seed=7):
+    rng = random.Random(seed)
+    keywords = [k for ks in scripture_tagger_v3.THEME_KEYWORDS.values() for k in ks]
+    filler = ["and", "the", "unto", "them", "said", "of", "lord", "day"]
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(verses):
+            words = [rng.choice(keywords) if rng.random() < 0.15 else rng.choice(filler)
+                     for _ in range(rng.randint(6, 20))]
+            f.write(f"Genesis {i // 150 + 1}:{i % 150 + 1} | {' '.join(words)}\n")
+
+
+def test_pickle_recomputes_mask():
+    verse = TaggedVerse("Deut 7:6", "text", themes=["identity", "covenant"])
+    verse.mask = 1 << 40  # as if assigned by another process's bit table
+    restored = pickle.loads(pickle.dumps(verse))
+    assert restored.mask == theme_mask(["identity", "covenant"])
+    assert restored == verse
+
+
+def test_contains_follows_the_dict():
+    v2 = {"reference": "Gen 1:1", "text": "In the beginning", "themes": ["creation"]}
+    with_null = dict(v2, primary_theme="creation", score=None, note=None)
+
+    for data in (v2, with_null):
+        verse = TaggedVerse.from_dict(data)
+        for key in ("reference", "themes", "primary_theme", "score", "cross_references", "note"):
+            assert (key in verse) == (key in data), key
+            value = verse.get(key, "absent")
+            assert (list(value) if isinstance(value, tuple) else value) == data.get(key, "absent"), key
+        assert verse.to_dict() == data
+        assert list(verse.to_dict()) == list(data)
+
+
+def test_writers_take_dicts_and_records_alike(tmp_path):
+    import scripture_tagger_v5
+
+    records = [scripture_tagger_v3.tag_verse("Gen 17:7", "my covenant"),
+               scripture_tagger_v3.tag_verse("Ps 23:1", "The LORD is my shepherd")]
+    meta = {"version": "3.0", "timestamp": "now", "total": 2}
+
+    for name, data in (("records", records), ("dicts", [v.to_dict() for v in records])):
+        scripture_tagger_v4.save_json(data, tmp_path / f"{name}.json", meta)
+        scripture_tagger_v4.save_markdown(data, tmp_path / f"{name}.md", meta)
+        scripture_tagger_v4.save_csv(data, tmp_path / f"{name}.csv")
+        scripture_tagger_v5.export_social_snippets(data, tmp_path / f"{name}.social.md")
+
+    for suffix in (".json", ".md", ".csv", ".social.md"):
+        assert (tmp_path / f"records{suffix}").read_bytes() == (tmp_path / f"dicts{suffix}").read_bytes()
+
+
+def test_parallel_filter_matches_serial(tmp_path, monkeypatch):
+    corpus = tmp_path / "verses.txt"
+    write_corpus(corpus)
+
+    # fresh bit table in the parent and the forked workers, and many small
+    # chunks, so each worker numbers the themes in its own first-seen order
+    monkeypatch.setattr(tagged_verse, "_THEME_BITS", {})
+    monkeypatch.setattr(tagged_verse, "_MASKS", {})
+    monkeypatch.setattr(scripture_tagger_v4, "MIN_CHUNK_BYTES", 1024)
+
+    parallel = list(scripture_tagger_v4.parallel_tagged_verses(corpus, workers=3))
+    serial = scripture_tagger_v3.process_scripture_file(corpus)
+    assert parallel == serial
+
+    for theme in scripture_tagger_v3.THEME_KEYWORDS:
+        expected = [v["reference"] for v in serial if theme in v["themes"]]
+        assert [v["reference"] for v in filter_by_themes(parallel, [theme])] == expected
+        assert [v["reference"] for v in filter_by_themes(serial, [theme])] == expected
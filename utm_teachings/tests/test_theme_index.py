@@ -0,0 +1,99 @@
+import json
+import random
+import re
+
+import pytest
+
+from theme_index import ThemeIndex, index_path_for, load_or_build_index
+
+THEMES = ["identity", "covenant", "truth", "warning", "Restoration"]
+
+
+def make_entries(count=400, seed=3):
+    rng = random.Random(seed)
+    return [{"reference": f"Gen {i // 30 + 1}:{i % 30 + 1}",
+             "themes": rng.sample(THEMES, rng.randint(0, 3))} for i in range(count)]
+
+
+def naive(entries, expression):
+    """Evaluate the query per verse with Python's own not/and/or (same precedence)."""
+    python = re.sub(r"\w+", lambda m: m[0].lower() if m[0].upper() in ("AND", "OR", "NOT")
+                    else f"({m[0].lower()!r} in themes)", expression)
+    code = compile(python, "<query>", "eval")
+    return [i for i, e in enumerate(entries)
+            if eval(code, {}, {"themes": {t.lower() for t in e["themes"]}})]
+
+
+@pytest.fixture
+def entries():
+    return make_entries()
+
+
+@pytest.fixture
+def index(entries):
+    return ThemeIndex.build(entries)
+
+
+@pytest.mark.parametrize("expression", [
+    "identity",
+    "identity AND covenant",
+    "identity OR covenant",
+    "NOT warning",
+    "NOT NOT warning",
+    "identity AND NOT warning",
+    "identity OR covenant AND truth",             # AND binds tighter than OR
+    "(identity OR covenant) AND truth",
+    "identity AND (covenant OR truth) AND NOT warning",
+    "NOT (identity OR restoration)",
+    "restoration and not Identity or WARNING",     # operators and themes are case-insensitive
+    "missing OR truth",
+])
+def test_queries_match_a_per_verse_evaluation(entries, index, expression):
+    assert index.query(expression) == naive(entries, expression)
+
+
+def test_random_queries(entries, index):
+    rng = random.Random(9)
+    names = [t.lower() for t in THEMES]
+
+    def expr(depth):
+        if depth == 0 or rng.random() < 0.3:
+            return ("NOT " if rng.random() < 0.3 else "") + rng.choice(names)
+        op = rng.choice([" AND ", " OR "])
+        text = expr(depth - 1) + op + expr(depth - 1)
+        return f"({text})" if rng.random() < 0.5 else text
+
+    for _ in range(200):
+        expression = expr(3)
+        assert index.query(expression) == naive(entries, expression), expression
+
+
+@pytest.mark.parametrize("expression", ["", "identity AND", "(identity", "identity)", "AND truth", "NOT"])
+def test_malformed_queries(index, expression):
+    with pytest.raises(ValueError):
+        index.query(expression)
+
+
+def test_select_matches_a_scan(entries, index):
+    targets = ["truth", "Identity"]
+    expected = [i for i, e in enumerate(entries) if {"truth", "identity"} & {t.lower() for t in e["themes"]}]
+    assert index.select(targets) == expected
+    assert index.select(targets, within=set(range(100))) == [i for i in expected if i < 100]
+
+
+def load(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_index_is_rebuilt_when_the_source_changes(tmp_path, entries):
+    source = tmp_path / "tagged.json"
+    source.write_text(json.dumps(entries), encoding="utf-8")
+
+    index, data = load_or_build_index(source, load)
+    assert data is not None and index_path_for(source).exists()
+    index, data = load_or_build_index(source, load)
+    assert data is None and index.total == len(entries)
+
+    source.write_text(json.dumps(entries[:10]), encoding="utf-8")
+    index, data = load_or_build_index(source, load)
+    assert data is not None and index.total == 10
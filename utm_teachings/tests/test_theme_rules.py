@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import scripture_tagger_v3
+import theme_rules
+
+GENERATORS = Path(__file__).resolve().parent.parent / "generators"
+
+
+def write_rules(path, keywords, mtime_ns):
+    path.write_text(json.dumps({"version": 1, "themes": {"fruit": {"keywords": keywords}}}), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def restore_rules():
+    yield
+    theme_rules.use_rules()
+
+
+def test_reload_retries_after_a_bad_edit(tmp_path, restore_rules):
+    path = tmp_path / "rules.json"
+    write_rules(path, ["apple"], 1_000_000_000)
+    theme_rules.use_rules(path)
+
+    # a half-written save, then the finished file with the same size and
+    # mtime (coarse timestamps): the failed load must not be remembered
+    write_rules(path, ["pear"], 2_000_000_000)
+    fixed = path.read_bytes()
+    path.write_bytes(b"{" + b" " * (len(fixed) - 1))
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert theme_rules.reload_if_changed() is False
+    assert theme_rules.active().keywords == {"fruit": ["apple"]}
+
+    path.write_bytes(fixed)
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert theme_rules.reload_if_changed() is True
+    assert theme_rules.active().keywords == {"fruit": ["pear"]}
+    assert theme_rules.reload_if_changed() is False
+
+
+def test_config_fingerprint_tracks_rules_and_mode(restore_rules):
+    rules = theme_rules.active()
+    assert scripture_tagger_v3.config_fingerprint() == f"{rules.fingerprint}:substring"
+    scripture_tagger_v3.set_scoring_mode("token")
+    try:
+        assert scripture_tagger_v3.config_fingerprint() == f"{rules.fingerprint}:token"
+    finally:
+        scripture_tagger_v3.set_scoring_mode("substring")
+
+
+def test_v3_reports_a_bad_rules_file(tmp_path):
+    bad = tmp_path / "rules.json"
+    bad.write_text('{"version": 1, "themes": {}}', encoding="utf-8")
+    result = subprocess.run([sys.executable, "scripture_tagger_v3.py", "--rules", str(bad)],
+                            cwd=GENERATORS, capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "[ERROR]" in result.stdout and "Traceback" not in result.stderr
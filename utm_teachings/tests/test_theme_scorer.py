@@ -0,0 +1,89 @@
+import random
+import re
+from collections import Counter
+
+import pytest
+
+import theme_rules
+from theme_scorer import TokenScorer
+
+
+def words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def naive_counts(theme_keywords, text):
+    """Every whole-word (or whole-phrase) occurrence of every keyword, one regex per keyword."""
+    spaced = " ".join(words(text))
+    counts = Counter()
+    for theme, keywords in theme_keywords.items():
+        for k in keywords:
+            phrase = " ".join(words(k))
+            if phrase:
+                # lookahead, so overlapping occurrences ("amen amen" in "amen amen amen") all count
+                n = len(re.findall(rf"(?<!\S)(?=({re.escape(phrase)})(?!\S))", spaced))
+                if n:
+                    counts[theme] += n
+    return counts
+
+
+THEMES = {
+    "worship": ["yah", "praise", "amen amen", "amen"],
+    "scripture": ["word", "sword", "it is written"],
+    "warning": ["take heed", "heed", "beware"],
+    "covenant": ["covenant", "everlasting covenant", "lord's covenant", "word"],
+}
+WEIGHTS = {"worship": 1.0, "scripture": 2.0, "warning": 0.5}  # covenant: default 1.0
+
+TEXTS = [
+    "Praise Yahuah! Praise ye Yah.",
+    "The word of Elohim is sharper than any twoedged sword; it is written.",
+    "Take heed, and beware: take—heed! HEED.",
+    "Amen amen amen.",
+    "an everlasting covenant, the LORD’s covenant — the Lord's covenant",
+    "Swords and words are not keywords",
+    "",
+]
+
+
+def random_texts(count=300, seed=17):
+    rng = random.Random(seed)
+    pieces = [w for ks in THEMES.values() for k in ks for w in k.split()] + ["the", "and", "lord", "s", "yahuah"]
+    seps = [" ", ", ", "; ", ". ", " — ", "! ", "'"]
+    return ["".join(rng.choice(pieces) + rng.choice(seps) for _ in range(rng.randint(0, 30)))
+            for _ in range(count)]
+
+
+@pytest.fixture
+def scorer():
+    return TokenScorer(THEMES, WEIGHTS)
+
+
+def test_counts_match_a_naive_whole_word_count(scorer):
+    for text in TEXTS + random_texts():
+        expected = naive_counts(THEMES, text)
+        assert scorer.count_themes(text) == expected, text
+        assert list(scorer.count_themes(text)) == [t for t in THEMES if t in expected], text
+
+
+def test_score_weights_every_occurrence(scorer):
+    for text in TEXTS + random_texts():
+        counts = naive_counts(THEMES, text)
+        _, score = scorer.score(text)
+        assert score == pytest.approx(sum(n * WEIGHTS.get(theme, 1.0) for theme, n in counts.items())), text
+
+
+def test_whole_words_only(scorer):
+    assert scorer.count_themes("Swords and words; Yahuah") == Counter()
+    assert scorer.count_themes("sword word") == Counter({"scripture": 2, "covenant": 1})
+    assert scorer.count_themes("take heed") == Counter({"warning": 2})  # the phrase and "heed"
+
+
+def test_shipped_rules_match_the_naive_count():
+    rules = theme_rules.active()
+    scorer = TokenScorer(rules.keywords, rules.weights)
+    rng = random.Random(2)
+    vocabulary = [w for ks in rules.keywords.values() for k in ks for w in words(k)] + ["the", "of", "and"]
+    for _ in range(300):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 40)))
+        assert scorer.count_themes(text) == naive_counts(rules.keywords, text), text
@@ -0,0 +1,93 @@
+import random
+import tracemalloc
+
+import numpy as np
+
+import verse_similarity
+from verse_similarity import VerseSimilarity
+
+# a few very common words and a long tail, so both the dense and the
+# posting-list halves of the product are exercised
+COMMON = "the and of unto them that he said".split()
+RARE = [f"word{i}" for i in range(300)]
+
+
+def make_corpus(verses, seed=5):
+    rng = random.Random(seed)
+    return [
+        {"text": " ".join(rng.choice(COMMON) if rng.random() < 0.5 else rng.choice(RARE)
+                          for _ in range(rng.randint(4, 20)))}
+        for _ in range(verses)
+    ]
+
+
+def cosine_matrix(similarity):
+    """Every pairwise cosine, from a dense copy of the TF-IDF rows."""
+    rows = np.repeat(np.arange(similarity.total), np.diff(similarity.indptr))
+    dense = np.zeros((similarity.total, int(similarity.indices.max()) + 1))
+    dense[rows, similarity.indices] = similarity.data
+    return dense @ dense.T
+
+
+def assert_top_k(hits, scores, k, exclude):
+    scores = scores.copy()
+    scores[list(exclude)] = -np.inf
+    best = np.sort(scores[scores > 0])[::-1][:k]
+    assert len(hits) == len(best)
+    # ties may pick different verses, but never a different score
+    np.testing.assert_allclose([score for _, score in hits], best, atol=1e-5)
+    for verse_id, score in hits:
+        assert verse_id not in exclude
+        assert abs(scores[verse_id] - score) < 1e-5
+
+
+def test_top_k_matches_brute_force():
+    similarity = VerseSimilarity.build(make_corpus(400))
+    assert len(similarity._dense) > 0
+    cosines = cosine_matrix(similarity)
+
+    for verse_id, hits in enumerate(similarity.most_similar(range(400), k=5)):
+        assert_top_k(hits, cosines[verse_id], 5, [verse_id])
+
+    pack = [3, 17, 42, 99]
+    centroid = cosines[pack].sum(axis=0) / np.sqrt(cosines[np.ix_(pack, pack)].sum())
+    assert_top_k(similarity.related_to(pack, k=7), centroid, 7, pack)
+
+
+def test_only_common_terms():
+    # every term is dense, so no posting list is gathered at all
+    similarity = VerseSimilarity.build([{"text": t} for t in ("the and", "and of", "the of", "of the and")])
+    assert (similarity._dense_slot >= 0).all()
+    cosines = cosine_matrix(similarity)
+    for verse_id, hits in enumerate(similarity.most_similar(range(4), k=2)):
+        assert_top_k(hits, cosines[verse_id], 2, [verse_id])
+
+
+def test_small_batches_give_the_same_results(monkeypatch):
+    similarity = VerseSimilarity.build(make_corpus(300))
+    expected = similarity.most_similar(range(300), k=3)
+
+    monkeypatch.setattr(verse_similarity, "_BATCH_POSTINGS", 500)
+    batches = list(similarity._batches([[v] for v in range(300)]))
+    assert len(batches) > 1
+    assert sum(len(b) for b in batches) == 300
+    for batch in batches:
+        postings = sum(int(similarity._row_postings[rows].sum()) for rows in batch)
+        assert len(batch) == 1 or postings <= 500
+
+    assert similarity.most_similar(range(300), k=3) == expected
+
+
+def test_memory_stays_within_the_batch_limits():
+    # every verse shares the common words: scoring all 4000 in one unbounded
+    # batch would gather ~100M postings (several GB)
+    similarity = VerseSimilarity.build(make_corpus(4000))
+
+    tracemalloc.start()
+    try:
+        similarity.most_similar(range(4000), k=3)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # score block (_BATCH_CELLS float64) plus the gathered postings
+    assert peak < 160 << 20